@@ -0,0 +1,69 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Single entry point (``oslo-tools <command> [options]``) of the tools.
+
+Each command is one of the tool modules of this package, which is only
+imported when that command is run (so that running one command does not
+pay for importing the others).
+"""
+
+import importlib
+import os
+import sys
+
+# Command name to the (tool) module running it and what it does.
+COMMANDS = {
+    'filter-git-history': (
+        'oslo_tools.filter_git_history',
+        "filter the history of a repository to only some files"),
+    'list-latest-releases': (
+        'oslo_tools.list_latest_releases',
+        "show the latest release of each oslo project"),
+    'list-oslo-projects': (
+        'oslo_tools.list_oslo_projects',
+        "print the repository names of the oslo projects"),
+}
+
+
+def usage(prog):
+    lines = ["usage: %s <command> [options]" % prog, "", "commands:"]
+    for name, (_module_name, summary) in sorted(COMMANDS.items()):
+        lines.append("  %-22s %s" % (name, summary))
+    lines.append("")
+    lines.append("Use '%s <command> --help' for the options of a command."
+                 % prog)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    prog = os.path.basename(argv[0])
+    if len(argv) < 2 or argv[1] in ('-h', '--help'):
+        print(usage(prog))
+        return 0 if len(argv) >= 2 else 1
+    try:
+        module_name, _summary = COMMANDS[argv[1]]
+    except KeyError:
+        print("%s: unknown command '%s'" % (prog, argv[1]), file=sys.stderr)
+        print(usage(prog), file=sys.stderr)
+        return 1
+    module = importlib.import_module(module_name)
+    # The tools parse their options from sys.argv (and name themselves
+    # after its first item).
+    sys.argv = ['%s %s' % (prog, argv[1])] + list(argv[2:])
+    return module.main()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
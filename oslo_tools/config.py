@@ -0,0 +1,123 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Utilities functions for working with oslo.config from the tool scripts.
+"""
+
+import atexit
+import cProfile
+import os
+import pstats
+import sys
+
+DEFAULT_CONFIG_FILES = [
+    './oslo.conf',
+    os.path.expanduser('~/.oslo.conf'),
+]
+
+# Prefix of the environment variables oslo.config reads options from.
+ENVIRONMENT_PREFIX = 'OS_DEFAULT__'
+
+
+def existing_config_files():
+    """Returns the default configuration files that exist."""
+    return [
+        f
+        for f in DEFAULT_CONFIG_FILES
+        if os.path.exists(f)
+    ]
+
+
+def parse_simple_arguments(defaults, argv=None):
+    """Parses string options without oslo.config (when that is the same).
+
+    That is when no configuration file (or environment variable) would
+    set options and the arguments are only ``--<name> <value>`` (or
+    ``--<name>=<value>``) of the given options (a dict of their default
+    values). Returns the option values (a dict), or none when oslo.config
+    is needed after all (for ``--help`` or ``--profile``, for example).
+    """
+    if existing_config_files():
+        return None
+    if any(key.startswith(ENVIRONMENT_PREFIX) for key in os.environ):
+        return None
+    if argv is None:
+        argv = sys.argv[1:]
+    values = dict(defaults)
+    args = list(argv)
+    while args:
+        name, sep, value = args.pop(0).partition('=')
+        if not name.startswith('--') or name[2:] not in values:
+            return None
+        if not sep:
+            if not args or args[0].startswith('-'):
+                return None
+            value = args.pop(0)
+        values[name[2:]] = value
+    return values
+
+
+def get_config_parser():
+    # Only imported when needed (it is slow to import).
+    from oslo_config import cfg
+
+    conf = cfg.ConfigOpts()
+    conf.register_cli_opt(
+        cfg.StrOpt(
+            'repo_root',
+            default='.',
+            help='directory containing the git repositories',
+        )
+    )
+    conf.register_cli_opts([
+        cfg.StrOpt(
+            'profile',
+            metavar='PATH',
+            help='profile the tool (with cProfile) and save the profile'
+                 ' (in the pstats format) to this file',
+        ),
+        cfg.IntOpt(
+            'profile_top',
+            default=10,
+            min=0,
+            help='how many of the functions taking the most time to'
+                 ' print (to stderr) when profiling',
+        ),
+    ])
+    return conf
+
+
+def _start_profiling(path, top):
+    profile = cProfile.Profile()
+
+    def _stop_profiling():
+        profile.disable()
+        profile.dump_stats(path)
+        if top:
+            stats = pstats.Stats(profile, stream=sys.stderr)
+            stats.sort_stats('tottime').print_stats(top)
+
+    # The tool runs once its arguments are parsed, and the profile is
+    # saved when it exits (however it exits).
+    atexit.register(_stop_profiling)
+    profile.enable()
+
+
+def parse_arguments(conf):
+    # Look for a few configuration files, and load the ones we find.
+    args = conf(
+        project='oslo',
+        default_config_files=existing_config_files(),
+    )
+    if conf.profile:
+        _start_profiling(conf.profile, conf.profile_top)
+    return args
@@ -0,0 +1,441 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Filter the history of a git repository to only include the named files.
+
+The history of the current branch is streamed (once) from ``git
+fast-export`` through a filter into ``git fast-import``:
+
+* only the files whose path contains one of the named files are kept;
+* history is cut at the (earliest) commits that introduced them, found
+  by a single walk over the history (``--dry_run`` only shows those);
+* commits that no longer change anything are dropped, as are merges
+  whose second parent has become an ancestor of the first one.
+
+The branch is rewritten in place; what it was before is kept as
+``refs/original/<branch>`` (like ``git filter-branch`` does).
+"""
+
+import codecs
+import collections
+import subprocess
+import sys
+
+# Header lines of (exported) commits that are passed on as they are.
+COMMIT_HEADERS = (b'author ', b'committer ', b'encoding ')
+
+
+class FilterError(Exception):
+    """Raised when a repository can not be filtered."""
+
+
+def git(*args):
+    return subprocess.check_output(('git',) + args, universal_newlines=True)
+
+
+def unquote_path(path):
+    """Returns the path (as bytes) of a possibly C-style quoted path."""
+    if path.startswith(b'"') and path.endswith(b'"'):
+        return codecs.escape_decode(path[1:-1])[0]
+    return path
+
+
+def quote_path(path):
+    """Quotes a path (given as bytes) if fast-import needs it quoted."""
+    if b'\n' in path or path.startswith(b'"'):
+        return (b'"' + path.replace(b'\\', b'\\\\').replace(b'"', b'\\"')
+                .replace(b'\n', b'\\n') + b'"')
+    return path
+
+
+def walk_history(ref):
+    """Yields (commit, parents, changed paths) of the commits of a ref.
+
+    Parents come before their children; paths are those changed compared
+    to the first parent (none for merges). It is all one ``git log``.
+    """
+    proc = subprocess.Popen(
+        ['git', 'log', '--date-order', '--reverse', '--no-renames',
+         '--name-only', '-z', '--format=%x01%H %P', ref],
+        stdout=subprocess.PIPE)
+
+    def parse(record):
+        header, _sep, paths = record.partition(b'\0')
+        ids = header.decode('ascii').split()
+        return ids[0], ids[1:], [path for path in
+                                 paths.lstrip(b'\n').split(b'\0') if path]
+
+    with proc.stdout:
+        pending = b''
+        while True:
+            block = proc.stdout.read(64 * 1024)
+            if not block:
+                break
+            records = (pending + block).split(b'\x01')
+            pending = records.pop()
+            for record in records:
+                if record:
+                    yield parse(record)
+        if pending:
+            yield parse(pending)
+    if proc.wait():
+        raise subprocess.CalledProcessError(proc.returncode, proc.args)
+
+
+class HistoryScan:
+    """What a single walk over the history of a ref tells about files.
+
+    ``introduced`` has the first commit changing each file (files not in
+    the history are left out), ``roots`` those of them that do not
+    descend from one of the others (the minimal set of commits to cut the
+    history at) and ``surviving`` an estimate of how many commits would
+    be left after filtering (descendants of the roots changing a kept
+    path, merges are not counted).
+    """
+
+    def __init__(self, files, ref='HEAD'):
+        self.files = list(files)
+        self.introduced = {}
+        self.roots = []
+        self.total = 0
+        self.surviving = 0
+        keep = [file.encode('utf-8') for file in self.files]
+        # Like path specs: the file itself or what is under it.
+        prefixes = [name.rstrip(b'/') + b'/' for name in keep]
+        candidates = {}
+        masks = {}
+        changing = []
+        for commit, parents, paths in walk_history(ref):
+            self.total += 1
+            mask = 0
+            for parent in parents:
+                mask |= masks.get(parent, 0)
+            for file, name, prefix in zip(self.files, keep, prefixes):
+                if file in self.introduced:
+                    continue
+                if any(path == name or path.startswith(prefix)
+                       for path in paths):
+                    self.introduced[file] = commit
+                    if commit not in candidates:
+                        candidates[commit] = 1 << len(candidates)
+            if commit in candidates:
+                mask |= candidates[commit]
+            # The candidates this commit is (or descends from).
+            masks[commit] = mask
+            if any(name in path for path in paths for name in keep):
+                changing.append(commit)
+        root_mask = 0
+        for commit, bit in candidates.items():
+            if masks[commit] == bit:
+                self.roots.append(commit)
+                root_mask |= bit
+        self.surviving = sum(1 for commit in changing
+                             if masks[commit] & root_mask)
+        # Roots do not always change a kept path (when they introduce
+        # files by a path spec only).
+        self.surviving += sum(1 for root in self.roots
+                              if root not in changing)
+
+    @property
+    def missing(self):
+        """The files that are not in the history."""
+        return [file for file in self.files if file not in self.introduced]
+
+
+class HistoryFilter:
+    """Filters a fast-export stream of a branch into a fast-import one.
+
+    The stream must come from ``git fast-export --no-data
+    --show-original-ids`` (blobs are then referred to by their ids, which
+    works as the stream is imported into the same repository).
+    """
+
+    def __init__(self, keep, roots, ref):
+        self.keep = [path.encode('utf-8') for path in keep]
+        self.roots = set(root.encode('ascii') for root in roots)
+        self.ref = ref.encode('utf-8')
+        self.head = None
+        self.kept = 0
+        self.dropped = 0
+        # Mark of every exported commit to the mark of the commit that
+        # stands for it in the filtered history (or none if nothing does).
+        self._mapped = {}
+        # Parents and generation numbers of the filtered commits, and the
+        # original commits they were made from.
+        self._parents = {}
+        self._generations = {}
+        self._original = {}
+        self._listings = {}
+
+    def keeps(self, path):
+        path = unquote_path(path)
+        return any(name in path for name in self.keep)
+
+    def _listing(self, commit):
+        """Returns the (kept) file commands of the whole tree of a commit."""
+        try:
+            return self._listings[commit]
+        except KeyError:
+            pass
+        out = subprocess.check_output(['git', 'ls-tree', '-r', '-z',
+                                       commit.decode('ascii')])
+        listing = []
+        for entry in out.split(b'\0'):
+            if not entry:
+                continue
+            info, path = entry.split(b'\t', 1)
+            mode, _kind, sha = info.split(b' ')
+            if any(name in path for name in self.keep):
+                listing.append(b'M ' + mode + b' ' + sha + b' ' +
+                               quote_path(path))
+        self._listings[commit] = listing
+        return listing
+
+    def _is_ancestor(self, mark, other):
+        """Tells if a filtered commit is an ancestor of another one."""
+        generation = self._generations[mark]
+        seen = set()
+        todo = collections.deque([other])
+        while todo:
+            current = todo.popleft()
+            if current == mark:
+                return True
+            for parent in self._parents[current]:
+                # Commits of lower generations can not descend from it.
+                if parent not in seen and \
+                        self._generations[parent] >= generation:
+                    seen.add(parent)
+                    todo.append(parent)
+        return False
+
+    def _read_data(self, stream, line):
+        size = int(line[len(b'data '):])
+        data = stream.read(size)
+        if len(data) != size:
+            raise FilterError("Truncated fast-export stream")
+        return line + b'\n' + data
+
+    def run(self, stream, out):
+        """Filters the (binary) stream of commits into ``out``."""
+        while True:
+            line = stream.readline()
+            if not line:
+                break
+            line = line.rstrip(b'\n')
+            if line.startswith(b'commit '):
+                self._filter_commit(stream, out)
+            elif line.startswith(b'reset '):
+                pass
+            elif line.startswith(b'from '):
+                # Of a reset (of the branch to an exported commit).
+                self.head = self._mapped.get(line[len(b'from '):])
+            elif line and not line.startswith((b'feature ', b'progress ')):
+                raise FilterError("Unexpected fast-export line: %r" % line)
+        if self.head is None:
+            raise FilterError("Nothing left of the history")
+        out.write(b'reset ' + self.ref + b'\nfrom ' + self.head + b'\n\n')
+
+    def _filter_commit(self, stream, out):
+        mark = original = None
+        headers = []
+        message = None
+        parents = []
+        commands = []
+        while True:
+            line = stream.readline()
+            if not line:
+                raise FilterError("Truncated fast-export stream")
+            line = line.rstrip(b'\n')
+            if message is None:
+                if line.startswith(b'mark '):
+                    mark = line[len(b'mark '):]
+                elif line.startswith(b'original-oid '):
+                    original = line[len(b'original-oid '):]
+                elif line.startswith(COMMIT_HEADERS):
+                    headers.append(line)
+                elif line.startswith(b'data '):
+                    message = self._read_data(stream, line)
+                else:
+                    raise FilterError("Unexpected fast-export line: %r"
+                                      % line)
+            elif line.startswith((b'from ', b'merge ')):
+                parents.append(line.split(b' ', 1)[1])
+            elif line.startswith(b'M '):
+                # M <mode> <blob> <path>
+                if self.keeps(line.split(b' ', 3)[3]):
+                    commands.append(line)
+            elif line.startswith(b'D '):
+                if self.keeps(line[len(b'D '):]):
+                    commands.append(line)
+            elif line == b'deleteall':
+                commands.append(line)
+            elif not line:
+                break
+            else:
+                raise FilterError("Unexpected fast-export line: %r" % line)
+        if mark is None or original is None:
+            raise FilterError("Commit without a mark (or original id),"
+                              " was the stream exported with"
+                              " --show-original-ids?")
+        self.head = self._commit(out, mark, original, headers, message,
+                                 parents, commands)
+
+    def _commit(self, out, mark, original, headers, message, parents,
+                commands):
+        """Writes a commit (unless it is dropped); returns what stands for
+        it in the filtered history."""
+        if original in self.roots:
+            new_parents = []
+        else:
+            new_parents = []
+            for parent in parents:
+                parent = self._mapped.get(parent)
+                if parent is not None and parent not in new_parents:
+                    new_parents.append(parent)
+            if not new_parents:
+                # Not (yet) past the roots.
+                self._mapped[mark] = None
+                self.dropped += 1
+                return None
+            if (len(new_parents) == 2 and
+                    self._is_ancestor(new_parents[1], new_parents[0])):
+                # The merged in commits were filtered out (or merged in
+                # before already).
+                del new_parents[1]
+        # The exported file commands are relative to the first parent;
+        # when that one stands for something else now, write out the whole
+        # tree instead.
+        if (not new_parents or not parents or
+                self._mapped.get(parents[0]) != new_parents[0]):
+            commands = [b'deleteall'] + self._listing(original)
+            if len(new_parents) == 1:
+                parent_original = self._original[new_parents[0]]
+                if self._listing(parent_original) == commands[1:]:
+                    commands = []
+        if len(new_parents) == 1 and not commands:
+            self._mapped[mark] = new_parents[0]
+            self.dropped += 1
+            return new_parents[0]
+        if not new_parents:
+            # Start over (instead of continuing from the branch tip).
+            out.write(b'reset ' + self.ref + b'\n')
+        out.write(b'commit ' + self.ref + b'\nmark ' + mark + b'\n')
+        for header in headers:
+            out.write(header + b'\n')
+        out.write(message + b'\n')
+        for i, parent in enumerate(new_parents):
+            out.write((b'from ' if i == 0 else b'merge ') + parent + b'\n')
+        for command in commands:
+            out.write(command + b'\n')
+        out.write(b'\n')
+        self._mapped[mark] = mark
+        self._parents[mark] = new_parents
+        self._generations[mark] = 1 + max(
+            [self._generations[parent] for parent in new_parents] or [0])
+        self._original[mark] = original
+        self.kept += 1
+        return mark
+
+
+def filter_history(files, roots=None):
+    """Rewrites the current branch to only have the history of files.
+
+    Returns the filter used (which knows how many commits were kept and
+    dropped).
+    """
+    try:
+        ref = git('symbolic-ref', '-q', 'HEAD').strip()
+    except subprocess.CalledProcessError:
+        raise FilterError("Not on a branch")
+    if git('status', '--porcelain', '--untracked-files=no'):
+        raise FilterError("Cannot rewrite the branch, the working tree has"
+                          " changes (commit or stash them first)")
+    backup = 'refs/original/' + ref
+    if git('for-each-ref', backup):
+        raise FilterError("A previous backup already exists in %s, remove"
+                          " it first" % backup)
+    if roots is None:
+        roots = HistoryScan(files, ref=ref).roots
+    if not roots:
+        raise FilterError("None of the files are in the history")
+    history_filter = HistoryFilter(files, roots, ref)
+    exporter = subprocess.Popen(
+        ['git', 'fast-export', '--no-data', '--show-original-ids',
+         '--signed-tags=strip', '--reencode=no', ref],
+        stdout=subprocess.PIPE)
+    importer = subprocess.Popen(
+        ['git', 'fast-import', '--quiet', '--force'],
+        stdin=subprocess.PIPE)
+    old_head = git('rev-parse', ref).strip()
+    try:
+        history_filter.run(exporter.stdout, importer.stdin)
+    finally:
+        importer.stdin.close()
+        exporter.stdout.close()
+        exported = exporter.wait()
+        imported = importer.wait()
+    if exported or imported:
+        raise FilterError("Exporting (or importing) the history failed")
+    git('update-ref', backup, old_head)
+    # Checked to be clean above, so nothing gets lost here.
+    git('reset', '--quiet', '--hard')
+    return history_filter
+
+
+def main():
+    # Only the command line needs oslo.config.
+    from oslo_config import cfg as oslo_cfg
+
+    from oslo_tools import config as cfg
+
+    conf = cfg.get_config_parser()
+    conf.register_cli_opt(
+        oslo_cfg.MultiStrOpt(
+            'files',
+            positional=True,
+            help='files to keep',
+        )
+    )
+    conf.register_cli_opt(
+        oslo_cfg.BoolOpt(
+            'dry_run',
+            default=False,
+            help='only show where history would be cut (and about how'
+                 ' many commits would be kept)',
+        )
+    )
+    cfg.parse_arguments(conf)
+
+    if conf.dry_run:
+        try:
+            scan = HistoryScan(conf.files)
+        except subprocess.CalledProcessError as e:
+            print(e, file=sys.stderr)
+            return 1
+        for root in scan.roots:
+            files = [file for file in scan.files
+                     if scan.introduced.get(file) == root]
+            print("Root %s (introduces %s)" % (root, ", ".join(files)))
+        if scan.missing:
+            print("Not in the history: %s" % ", ".join(scan.missing))
+        print("About %s of %s commits would be kept"
+              % (scan.surviving, scan.total))
+        return
+
+    print("Pruning commits for unrelated files...")
+    try:
+        history_filter = filter_history(conf.files)
+    except (FilterError, subprocess.CalledProcessError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    print("Kept %s commits (dropped %s)" % (history_filter.kept,
+                                            history_filter.dropped))
@@ -0,0 +1,298 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Show the latest tags for all Oslo projects as an approximation for
+reporting on which releases exist.
+
+Tags are read straight from the refs of each repository (loose and
+packed ones) and ordered by version; repositories are scanned in
+parallel and what is found is cached (per repository) until its tags
+change.
+"""
+
+from concurrent import futures
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+from oslo_tools import list_oslo_projects
+
+# Libraries that are not (or no longer) released.
+EXCLUDED = re.compile(r'(oslo\.version|cookiecutter|incubator)')
+
+# Releases (and pre-releases) like 1.2.3, 1.2.3.0b1 or 1.2.3rc2.
+VERSION = re.compile(r'^(\d+(?:\.\d+)*)(?:(a|b|rc)(\d+))?$')
+PRE_RELEASES = {'a': 0, 'b': 1, 'rc': 2}
+
+UNRELEASED = ('0000-00-00 00:00:00 +0000', 'UNRELEASED')
+
+# Bumped whenever what is cached changes (older caches are then ignored).
+CACHE_VERSION = 1
+
+
+def version_key(tag):
+    """Returns a sort key for a release tag (or none if it is not one)."""
+    match = VERSION.match(tag)
+    if match is None:
+        return None
+    release, pre_kind, pre_number = match.groups()
+    release = [int(part) for part in release.split('.')]
+    # 1.2 and 1.2.0 are the same release.
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+    if pre_kind is None:
+        # Finals come after all of their pre-releases.
+        pre = (len(PRE_RELEASES), 0)
+    else:
+        pre = (PRE_RELEASES[pre_kind], int(pre_number))
+    return (tuple(release), pre)
+
+
+def git_dir(repo):
+    """Returns the git directory of a repository (or worktree)."""
+    path = os.path.join(repo, '.git')
+    if os.path.isfile(path):
+        with open(path) as fh:
+            line = fh.readline().strip()
+        if line.startswith('gitdir:'):
+            path = os.path.join(repo, line[len('gitdir:'):].strip())
+    return path
+
+
+def common_dir(gitdir):
+    """Returns where the refs of a git directory are (worktrees share
+    those of their main repository)."""
+    try:
+        with open(os.path.join(gitdir, 'commondir')) as fh:
+            return os.path.join(gitdir, fh.read().strip())
+    except OSError:
+        return gitdir
+
+
+def ref_state(repo):
+    """Returns what changes whenever the tags of a repository change."""
+    refs_dir = common_dir(git_dir(repo))
+    if not os.path.isdir(refs_dir):
+        raise OSError("%s is not a git repository" % repo)
+    state = []
+    try:
+        stat = os.stat(os.path.join(refs_dir, 'packed-refs'))
+        state.append(['packed-refs', stat.st_mtime_ns, stat.st_size])
+    except FileNotFoundError:
+        pass
+    tags_dir = os.path.join(refs_dir, 'refs', 'tags')
+    # Adding (or removing) a loose tag changes the mtime of the directory
+    # it is in.
+    for dirpath, _dirnames, _filenames in os.walk(tags_dir):
+        state.append([os.path.relpath(dirpath, refs_dir),
+                      os.stat(dirpath).st_mtime_ns])
+    return sorted(state)
+
+
+def read_tags(repo):
+    """Returns the names of the tags of a repository."""
+    refs_dir = common_dir(git_dir(repo))
+    tags = set()
+    try:
+        with open(os.path.join(refs_dir, 'packed-refs')) as fh:
+            for line in fh:
+                # Skip comments and peeled (^) lines.
+                if line.startswith(('#', '^')):
+                    continue
+                _sha, _sep, ref = line.rstrip('\n').partition(' ')
+                if ref.startswith('refs/tags/'):
+                    tags.add(ref[len('refs/tags/'):])
+    except FileNotFoundError:
+        pass
+    tags_dir = os.path.join(refs_dir, 'refs', 'tags')
+    for dirpath, _dirnames, filenames in os.walk(tags_dir):
+        for filename in filenames:
+            tags.add(os.path.relpath(os.path.join(dirpath, filename),
+                                     tags_dir).replace(os.sep, '/'))
+    return tags
+
+
+def highest_tag(tags):
+    """Returns the highest release tag (or none if there are none)."""
+    highest = None
+    for tag in tags:
+        key = version_key(tag)
+        if key is not None and (highest is None or key > highest[0]):
+            highest = (key, tag)
+    if highest is None:
+        return None
+    return highest[1]
+
+
+def scan(repo):
+    """Returns the (commit date, tag) of the latest release of a repo."""
+    tag = highest_tag(read_tags(repo))
+    if tag is None:
+        return UNRELEASED
+    date = subprocess.check_output(
+        ['git', 'log', '-q', '--format=format:%ci', '-n', '1',
+         'refs/tags/' + tag, '--'],
+        cwd=repo, universal_newlines=True).strip()
+    return (date, tag)
+
+
+def default_cache_path():
+    cache_dir = os.environ.get('XDG_CACHE_HOME',
+                               os.path.expanduser('~/.cache'))
+    return os.path.join(cache_dir, 'oslo.tools', 'releases.json')
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path) as fh:
+            cached = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cached, dict) or \
+            cached.get('version') != CACHE_VERSION:
+        return {}
+    return cached['repos']
+
+
+def _write_cache(cache_path, repos):
+    dirname = os.path.dirname(cache_path)
+    os.makedirs(dirname, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as fh:
+            json.dump({'version': CACHE_VERSION, 'repos': repos}, fh,
+                      separators=(',', ':'))
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def latest_releases(repo_root, libs, workers=None, cache_path=None,
+                    on_error=None):
+    """Returns (date, lib, tag) of the latest release of libraries.
+
+    The libraries are repositories under ``repo_root``; those whose tags
+    did not change since they were last scanned are answered from the
+    cache (at ``cache_path``, by default under ``~/.cache/oslo.tools``),
+    the others are scanned by a pool of ``workers`` processes. Newest
+    releases come first.
+
+    Libraries that can not be read (missing or broken repositories) are
+    skipped after calling ``on_error(lib, error)``; without it their
+    first error is raised instead.
+    """
+    if cache_path is None:
+        cache_path = default_cache_path()
+
+    def failed(lib, error):
+        if on_error is None:
+            raise error
+        on_error(lib, error)
+
+    cached = _read_cache(cache_path)
+    found = {}
+    states = {}
+    to_scan = []
+    for lib in libs:
+        repo = os.path.abspath(os.path.expanduser(
+            os.path.join(repo_root, lib)))
+        try:
+            states[lib] = ref_state(repo)
+        except OSError as e:
+            failed(lib, e)
+            continue
+        entry = cached.get(repo)
+        if entry is not None and entry['state'] == states[lib]:
+            found[lib] = tuple(entry['release'])
+        else:
+            to_scan.append((lib, repo))
+    if to_scan:
+        with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            scans = dict((executor.submit(scan, repo), (lib, repo))
+                         for lib, repo in to_scan)
+            for fut in futures.as_completed(scans):
+                lib, repo = scans[fut]
+                try:
+                    found[lib] = fut.result()
+                except (OSError, subprocess.CalledProcessError) as e:
+                    failed(lib, e)
+                    continue
+                cached[repo] = {'state': states[lib],
+                                'release': list(found[lib])}
+        try:
+            _write_cache(cache_path, cached)
+        except OSError:
+            pass
+    releases = [(date, lib, tag) for lib, (date, tag) in found.items()]
+    releases.sort(reverse=True)
+    return releases
+
+
+def main():
+    # Only the command line needs oslo.config (the scanning processes do
+    # not).
+    from oslo_config import cfg as oslo_cfg
+
+    from oslo_tools import config as cfg
+
+    conf = cfg.get_config_parser()
+    conf.register_cli_opts([
+        oslo_cfg.BoolOpt(
+            'json',
+            default=False,
+            help='output the releases as json',
+        ),
+        oslo_cfg.IntOpt(
+            'workers',
+            min=1,
+            help='how many repositories to scan at once (defaults to'
+                 ' the number of cpus)',
+        ),
+        oslo_cfg.MultiStrOpt(
+            'libs',
+            positional=True,
+            required=False,
+            default=[],
+            help='libraries to show (all oslo libraries by default)',
+        ),
+    ])
+    cfg.parse_arguments(conf)
+
+    libs = conf.libs
+    if not libs:
+        libs = [lib
+                for lib in list_oslo_projects.list_projects(conf.repo_root)
+                if not EXCLUDED.search(lib)]
+    failed = []
+
+    def on_error(lib, error):
+        print("Skipping %s: %s" % (lib, error), file=sys.stderr)
+        failed.append(lib)
+
+    try:
+        releases = latest_releases(conf.repo_root, libs,
+                                   workers=conf.workers, on_error=on_error)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    if conf.json:
+        print(json.dumps([dict(date=date, lib=lib, tag=tag)
+                          for date, lib, tag in releases], indent=2))
+    else:
+        for date, lib, tag in releases:
+            print(date, lib, tag)
+    if failed:
+        return 1
@@ -0,0 +1,71 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Print a list of the oslo project repository names.
+
+The listing is also available to other tools (without going through
+this script) as :func:`list_projects`.
+"""
+
+import os
+
+from oslo_tools import project_index
+
+
+def projects_file(repo_root):
+    """Returns the path of the governance projects.yaml file."""
+    gov_repo = os.path.expanduser(os.path.join(repo_root, 'governance'))
+    return os.path.join(gov_repo, 'reference/projects.yaml')
+
+
+def list_projects(repo_root, team='oslo', cache_path=None):
+    """Returns the (sorted) repository names of the deliverables of a team.
+
+    Raises ``ValueError`` for teams that governance does not know of.
+    """
+    index = project_index.load(projects_file(repo_root),
+                               cache_path=cache_path)
+    repos = []
+    for v in index.deliverables(team).values():
+        if v:
+            repos.append(v[0])
+    return sorted(repos)
+
+
+def main():
+    from oslo_tools import config as cfg
+
+    # Plain '--repo_root' and '--team' arguments are parsed without
+    # oslo.config (which is slow to import, compared to listing projects
+    # from the cached index).
+    args = cfg.parse_simple_arguments({'repo_root': '.', 'team': 'oslo'})
+    if args is None:
+        from oslo_config import cfg as oslo_cfg
+
+        conf = cfg.get_config_parser()
+        conf.register_cli_opt(
+            oslo_cfg.StrOpt(
+                'team',
+                default='oslo',
+                help='governance team whose project repositories to list',
+            )
+        )
+        cfg.parse_arguments(conf)
+        args = {'repo_root': conf.repo_root, 'team': conf.team}
+
+    try:
+        repos = list_projects(args['repo_root'], team=args['team'])
+    except ValueError as e:
+        print(e)
+        return 1
+    for r in repos:
+        print(r)
@@ -0,0 +1,156 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Index of the teams, deliverables and repos of the governance projects.
+
+The governance ``reference/projects.yaml`` file is big (and slow to load),
+so the index built from it is cached (as json) and reused for as long as
+that file does not change; changes are noticed by its modification time
+and size (or, when those differ, its content hash). Loading a cached
+index takes a few milliseconds, parsing the yaml file (even with the
+libyaml based loader) takes a lot longer.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+# Bumped whenever what is cached changes (older caches are then rebuilt).
+CACHE_VERSION = 1
+
+
+class ProjectIndex:
+    """Teams to deliverables to repos (and repos back to their owners)."""
+
+    def __init__(self, teams):
+        self.teams = teams
+        self._owners = {}
+        for team, deliverables in teams.items():
+            for deliverable, repos in deliverables.items():
+                for repo in repos:
+                    self._owners[repo] = (team, deliverable)
+
+    @classmethod
+    def from_projects(cls, projects):
+        """Builds the index from the (loaded) projects.yaml data."""
+        teams = {}
+        for team, team_data in (projects or {}).items():
+            deliverables = {}
+            for deliverable, deliverable_data in \
+                    (team_data.get('deliverables') or {}).items():
+                deliverables[deliverable] = list(
+                    (deliverable_data or {}).get('repos') or [])
+            teams[team] = deliverables
+        return cls(teams)
+
+    def team_names(self):
+        return sorted(self.teams)
+
+    def deliverables(self, team):
+        """Returns the deliverables (and their repos) of a team."""
+        try:
+            return self.teams[team]
+        except KeyError:
+            raise ValueError("Unknown team '%s'" % team)
+
+    def repos(self, team=None):
+        """Returns the repos of a team (or of all teams), sorted."""
+        if team is None:
+            return sorted(self._owners)
+        return sorted(repo
+                      for repos in self.deliverables(team).values()
+                      for repo in repos)
+
+    def owner(self, repo):
+        """Returns the (team, deliverable) owning a repo (or none)."""
+        return self._owners.get(repo)
+
+
+def _parse(data):
+    # Imported here as it is only needed when the cache is out of date
+    # (importing yaml takes longer than loading the cache does).
+    import yaml
+    # The libyaml based loader (when there is one) is many times faster.
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    return yaml.load(data, Loader=loader)
+
+
+def default_cache_path(path):
+    """Returns where (by default) to cache the index of a projects file."""
+    cache_dir = os.environ.get('XDG_CACHE_HOME',
+                               os.path.expanduser('~/.cache'))
+    digest = hashlib.sha1(os.path.abspath(path).encode('utf-8'))
+    return os.path.join(cache_dir, 'oslo.tools',
+                        'projects-%s.json' % digest.hexdigest()[0:12])
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path) as fh:
+            cached = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or \
+            cached.get('version') != CACHE_VERSION:
+        return None
+    return cached
+
+
+def _write_cache(cache_path, cached):
+    dirname = os.path.dirname(cache_path)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    # Written to the side and renamed, so that readers never see a
+    # partially written cache.
+    fd, tmp_path = tempfile.mkstemp(dir=dirname or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(cached, fh, separators=(',', ':'))
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load(path, cache_path=None):
+    """Returns the index of a projects.yaml file (using a cache).
+
+    The cache is at ``cache_path`` (see :func:`default_cache_path` for
+    where it is when not given); failing to write it is not an error.
+    """
+    if cache_path is None:
+        cache_path = default_cache_path(path)
+    stat = os.stat(path)
+    cached = _read_cache(cache_path)
+    if (cached is not None and cached['mtime_ns'] == stat.st_mtime_ns and
+            cached['size'] == stat.st_size):
+        return ProjectIndex(cached['teams'])
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if cached is not None and cached['sha256'] == digest:
+        # Touched (or checked out again) but not changed.
+        teams = cached['teams']
+    else:
+        teams = ProjectIndex.from_projects(_parse(data)).teams
+    try:
+        _write_cache(cache_path, {
+            'version': CACHE_VERSION,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': digest,
+            'teams': teams,
+        })
+    except OSError:
+        pass
+    return ProjectIndex(teams)
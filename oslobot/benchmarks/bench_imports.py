@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure how long loading the plugin (and the tool scripts) takes.
+
+Every module is imported in a fresh interpreter (after what is always
+there anyway, like errbot for the plugin); fails if one of them pulls in
+a slow to import library that should only be imported on first use (or
+takes longer than the budget, if one is given).
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PLUGIN_DIR = os.path.join(HERE, os.pardir, 'plugins', 'oslobot')
+REPO_DIR = os.path.join(HERE, os.pardir, os.pardir)
+
+# (module, directory it is in, modules imported before it).
+TARGETS = [
+    ('oslobot', PLUGIN_DIR, ['errbot']),
+    ('oslo_tools.cli', REPO_DIR, []),
+    ('oslo_tools.list_oslo_projects', REPO_DIR, []),
+    ('oslo_tools.list_latest_releases', REPO_DIR, []),
+    ('oslo_tools.filter_git_history', REPO_DIR, []),
+    ('oslo_tools.project_index', REPO_DIR, []),
+]
+
+# Libraries that must only be imported once (and if) they are used.
+LAZY = [
+    'aiohttp',
+    'dateutil',
+    'feedparser',
+    'oslo_config',
+    'oslo_utils',
+    'requests',
+    'tabulate',
+    'yaml',
+]
+
+_MEASURE = """
+import importlib, json, sys, time
+for name in %(before)r:
+    importlib.import_module(name)
+before = set(sys.modules)
+sys.path[:0] = %(paths)r
+started = time.perf_counter()
+importlib.import_module(%(module)r)
+took = time.perf_counter() - started
+print(json.dumps([took, sorted(set(sys.modules) - before)]))
+"""
+
+
+def measure(module, path, before):
+    # The oslo_tools package (which the plugin uses too) is imported from
+    # this checkout, as if it was installed.
+    paths = [path, REPO_DIR]
+    out = subprocess.check_output(
+        [sys.executable, '-c', _MEASURE % dict(module=module, paths=paths,
+                                               before=before)],
+        universal_newlines=True)
+    took, loaded = json.loads(out)
+    return took, loaded
+
+
+def eager_imports(loaded):
+    """Returns the (top level) lazy libraries among loaded modules."""
+    return sorted(set(name.split('.')[0] for name in loaded
+                      if name.split('.')[0] in LAZY))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--repeat', type=int, default=5,
+                            help='how many times to import each module'
+                                 ' (the fastest time is reported)')
+    arg_parser.add_argument('--budget', type=float, default=None,
+                            help='most milliseconds an import may take')
+    args = arg_parser.parse_args()
+
+    failed = False
+    for module, path, before in TARGETS:
+        best = None
+        for _i in range(args.repeat):
+            took, loaded = measure(module, path, before)
+            if best is None or took < best:
+                best = took
+        eager = eager_imports(loaded)
+        print("%-32s %8.1fms %5s modules"
+              % (module, best * 1000, len(loaded)))
+        if eager:
+            print("  imports %s (should be lazy)" % ", ".join(eager))
+            failed = True
+        if args.budget is not None and best * 1000 > args.budget:
+            print("  over the %0.1fms budget" % args.budget)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
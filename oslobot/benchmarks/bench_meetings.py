@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare meeting notes link extraction (regex vs streaming).
+
+The baseline is how the plugin used to find the latest notes link: one
+regex over the whole listing (built per call) with list based dedup.
+Listings are either synthetic or read from (recorded) files.
+"""
+
+import argparse
+import datetime
+import io
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, 'plugins', 'oslobot'))
+
+import fetchers  # noqa: E402
+import meetings  # noqa: E402
+
+ROW_TPL = ('<tr><td valign="top"><img src="/icons/text.gif" alt="[TXT]">'
+           '</td><td><a href="%(name)s">%(name)s</a></td>'
+           '<td align="right">%(when)s  </td><td align="right">'
+           ' 12K</td><td>&nbsp;</td></tr>\n')
+
+
+def make_listing(team, meetings_count):
+    rows = ['<html><head><title>Index of /meetings/%s/2016</title>'
+            '</head><body><table>\n' % team]
+    start = datetime.datetime(2016, 1, 1, 16)
+    for i in range(meetings_count):
+        when = start + datetime.timedelta(hours=i)
+        base = '%s.%s' % (team, when.strftime('%Y-%m-%d-%H.%M'))
+        for suffix in ('.html', '.log.html', '.log.txt', '.txt'):
+            rows.append(ROW_TPL % {'name': base + suffix,
+                                   'when': when.strftime('%Y-%m-%d %H:%M')})
+    rows.append('</table></body></html>\n')
+    return ''.join(rows)
+
+
+def baseline(team, listing_file):
+    text = listing_file.read()
+    matches = []
+    for m in re.findall("(%s.+?[.]html)" % team, text):
+        if m.endswith(".log.html"):
+            continue
+        if m not in matches:
+            matches.append(m)
+    if matches:
+        return matches[-1]
+    return None
+
+
+def streaming(team, listing_file):
+    extractor = meetings.NotesLinkExtractor(team)
+    while True:
+        chunk = listing_file.read(fetchers.CHUNK_SIZE)
+        if not chunk:
+            break
+        extractor.feed(chunk)
+    return extractor.close()
+
+
+def measure(func, team, open_listing):
+    with open_listing() as listing_file:
+        tracemalloc.start()
+        started = time.perf_counter()
+        result = func(team, listing_file)
+        took = time.perf_counter() - started
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, took, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--team', default='oslo')
+    arg_parser.add_argument('--meetings', type=int, default=5000,
+                            help='number of meetings in a synthetic listing')
+    arg_parser.add_argument('listings', nargs='*',
+                            help='recorded listing files to use instead')
+    args = arg_parser.parse_args()
+
+    if args.listings:
+        sources = [(path, lambda path=path: open(path))
+                   for path in args.listings]
+    else:
+        listing = make_listing(args.team, args.meetings)
+        sources = [('synthetic (%s meetings)' % args.meetings,
+                    lambda: io.StringIO(listing))]
+    for name, open_listing in sources:
+        print(name)
+        expected = None
+        for func in (baseline, streaming):
+            result, took, peak = measure(func, args.team, open_listing)
+            if expected is None:
+                expected = result
+            elif result != expected:
+                print("%s does not agree with the baseline!" % func.__name__)
+                return 1
+            print("  %-10s %8.2fms %8.1fKiB peak" % (func.__name__,
+                                                     took * 1000,
+                                                     peak / 1024.0))
+        print("  latest: %s" % expected)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
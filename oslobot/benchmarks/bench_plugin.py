@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""End-to-end benchmark of the oslobot plugin commands (fully offline).
+
+Runs the plugin inside errbot's test bot against a local health (and
+eavesdrop) stand-in and reports the latency, throughput and peak memory
+of ``check_periodics`` (for a range of build name counts) and of
+``meeting_notes``, for each of the fetch engine settings asked for.
+"""
+
+import argparse
+import logging
+import os
+import queue
+import sys
+import time
+import tracemalloc
+
+from errbot.backends import test
+
+import healthserver
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          os.pardir, 'plugins')
+# The oslo_tools package the plugin uses (from this checkout, as if it
+# was installed).
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        os.pardir, os.pardir)
+PY_VERSIONS = [(3, 4), (2, 7)]
+# Seconds without more messages after which a reply is taken as complete.
+QUIET_PERIOD = 1.0
+
+
+def parse_engine(text):
+    """Parses 'thread:<workers>' or 'asyncio:<concurrency>'."""
+    engine, _sep, count = text.partition(':')
+    if engine not in ('thread', 'asyncio') or not count.isdigit():
+        raise argparse.ArgumentTypeError("expected thread:<workers> or"
+                                         " asyncio:<concurrency>")
+    return engine, int(count)
+
+
+class Bench:
+    def __init__(self, bot, server, timeout):
+        self.bot = bot
+        self.server = server
+        self.timeout = timeout
+        self.plugin = bot.bot.plugin_manager.get_plugin_obj_by_name(
+            'oslobot')
+
+    def configure(self, engine, count):
+        config = self.plugin.get_configuration_template()
+        config.update({
+            'periodic_url_tpl': self.server.feed_url_tpl,
+            'meeting_url_tpl': self.server.meeting_url_tpl,
+            'periodic_python_versions': PY_VERSIONS,
+            'periodic_fetch_engine': engine,
+            'periodic_fetch_workers': count,
+            'periodic_fetch_concurrency': count,
+            'periodic_fetch_per_host': count,
+            # Every run should do all of the work (and wait for it)...
+            'periodic_cache': False,
+            'periodic_incremental': 'off',
+            'periodic_snapshot': False,
+            'periodic_report_budget': 0.0,
+            'meeting_index_refresh_frequency': 0,
+            'outbound_rate': 0.0,
+            'shortener_backend': 'local',
+            'shortener_cache_persist': False,
+        })
+        self.run("!plugin config oslobot %r" % config)
+
+    def run(self, command, trace_memory=False):
+        """Runs a command; returns its replies, how long it took and the
+        peak memory used (if traced)."""
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        self.bot.push_message(command)
+        # Long replies get split into many messages, so wait for the
+        # first one and then for the rest to stop coming in.
+        replies = [self.bot.pop_message(timeout=self.timeout)]
+        took = time.perf_counter() - started
+        while True:
+            try:
+                replies.append(self.bot.pop_message(timeout=QUIET_PERIOD))
+            except queue.Empty:
+                break
+            took = time.perf_counter() - started
+        peak = None
+        if trace_memory:
+            _current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return replies, took, peak
+
+    def run_all(self, commands, engine, count, trace_memory=False):
+        # Reconfiguring restarts the plugin, so every pass starts cold.
+        self.configure(engine, count)
+        return [self.run(command, trace_memory=trace_memory)[1:]
+                for command in commands]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--builds', type=int, nargs='+',
+                        default=[10, 100, 1000],
+                        help='build name counts to check (scenarios)')
+    parser.add_argument('--engine', type=parse_engine, nargs='+',
+                        default=[('thread', 3), ('thread', 10),
+                                 ('asyncio', 10), ('asyncio', 50)],
+                        help='fetch engines (and worker counts) to compare')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='seconds the stand-in delays responses by')
+    parser.add_argument('--jitter', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--no-failures-rate', type=float, default=0.3)
+    parser.add_argument('--entries', type=int, default=20,
+                        help='entries in each synthetic feed')
+    parser.add_argument('--timeout', type=float, default=600.0,
+                        help='seconds to wait for a command reply')
+    args = parser.parse_args()
+
+    this_year = time.localtime().tm_year
+    server = healthserver.HealthServer(
+        latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, no_failures_rate=args.no_failures_rate,
+        entries=args.entries, meeting_years=[this_year - 3]).start()
+    sys.path.insert(0, REPO_DIR)
+    bot = test.TestBot(extra_plugin_dir=PLUGIN_DIR, loglevel=logging.ERROR)
+    bot.start()
+    try:
+        bench = Bench(bot, server, args.timeout)
+        scenarios = []
+        for builds in args.builds:
+            projects = ["project%04d" % i for i in
+                        range(max(1, builds // len(PY_VERSIONS)))]
+            scenarios.append(("%s builds" % builds,
+                              "!check periodics %s" % " ".join(projects),
+                              len(projects) * len(PY_VERSIONS)))
+        scenarios.append(("meeting notes", "!meeting notes oslo", None))
+        commands = [command for _name, command, _builds in scenarios]
+        print("%-12s %-14s %10s %12s %12s"
+              % ("Engine", "Scenario", "Latency", "Builds/sec",
+                 "Peak memory"))
+        for engine, count in args.engine:
+            # Tracing memory slows everything down, so time the commands
+            # and measure their memory use in separate passes.
+            timings = bench.run_all(commands, engine, count)
+            peaks = [peak for _took, peak in
+                     bench.run_all(commands, engine, count,
+                                   trace_memory=True)]
+            engine_name = "%s:%s" % (engine, count)
+            for (name, _command, builds), (took, _peak), peak in zip(
+                    scenarios, timings, peaks):
+                if builds:
+                    throughput = "%.1f" % (builds / took)
+                else:
+                    throughput = "-"
+                print("%-12s %-14s %9.3fs %12s %9.1fMiB"
+                      % (engine_name, name, took, throughput,
+                         peak / (1024.0 * 1024.0)))
+    finally:
+        bot.stop()
+        server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare health feed parsing (feedparser vs the streaming fast path).
+
+Feeds are either synthetic (of a few sizes) or read from (recorded)
+files; both parsers must agree on the published time and link of every
+entry.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import feedparser
+
+import healthserver
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, 'plugins', 'oslobot'))
+
+import rssfeeds  # noqa: E402
+
+
+def summarize(feed):
+    return [(entry.published, entry.get('link')) for entry in feed.entries]
+
+
+def measure(func, content, repeat):
+    started = time.process_time()
+    for _i in range(repeat):
+        result = func(content)
+    took = (time.process_time() - started) / repeat
+    # Tracing slows things down, so measure memory in a separate run.
+    tracemalloc.start()
+    func(content)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, took, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--entries', type=int, nargs='+',
+                            default=[20, 1000, 10000],
+                            help='entries in the synthetic feeds')
+    arg_parser.add_argument('--repeat', type=int, default=3,
+                            help='how many times to parse each feed')
+    arg_parser.add_argument('feeds', nargs='*',
+                            help='recorded feed files to use instead')
+    args = arg_parser.parse_args()
+
+    if args.feeds:
+        sources = []
+        for path in args.feeds:
+            with open(path, 'rb') as fh:
+                sources.append((path, fh.read()))
+    else:
+        sources = [('synthetic (%s entries)' % entries,
+                    healthserver.make_feed('periodic-oslo-py27',
+                                           entries).encode('utf-8'))
+                   for entries in args.entries]
+    for name, content in sources:
+        print("%s, %0.1fKiB" % (name, len(content) / 1024.0))
+        expected = None
+        for parser_name, func in (('feedparser', feedparser.parse),
+                                  ('fast path', rssfeeds.parse)):
+            feed, took, peak = measure(func, content, args.repeat)
+            if expected is None:
+                expected = summarize(feed)
+            elif summarize(feed) != expected:
+                print("%s does not agree with feedparser!" % parser_name)
+                return 1
+            print("  %-10s %10.2fms cpu %10.1fKiB peak"
+                  % (parser_name, took * 1000, peak / 1024.0))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
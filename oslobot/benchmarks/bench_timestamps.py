@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare feed entry timestamp processing (dateutil vs the fast path).
+
+The baseline is how the plugin used to process a feed: parse every
+entry with dateutil to exclude old ones, parse the survivors again and
+sort them all to find the latest failure.
+"""
+
+import argparse
+import datetime
+import email.utils
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, 'plugins', 'oslobot'))
+
+from dateutil import parser  # noqa: E402
+from dateutil.relativedelta import relativedelta  # noqa: E402
+
+import feedmarks  # noqa: E402
+import timestamps  # noqa: E402
+
+
+class Entry(dict):
+    """Stand-in for a feedparser entry (attribute and key access)."""
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+def make_entries(count, now):
+    entries = []
+    for i in range(count):
+        published = now - datetime.timedelta(minutes=17 * i)
+        entries.append(Entry(
+            published=email.utils.format_datetime(published),
+            link='http://logs.openstack.org/%s/' % i))
+    return entries
+
+
+def baseline(entries, expire_after):
+    cleaned_entries = []
+    for e in entries:
+        if parser.parse(e.published) <= expire_after:
+            continue
+        cleaned_entries.append(e)
+    if not cleaned_entries:
+        return 0, None, None
+    fails = []
+    for e in cleaned_entries:
+        fails.append((e, parser.parse(e.published)))
+    latest_entry, latest_fail = sorted(fails, key=lambda e: e[1])[-1]
+    return len(fails), latest_entry, latest_fail
+
+
+def fast(entries, expire_after):
+    return feedmarks.scan(entries, expire_after=expire_after)
+
+
+def fast_cold(entries, expire_after):
+    timestamps.parse.cache_clear()
+    return feedmarks.scan(entries, expire_after=expire_after)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--entries', type=int, default=10000,
+                            help='number of entries in the synthetic feed')
+    arg_parser.add_argument('--repeat', type=int, default=3,
+                            help='number of timed runs (best is shown)')
+    args = arg_parser.parse_args()
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    entries = make_entries(args.entries, now)
+    expire_after = now + relativedelta(months=-1)
+    expected = baseline(entries, expire_after)
+    for func in (fast, fast_cold):
+        if func(entries, expire_after) != expected:
+            print("%s does not agree with the baseline!" % func.__name__)
+            return 1
+    print("%s entries (%s recent)" % (args.entries, expected[0]))
+    baseline_took = None
+    for func in (baseline, fast_cold, fast):
+        took = min(timeit.repeat(lambda: func(entries, expire_after),
+                                 number=1, repeat=args.repeat))
+        if baseline_took is None:
+            baseline_took = took
+        print("%-10s %8.2fms (%.1fx)" % (func.__name__, took * 1000,
+                                         baseline_took / took))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
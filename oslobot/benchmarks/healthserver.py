@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Local stand-in for the health (and eavesdrop) servers oslobot talks to.
+
+Serves synthetic (or recorded) periodic job rss feeds at
+``/runs/key/build_name/<build name>/recent/rss`` and meeting listings at
+``/meetings/<team>/<year>/``, with configurable latency and error
+rates. Recorded responses are looked up in a directory as
+``feeds/<build name>.rss`` and ``meetings/<team>/<year>.html``.
+
+It can be used from other benchmarks or run on its own.
+"""
+
+import argparse
+import datetime
+import email.utils
+import hashlib
+import http.client as http_client
+import http.server
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+FEED_PATH = re.compile(r'^/runs/key/build_name/([^/]+)/recent/rss$')
+MEETING_PATH = re.compile(r'^/meetings/([^/]+)/(\d{4})/$')
+NO_FAILED_RUNS = b'No Failed Runs'
+
+
+def make_feed(build_name, entries, now=None):
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+    items = []
+    for i in range(entries):
+        published = now - datetime.timedelta(hours=7 * i)
+        items.append(
+            '<item><title>%(build_name)s failed</title>'
+            '<link>http://logs.openstack.org/periodic/%(build_name)s/%(i)s/'
+            '</link><description>Failed run</description>'
+            '<pubDate>%(published)s</pubDate></item>'
+            % {'build_name': build_name, 'i': i,
+               'published': email.utils.format_datetime(published)})
+    return ('<?xml version="1.0" encoding="utf-8"?>\n'
+            '<rss version="2.0"><channel><title>Failures for %s</title>'
+            '<link>http://health.openstack.org/</link>%s</channel></rss>\n'
+            % (build_name, ''.join(items)))
+
+
+def make_listing(team, year, meetings):
+    rows = []
+    for i in range(meetings):
+        when = (datetime.datetime(year, 1, 1, 16) +
+                datetime.timedelta(days=7 * i))
+        if when.year != year:
+            break
+        base = '%s.%s' % (team, when.strftime('%Y-%m-%d-%H.%M'))
+        for suffix in ('.html', '.log.html', '.log.txt', '.txt'):
+            rows.append('<tr><td><a href="%(name)s">%(name)s</a></td></tr>'
+                        % {'name': base + suffix})
+    return ('<html><head><title>Index of /meetings/%s/%s</title></head>'
+            '<body><table>%s</table></body></html>\n'
+            % (team, year, '\n'.join(rows)))
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionError:
+            # Clients dropping pooled (keep-alive) connections is fine.
+            pass
+
+    def _reply(self, status, body, content_type='text/plain'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type + '; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.stand_in.handle(self)
+
+
+class HealthServer:
+    """Threaded http server pretending to be health/eavesdrop."""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, no_failures_rate=0.0, entries=20,
+                 meetings=40, meeting_years=(), recorded_dir=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.no_failures_rate = no_failures_rate
+        self.entries = entries
+        self.meetings = meetings
+        self.meeting_years = frozenset(meeting_years)
+        self.recorded_dir = recorded_dir
+        self.seed = seed
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = http.server.ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stand_in = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[0:2]
+        return 'http://%s:%s' % (host, port)
+
+    @property
+    def feed_url_tpl(self):
+        return (self.base_url +
+                '/runs/key/build_name/%(build_name)s/recent/rss')
+
+    @property
+    def meeting_url_tpl(self):
+        return self.base_url + '/meetings/%(team)s/%(year)s/'
+
+    def _random(self, path):
+        # Same path, same decisions (so runs can be compared).
+        digest = hashlib.sha1(('%s:%s' % (self.seed, path))
+                              .encode('utf-8')).hexdigest()
+        return random.Random(int(digest[0:16], 16))
+
+    def _recorded(self, *names):
+        if not self.recorded_dir:
+            return None
+        try:
+            with open(os.path.join(self.recorded_dir, *names), 'rb') as fh:
+                return fh.read()
+        except OSError:
+            return None
+
+    def handle(self, handler):
+        with self._lock:
+            self.requests += 1
+        rand = self._random(handler.path)
+        delay = self.latency + rand.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if rand.random() < self.error_rate:
+            handler._reply(http_client.INTERNAL_SERVER_ERROR,
+                           b'Internal Server Error')
+            return
+        match = FEED_PATH.match(handler.path)
+        if match:
+            build_name = match.group(1)
+            body = self._recorded('feeds', build_name + '.rss')
+            if body is None:
+                if rand.random() < self.no_failures_rate:
+                    handler._reply(http_client.BAD_REQUEST, NO_FAILED_RUNS)
+                    return
+                body = make_feed(build_name, self.entries).encode('utf-8')
+            handler._reply(http_client.OK, body,
+                           content_type='application/rss+xml')
+            return
+        match = MEETING_PATH.match(handler.path)
+        if match:
+            team, year = match.group(1), int(match.group(2))
+            body = self._recorded('meetings', team, '%s.html' % year)
+            if body is None and year in self.meeting_years:
+                body = make_listing(team, year,
+                                    self.meetings).encode('utf-8')
+            if body is not None:
+                handler._reply(http_client.OK, body,
+                               content_type='text/html')
+                return
+        handler._reply(http_client.NOT_FOUND, b'Not Found')
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name='health-stand-in')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds every response is delayed by')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='up to how many more seconds to delay by')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of responses that are 500 errors')
+    parser.add_argument('--no-failures-rate', type=float, default=0.0,
+                        help='fraction of feeds that are 400 "No Failed'
+                             ' Runs" responses')
+    parser.add_argument('--entries', type=int, default=20,
+                        help='entries in each synthetic feed')
+    parser.add_argument('--meeting-year', type=int, action='append',
+                        default=[], help='year that has meetings')
+    parser.add_argument('--recorded-dir',
+                        help='directory with recorded responses')
+    args = parser.parse_args()
+    server = HealthServer(host=args.host, port=args.port,
+                          latency=args.latency, jitter=args.jitter,
+                          error_rate=args.error_rate,
+                          no_failures_rate=args.no_failures_rate,
+                          entries=args.entries,
+                          meeting_years=args.meeting_year,
+                          recorded_dir=args.recorded_dir)
+    print("Serving feeds at %s" % server.feed_url_tpl)
+    print("Serving meetings at %s" % server.meeting_url_tpl)
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
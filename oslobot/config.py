@@ -4,8 +4,9 @@ import os
 BOT_DATA_DIR = os.path.join(os.getcwd(), 'data')
 BOT_EXTRA_PLUGIN_DIR = os.path.join(os.getcwd(), 'plugins')
 
-# We aren't really using this feature, so memory is fine.
-STORAGE = 'Memory'
+# Plugins keep some state (for example the periodic feed high-water
+# marks) that is better kept around between restarts.
+STORAGE = 'Shelf'
 
 BOT_LOG_FILE = None
 BOT_LOG_LEVEL = logging.DEBUG
@@ -0,0 +1,241 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Conditional-GET (ETag/Last-Modified) response cache for feeds."""
+
+import base64
+import hashlib
+import http.client as http_client
+import json
+import os
+import tempfile
+import threading
+import time
+
+import fetchers
+
+
+class FeedCache:
+    """Caches successful feed responses (optionally on disk).
+
+    Each cached url remembers the body, the ``ETag`` and ``Last-Modified``
+    validators and when it was last fetched (or revalidated). Responses
+    fetched within the last ``ttl`` seconds are served without any network
+    call; older ones are revalidated using ``If-None-Match`` and
+    ``If-Modified-Since`` and reused as is when the server says ``304``.
+
+    When cached on disk only the validators are kept in memory (bodies
+    are read back from disk when they are reused); failing to write the
+    cache is logged and only means the response is not cached.
+    """
+
+    def __init__(self, path=None, ttl=0, log=None):
+        self.path = path
+        self.ttl = ttl
+        self.log = log
+        self._entries = {}
+        self._parsed = {}
+        self._lock = threading.Lock()
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+
+    def _entry_path(self, url):
+        name = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, name + '.json')
+
+    def _load(self, url):
+        if not self.path:
+            return None
+        try:
+            with open(self._entry_path(url)) as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if entry.get('url') != url or 'content' not in entry:
+            # Someone else's (or an older, text only) entry.
+            return None
+        return entry
+
+    def _save(self, entry):
+        """Writes an entry to disk (returning whether that worked)."""
+        if not self.path:
+            return True
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            with os.fdopen(fd, 'w') as fh:
+                json.dump(entry, fh)
+            os.replace(tmp_path, self._entry_path(entry['url']))
+        except OSError as e:
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            if self.log is not None:
+                self.log.warning("Failed caching '%s' in '%s': %s",
+                                 entry['url'], self.path, e)
+            return False
+        return True
+
+    def _in_memory(self, entry):
+        if not self.path:
+            return entry
+        return {k: v for k, v in entry.items() if k != 'content'}
+
+    def _content(self, entry):
+        if 'content' not in entry:
+            stored = self._load(entry['url'])
+            if stored is None or stored['digest'] != entry['digest']:
+                return None
+            entry = stored
+        return base64.b64decode(entry['content'])
+
+    @staticmethod
+    def _make_response(entry, content):
+        text = content.decode(entry.get('encoding') or 'utf-8',
+                              errors='replace')
+        resp = fetchers.Response(entry['url'], http_client.OK,
+                                 'OK (cached)', text, content=content)
+        resp.digest = entry['digest']
+        return resp
+
+    def lookup(self, url):
+        """Returns the cache entry for the given url (or none)."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                entry = self._load(url)
+                if entry is not None:
+                    entry = self._in_memory(entry)
+                    self._entries[url] = entry
+            return entry
+
+    def is_fresh(self, entry, now=None):
+        if self.ttl <= 0:
+            return False
+        if now is None:
+            now = time.time()
+        return now - entry['fetched_at'] < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def to_response(self, entry):
+        """Returns the cached response (none if its body is gone)."""
+        content = self._content(entry)
+        if content is None:
+            return None
+        return self._make_response(entry, content)
+
+    def store(self, resp):
+        """Stores a successful response and returns the cached response."""
+        content = resp.content
+        entry = {
+            'url': resp.url,
+            'etag': resp.headers.get('ETag'),
+            'last_modified': resp.headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+            'digest': hashlib.sha1(content).hexdigest(),
+            # The raw body (the parser finds out its encoding itself).
+            'content': base64.b64encode(content).decode('ascii'),
+            'encoding': getattr(resp, 'encoding', None),
+        }
+        with self._lock:
+            if self._save(entry):
+                self._entries[resp.url] = self._in_memory(entry)
+            else:
+                # Whatever is still on disk is older but consistent.
+                self._entries.pop(resp.url, None)
+        return self._make_response(entry, content)
+
+    def touch(self, entry):
+        """Marks an entry as just revalidated (after a ``304``).
+
+        Returns the cached response (or none if its body is gone, in
+        which case the entry is forgotten).
+        """
+        content = self._content(entry)
+        with self._lock:
+            if content is None:
+                self._entries.pop(entry['url'], None)
+                return None
+            entry['fetched_at'] = time.time()
+            if self.path:
+                encoded = base64.b64encode(content).decode('ascii')
+                self._save(dict(entry, content=encoded))
+        return self._make_response(entry, content)
+
+    def parse(self, resp, parse_func):
+        """Parses a response, reusing the last parse of identical bodies."""
+        digest = getattr(resp, 'digest', None)
+        if digest is None:
+            return parse_func(resp.content)
+        with self._lock:
+            memo = self._parsed.get(resp.url)
+        if memo is not None and memo[0] == digest:
+            return memo[1]
+        parsed = parse_func(resp.content)
+        with self._lock:
+            self._parsed[resp.url] = (digest, parsed)
+        return parsed
+
+
+class CachingFetcher:
+    """Fetcher wrapper that answers (or revalidates) from a feed cache."""
+
+    def __init__(self, fetcher, cache):
+        self.fetcher = fetcher
+        self.cache = cache
+
+    @property
+    def name(self):
+        return self.fetcher.name
+
+    def submit(self, url, timeout=None, headers=None):
+        entry = self.cache.lookup(url)
+        if entry is not None and self.cache.is_fresh(entry):
+            resp = self.cache.to_response(entry)
+            if resp is not None:
+                return fetchers.completed(resp)
+            entry = None
+        req_headers = dict(headers or {})
+        if entry is not None:
+            req_headers.update(self.cache.conditional_headers(entry))
+
+        def on_done(fut):
+            resp = fut.result()
+            if resp.status_code == http_client.NOT_MODIFIED:
+                if entry is not None:
+                    cached = self.cache.touch(entry)
+                    if cached is not None:
+                        return cached
+            elif resp.status_code == http_client.OK:
+                if resp.url != url:
+                    # Store (and later lookup) under the url we asked
+                    # for, not wherever redirects may have ended up.
+                    resp.url = url
+                return self.cache.store(resp)
+            return resp
+
+        return fetchers.chain(
+            self.fetcher.submit(url, timeout=timeout, headers=req_headers),
+            on_done)
+
+    def shutdown(self):
+        self.fetcher.shutdown()
@@ -0,0 +1,189 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Processing (full or incremental) of health feed entries."""
+
+import collections
+
+import timestamps
+
+
+def scan(entries, expire_after=None, parse_date=timestamps.parse):
+    """Finds the recent (not expired) entries in a single pass.
+
+    Returns how many entries are recent as well as the latest recent
+    entry and when it was published (or none if nothing is recent).
+    """
+    recent = 0
+    latest_entry = latest_when = None
+    for e in entries:
+        when = parse_date(e.published)
+        if expire_after is not None and when <= expire_after:
+            continue
+        recent += 1
+        # Ties go to the entry furthest down the feed (which is what a
+        # stable sort over the feed entries picks as its last element).
+        if latest_when is None or when >= latest_when:
+            latest_entry, latest_when = e, when
+    return recent, latest_entry, latest_when
+
+
+class FeedMark:
+    """High-water mark (and running failure aggregates) of one build feed.
+
+    The mark remembers the newest entry seen (its published time, its
+    published string, its link and where it was in the feed) as well as
+    the (published time, published string, link, position) of the
+    failures that are still recent enough to be reported.
+
+    Merging a feed finds the newest entry seen by its published string and
+    link; entries further down the feed were seen before and are only
+    checked (by their published string and link) where failures are
+    expected to be, and entries up the feed are matched to the failures
+    already known there by their published string and link (as feeds are
+    not always ordered and entries can share their published time). Only
+    entries not seen before are parsed; when the feed does not look like
+    the one seen before (with entries added at the top and dropped off
+    the bottom) the aggregates are rebuilt from the whole feed instead.
+    """
+
+    def __init__(self, newest=None, newest_link=None, fails=None, key=None,
+                 newest_published=None, newest_index=None, size=None):
+        self.newest = newest
+        self.newest_link = newest_link
+        self.newest_published = newest_published
+        self.newest_index = newest_index
+        # How many entries the feed had (when last merged).
+        self.size = size
+        if fails is None:
+            fails = []
+        self.fails = fails
+        # What the aggregates were computed with (if that changes the
+        # mark is no longer valid and must be rebuilt).
+        self.key = key
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(newest=data['newest'], newest_link=data['newest_link'],
+                   fails=[list(f) for f in data['fails']],
+                   key=data.get('key'),
+                   newest_published=data.get('newest_published'),
+                   newest_index=data.get('newest_index'),
+                   size=data.get('size'))
+
+    def to_dict(self):
+        return {
+            'newest': self.newest,
+            'newest_link': self.newest_link,
+            'newest_published': self.newest_published,
+            'newest_index': self.newest_index,
+            'size': self.size,
+            'fails': [list(f) for f in self.fails],
+            'key': self.key,
+        }
+
+    def _find_newest(self, entries):
+        if self.newest_published is None or self.newest_index is None:
+            return None
+        for i, e in enumerate(entries):
+            if (e.published == self.newest_published and
+                    e.get('link') == self.newest_link):
+                return i
+        return None
+
+    def _rebuild(self, entries, parse_date):
+        known = collections.Counter((f[1], f[2]) for f in self.fails)
+        fails = []
+        new = 0
+        newest = None
+        for i, e in enumerate(entries):
+            link = e.get('link')
+            if known[(e.published, link)] > 0:
+                known[(e.published, link)] -= 1
+            else:
+                new += 1
+            published = parse_date(e.published).timestamp()
+            fails.append([published, e.published, link, i])
+            if newest is None or published > newest[0]:
+                newest = fails[-1]
+        self._reset(fails, newest, len(entries))
+        return new
+
+    def _reset(self, fails, newest, size):
+        self.fails = fails
+        self.size = size
+        if newest is None:
+            self.newest = self.newest_link = None
+            self.newest_published = self.newest_index = None
+        else:
+            self.newest, self.newest_published = newest[0], newest[1]
+            self.newest_link, self.newest_index = newest[2], newest[3]
+
+    def merge(self, entries, parse_date):
+        """Merges the entries of a whole feed into the mark.
+
+        Returns how many of the entries were not seen before (which are
+        the only ones parsed, unless the mark had to be rebuilt).
+        """
+        newest_at = self._find_newest(entries)
+        if newest_at is None or len(entries) - newest_at > (
+                self.size - self.newest_index):
+            # Never seen (or something got added under the newest entry).
+            return self._rebuild(entries, parse_date)
+        shift = newest_at - self.newest_index
+        fails = []
+        above = collections.defaultdict(list)
+        for published, published_str, link, index in self.fails:
+            index += shift
+            if index >= len(entries):
+                # Dropped off the bottom of the feed.
+                continue
+            if index < newest_at:
+                above[(published_str, link)].append(published)
+                continue
+            e = entries[index]
+            if e.published != published_str or e.get('link') != link:
+                return self._rebuild(entries, parse_date)
+            fails.append([published, published_str, link, index])
+        new = 0
+        newest = [self.newest, self.newest_published,
+                  self.newest_link, newest_at]
+        for i in range(newest_at):
+            e = entries[i]
+            link = e.get('link')
+            seen = above.get((e.published, link))
+            if seen:
+                fails.append([seen.pop(), e.published, link, i])
+                continue
+            new += 1
+            published = parse_date(e.published).timestamp()
+            fails.append([published, e.published, link, i])
+            if published > newest[0]:
+                newest = fails[-1]
+        if any(above.values()):
+            # Known failures moved (or vanished) up the feed.
+            return self._rebuild(entries, parse_date)
+        self._reset(fails, newest, len(entries))
+        return new
+
+    def expire(self, expire_after):
+        """Drops failures published at (or before) the given timestamp."""
+        self.fails = [f for f in self.fails if f[0] > expire_after]
+
+    def latest(self):
+        """Returns the (published string, link) of the latest failure."""
+        if not self.fails:
+            return None
+        # Ties go to the entry furthest down the feed (which is what a
+        # stable sort over the feed entries picks as its last element).
+        latest = max(self.fails, key=lambda f: (f[0], f[3]))
+        return latest[1], latest[2]
@@ -0,0 +1,339 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Fetch engines the oslobot plugin uses to retrieve remote urls.
+
+Every engine exposes the same ``submit(url, timeout=None, headers=None)``
+method which returns a :class:`concurrent.futures.Future` whose result
+looks enough like a ``requests`` response (``status_code``, ``reason``,
+``text``, ``content`` and ``headers``) that callers do not care which
+engine ran it.
+
+Engines also expose ``stream(url, consumer, timeout=None, headers=None)``
+which (for ``200`` responses) feeds the decoded body chunk by chunk into
+``consumer.feed(text)`` instead of keeping it around; the response the
+returned future resolves to then has no ``text``.
+
+Responses carry how long (in seconds) fetching took once it actually
+started (so not counting the time spent waiting for a free worker or
+pooled connection) as ``took``, and ``would_queue(url)`` tells if a
+fetch of a url submitted now would have to wait for one.
+"""
+
+import asyncio
+import codecs
+from concurrent import futures
+import http.client as http_client
+import threading
+import time
+from urllib import parse
+
+# Requests and aiohttp are slow to import, so they are only imported once
+# an engine (or response) needs them.
+
+
+def _import_aiohttp():
+    """Returns the aiohttp module (or none if it is not installed)."""
+    try:
+        import aiohttp
+    except ImportError:
+        return None
+    return aiohttp
+
+
+def _case_insensitive_dict(data=None):
+    from requests import structures
+    return structures.CaseInsensitiveDict(data)
+
+
+class Response:
+    """Minimal response (the parts of a ``requests`` response we use)."""
+
+    def __init__(self, url, status_code, reason, text, headers=None,
+                 took=None, content=None):
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.text = text
+        self.content = content
+        if headers is None:
+            headers = _case_insensitive_dict()
+        self.headers = headers
+        self.took = took
+
+    def __repr__(self):
+        return "<Response [%s] %s>" % (self.status_code, self.url)
+
+
+def chain(fut, func, executor=None):
+    """Returns a future that resolves to ``func(fut)`` once ``fut`` is done.
+
+    The function is called from whatever thread finishes ``fut`` unless
+    an executor to call it with is given. Cancelling the returned future
+    also cancels the source future.
+    """
+    chained = futures.Future()
+
+    def run(fut):
+        if not chained.set_running_or_notify_cancel():
+            return
+        try:
+            chained.set_result(func(fut))
+        except BaseException as e:
+            chained.set_exception(e)
+
+    def on_done(fut):
+        if executor is None:
+            run(fut)
+            return
+        try:
+            executor.submit(run, fut)
+        except RuntimeError as e:
+            # The executor was shut down already...
+            if chained.set_running_or_notify_cancel():
+                chained.set_exception(e)
+
+    def on_chained_done(chained):
+        if chained.cancelled():
+            fut.cancel()
+
+    chained.add_done_callback(on_chained_done)
+    fut.add_done_callback(on_done)
+    return chained
+
+
+def completed(result):
+    """Returns an already finished future with the given result."""
+    fut = futures.Future()
+    fut.set_result(result)
+    return fut
+
+
+def split_timeout(timeout):
+    """Splits a requests style timeout into (connect, read) timeouts."""
+    if isinstance(timeout, (tuple, list)):
+        connect_timeout, read_timeout = timeout
+    else:
+        connect_timeout = read_timeout = timeout
+    return connect_timeout, read_timeout
+
+
+# How many bytes to read (at most) at once when streaming.
+CHUNK_SIZE = 16 * 1024
+
+
+def _get(url, timeout=None, headers=None):
+    import requests
+    started = time.monotonic()
+    r = requests.get(url, timeout=timeout, headers=headers)
+    r.took = time.monotonic() - started
+    return r
+
+
+def _stream_get(url, consumer, timeout=None, headers=None):
+    import requests
+    started = time.monotonic()
+    with requests.get(url, timeout=timeout, headers=headers,
+                      stream=True) as r:
+        if r.status_code == http_client.OK:
+            if r.encoding is None:
+                r.encoding = 'utf-8'
+            for chunk in r.iter_content(CHUNK_SIZE, decode_unicode=True):
+                consumer.feed(chunk)
+        return Response(url, r.status_code, r.reason, None,
+                        headers=r.headers, took=time.monotonic() - started)
+
+
+class ThreadFetcher:
+    """Fetcher that runs blocking ``requests.get`` calls in a thread pool.
+
+    Each fetch opens its own connection; this is the original (and
+    fallback) way the plugin fetched urls.
+    """
+
+    name = 'thread'
+
+    def __init__(self, max_workers=3):
+        self.max_workers = max_workers
+        self.executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    def _track(self, fut):
+        with self._lock:
+            self._inflight += 1
+        fut.add_done_callback(self._untrack)
+        return fut
+
+    def _untrack(self, fut):
+        with self._lock:
+            self._inflight -= 1
+
+    def would_queue(self, url):
+        with self._lock:
+            return self._inflight >= self.max_workers
+
+    def submit(self, url, timeout=None, headers=None):
+        return self._track(self.executor.submit(
+            _get, url, timeout=timeout, headers=headers))
+
+    def stream(self, url, consumer, timeout=None, headers=None):
+        return self._track(self.executor.submit(
+            _stream_get, url, consumer, timeout=timeout, headers=headers))
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+
+class AsyncioFetcher:
+    """Fetcher that uses a pooled (keep-alive) aiohttp client session.
+
+    The session lives in an event loop that runs in its own daemon
+    thread, so callers from plain (errbot) threads just get back normal
+    futures. The connection pool caps the total number of connections
+    (``concurrency``) as well as connections per host (``per_host``);
+    fetches beyond those limits wait for a pooled connection to free up.
+    """
+
+    name = 'asyncio'
+
+    def __init__(self, concurrency=10, per_host=4, keepalive_timeout=30.0):
+        self.aiohttp = _import_aiohttp()
+        if self.aiohttp is None:
+            raise RuntimeError("The asyncio fetch engine requires"
+                               " the 'aiohttp' library")
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._inflight = 0
+        self._inflight_hosts = {}
+        self._lock = threading.Lock()
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop,
+                                        name='oslobot-fetcher')
+        self._thread.daemon = True
+        self._thread.start()
+        self._session = self._call(self._make_session()).result()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def _make_session(self):
+        aiohttp = self.aiohttp
+
+        async def on_connection_queued_end(session, context, params):
+            # Got a pooled connection (after waiting for one), so the
+            # fetch only really starts now.
+            context.trace_request_ctx['started'] = time.monotonic()
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_queued_end.append(
+            on_connection_queued_end)
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency, limit_per_host=self.per_host,
+            keepalive_timeout=self.keepalive_timeout)
+        return aiohttp.ClientSession(connector=connector,
+                                     trace_configs=[trace_config])
+
+    def would_queue(self, url):
+        host = parse.urlsplit(url).netloc
+        with self._lock:
+            return ((self.concurrency and
+                     self._inflight >= self.concurrency) or
+                    (self.per_host and
+                     self._inflight_hosts.get(host, 0) >= self.per_host))
+
+    def _track(self, url, fut):
+        host = parse.urlsplit(url).netloc
+        with self._lock:
+            self._inflight += 1
+            self._inflight_hosts[host] = self._inflight_hosts.get(host, 0) + 1
+
+        def untrack(fut):
+            with self._lock:
+                self._inflight -= 1
+                self._inflight_hosts[host] -= 1
+                if not self._inflight_hosts[host]:
+                    del self._inflight_hosts[host]
+
+        fut.add_done_callback(untrack)
+        return fut
+
+    async def _fetch(self, url, timeout, headers, consumer=None):
+        connect_timeout, read_timeout = split_timeout(timeout)
+        client_timeout = self.aiohttp.ClientTimeout(
+            sock_connect=connect_timeout, sock_read=read_timeout)
+        trace_ctx = {'started': time.monotonic()}
+        try:
+            async with self._session.get(url, timeout=client_timeout,
+                                         headers=headers,
+                                         trace_request_ctx=trace_ctx) as resp:
+                if consumer is None:
+                    content = await resp.read()
+                    # Decodes the body read above (it is not read twice).
+                    text = await resp.text()
+                else:
+                    text = content = None
+                    if resp.status == http_client.OK:
+                        decoder = codecs.getincrementaldecoder(
+                            resp.charset or 'utf-8')(errors='replace')
+                        async for chunk in resp.content.iter_chunked(
+                                CHUNK_SIZE):
+                            consumer.feed(decoder.decode(chunk))
+                        consumer.feed(decoder.decode(b'', final=True))
+                resp_headers = _case_insensitive_dict(resp.headers)
+                return Response(url, resp.status, resp.reason, text,
+                                headers=resp_headers,
+                                took=time.monotonic() - trace_ctx['started'],
+                                content=content)
+        except asyncio.TimeoutError:
+            # Keep the same exception type the thread engine raises so
+            # that callers only need to handle one kind of timeout.
+            import requests
+            raise requests.Timeout("Fetching '%s' timed out" % url)
+
+    def submit(self, url, timeout=None, headers=None):
+        return self._track(url, self._call(self._fetch(url, timeout,
+                                                       headers)))
+
+    def stream(self, url, consumer, timeout=None, headers=None):
+        return self._track(url, self._call(self._fetch(url, timeout, headers,
+                                                       consumer=consumer)))
+
+    def shutdown(self):
+        if self.loop.is_closed():
+            return
+        self._call(self._session.close()).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+def make_fetcher(engine, max_workers=3, concurrency=10, per_host=4,
+                 log=None):
+    """Creates the named fetch engine (falling back to threads)."""
+    if engine == AsyncioFetcher.name:
+        if _import_aiohttp() is not None:
+            return AsyncioFetcher(concurrency=concurrency,
+                                  per_host=per_host)
+        if log is not None:
+            log.warning("The '%s' fetch engine is not available (is"
+                        " aiohttp installed?), falling back to the '%s'"
+                        " fetch engine", engine, ThreadFetcher.name)
+    elif engine != ThreadFetcher.name and log is not None:
+        log.warning("Unknown fetch engine '%s', falling back to the"
+                    " '%s' fetch engine", engine, ThreadFetcher.name)
+    return ThreadFetcher(max_workers=max_workers)
@@ -0,0 +1,181 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Local (sqlite) history of periodic job failures and results."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import timestamps
+
+DAY = 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    project TEXT NOT NULL,
+    py_version TEXT NOT NULL,
+    published REAL NOT NULL,
+    link TEXT NOT NULL,
+    PRIMARY KEY (project, py_version, published, link)
+);
+CREATE INDEX IF NOT EXISTS entries_published ON entries (published);
+CREATE TABLE IF NOT EXISTS results (
+    project TEXT NOT NULL,
+    py_version TEXT NOT NULL,
+    computed_at REAL NOT NULL,
+    checked_at REAL NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (project, py_version, computed_at)
+);
+CREATE INDEX IF NOT EXISTS results_checked_at ON results (checked_at);
+"""
+
+
+def format_py_version(py_version):
+    return ".".join(str(p) for p in py_version)
+
+
+def parse_py_version(text):
+    return tuple(int(p) for p in text.split("."))
+
+
+class HistoryStore:
+    """Failure entries (of periodic job feeds) and results, over time.
+
+    Failure entries are keyed by (project, python version, published
+    time, link); results are only stored when they differ from the
+    previous result of the same project and python version (otherwise
+    that one is just marked as checked again).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def record(self, project, py_version, result, entries=None,
+               computed_at=None):
+        """Records a result (and the feed entries it was computed from)."""
+        if computed_at is None:
+            computed_at = time.time()
+        py_version = format_py_version(py_version)
+        result = json.dumps(result, sort_keys=True)
+        rows = []
+        for entry in entries or ():
+            try:
+                published = timestamps.parse(entry['published'])
+            except (KeyError, TypeError, ValueError, OverflowError):
+                continue
+            rows.append((project, py_version, published.timestamp(),
+                         entry.get('link') or ''))
+        with self._lock, self._conn:
+            last = self._conn.execute(
+                "SELECT computed_at, result FROM results"
+                " WHERE project = ? AND py_version = ?"
+                " ORDER BY computed_at DESC LIMIT 1",
+                (project, py_version)).fetchone()
+            if last is not None and last[1] == result:
+                self._conn.execute(
+                    "UPDATE results SET checked_at = ?"
+                    " WHERE project = ? AND py_version = ?"
+                    " AND computed_at = ?",
+                    (computed_at, project, py_version, last[0]))
+            else:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                    (project, py_version, computed_at, computed_at, result))
+            if rows:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO entries VALUES (?, ?, ?, ?)",
+                    rows)
+
+    def latest_results(self):
+        """Returns the latest result (and when it was last checked) of
+        every project and python version."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT project, py_version, checked_at, result"
+                " FROM results JOIN ("
+                "  SELECT project, py_version,"
+                "  MAX(computed_at) AS computed_at"
+                "  FROM results GROUP BY project, py_version"
+                " ) USING (project, py_version, computed_at)"
+            ).fetchall()
+        latest = {}
+        for project, py_version, checked_at, result in rows:
+            latest[(project, parse_py_version(py_version))] = (
+                checked_at, json.loads(result))
+        return latest
+
+    def failures(self, project, since, limit=None):
+        """Returns (published, python version, link) of failures of a
+        project since some time (newest first)."""
+        query = ("SELECT published, py_version, link FROM entries"
+                 " WHERE project = ? AND published >= ?"
+                 " ORDER BY published DESC")
+        params = [project, since]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [(published, parse_py_version(py_version), link)
+                for published, py_version, link in rows]
+
+    def daily_failures(self, projects, days, now=None):
+        """Returns failures per day (oldest first) of the last days.
+
+        Keyed by (project, python version); only those with failures are
+        included.
+        """
+        if now is None:
+            now = time.time()
+        since = now - days * DAY
+        placeholders = ", ".join("?" for _project in projects)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT project, py_version,"
+                " CAST((published - ?) / ? AS INTEGER) AS day, COUNT(*)"
+                " FROM entries WHERE published >= ? AND project IN (%s)"
+                " GROUP BY project, py_version, day" % placeholders,
+                [since, DAY, since] + list(projects)).fetchall()
+        counts = {}
+        for project, py_version, day, count in rows:
+            key = (project, parse_py_version(py_version))
+            try:
+                per_day = counts[key]
+            except KeyError:
+                per_day = counts[key] = [0] * days
+            per_day[min(day, days - 1)] += count
+        return counts
+
+    def prune(self, before):
+        """Forgets failures published (and results checked) before a time."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE published < ?",
+                               (before,))
+            self._conn.execute("DELETE FROM results WHERE checked_at < ?",
+                               (before,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,144 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Declarative matrices of periodic jobs (to check all at once).
+
+A matrix is made of projects, python versions and (named) build name
+templates; every combination of them is a cell, whose build name is its
+template filled in with its project name and python version (as in
+``py27``). Cells of different templates may well name the same build
+(a template need not use the python version, for example), which is
+then only fetched once.
+"""
+
+import collections
+
+# Name of the template made from the 'periodic_build_name_tpl' setting.
+DEFAULT_TEMPLATE = 'default'
+
+GROUPED = 'grouped'
+PIVOT = 'pivot'
+LAYOUTS = (GROUPED, PIVOT)
+
+Cell = collections.namedtuple('Cell', ['template', 'project_name',
+                                       'py_version'])
+
+
+def build_name(template, project_name, py_version):
+    """Fills in a build name template (for a project and python version)."""
+    return template % {
+        'project_name': project_name,
+        'py_version': "py" + "".join(str(p) for p in py_version),
+    }
+
+
+def _unique(items):
+    return list(collections.OrderedDict.fromkeys(items))
+
+
+class Matrix:
+    """Projects x python versions x (named) build name templates."""
+
+    def __init__(self, project_names, py_versions, templates):
+        self.project_names = _unique(project_names)
+        self.py_versions = _unique(tuple(py_ver) for py_ver in py_versions)
+        # Template name -> template (in the order given).
+        self.templates = collections.OrderedDict(templates)
+
+    def __len__(self):
+        return (len(self.templates) * len(self.project_names) *
+                len(self.py_versions))
+
+    def cells(self):
+        """Returns every cell (template by template, then project by
+        project)."""
+        return [Cell(name, project_name, py_ver)
+                for name in self.templates
+                for project_name in self.project_names
+                for py_ver in self.py_versions]
+
+    def builds(self):
+        """Returns the build name of every cell."""
+        return collections.OrderedDict(
+            (cell, build_name(self.templates[cell.template],
+                              cell.project_name, cell.py_version))
+            for cell in self.cells())
+
+    def grouped(self, results):
+        """Returns (template, [(cell, result)...]) for every template (with
+        a result of any of its cells)."""
+        groups = []
+        for name in self.templates:
+            rows = [(cell, results[cell]) for cell in self.cells()
+                    if cell.template == name and cell in results]
+            if rows:
+                groups.append((name, rows))
+        return groups
+
+    def pivoted(self, results):
+        """Returns column keys (template, python version) and rows of
+        (project name, [result (or none) of each column]).
+
+        Templates (and python versions) that none of the results are of
+        get no column.
+        """
+        columns = [(name, py_ver)
+                   for name in self.templates
+                   for py_ver in self.py_versions
+                   if any(Cell(name, project_name, py_ver) in results
+                          for project_name in self.project_names)]
+        rows = []
+        for project_name in self.project_names:
+            row = [results.get(Cell(name, project_name, py_ver))
+                   for name, py_ver in columns]
+            if any(result is not None for result in row):
+                rows.append((project_name, row))
+        return columns, rows
+
+
+def parse_query(args):
+    """Splits (command) arguments into what a matrix is made of.
+
+    Arguments are project names, ``team:<team>``, ``py:<version>`` (like
+    ``py:2.7``), ``tpl:<template name>`` or a layout (``grouped`` or
+    ``pivot``); returns a dict of the project names, teams, python
+    versions, template names (all lists) and layout (or none) found.
+
+    Raises ``ValueError`` on malformed python versions.
+    """
+    query = {
+        'project_names': [],
+        'teams': [],
+        'py_versions': [],
+        'templates': [],
+        'layout': None,
+    }
+    for arg in args:
+        kind, sep, value = arg.partition(":")
+        if not sep:
+            if arg in LAYOUTS:
+                query['layout'] = arg
+            else:
+                query['project_names'].append(arg)
+        elif kind == 'team':
+            query['teams'].append(value)
+        elif kind == 'py':
+            try:
+                query['py_versions'].append(
+                    tuple(int(p) for p in value.split(".")))
+            except ValueError:
+                raise ValueError("Malformed python version '%s'" % value)
+        elif kind == 'tpl':
+            query['templates'].append(value)
+        else:
+            query['project_names'].append(arg)
+    return query
@@ -0,0 +1,183 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Index of (eavesdrop) meeting notes urls of teams."""
+
+from datetime import date
+import http.client as http_client
+import re
+import threading
+import time
+
+
+# Links in (apache) directory listings look like ``<a href="...">``.
+_HREF = re.compile(r"""href\s*=\s*["']([^"'<>]*)["']""", re.IGNORECASE)
+
+
+class NotesLinkExtractor:
+    """Incrementally finds the newest notes link of a team in a listing.
+
+    Chunks of the listing are scanned as they arrive; only the part of a
+    chunk after its last complete link that may still become a link
+    (starting at the last ``<``) is carried over to the next chunk.
+    """
+
+    max_carry = 4096
+
+    def __init__(self, team):
+        self.team = team
+        self.latest = None
+        self._seen = set()
+        self._carry = ''
+
+    def _consider(self, link):
+        if (not link.startswith(self.team) or
+                not link.endswith('.html') or link.endswith('.log.html')):
+            return
+        if link not in self._seen:
+            self._seen.add(link)
+            # Listings are sorted by name (and the names start with the
+            # meeting date) so the last new link is the newest one.
+            self.latest = link
+
+    def feed(self, chunk):
+        text = self._carry + chunk
+        end = 0
+        for m in _HREF.finditer(text):
+            self._consider(m.group(1))
+            end = m.end()
+        tag_start = text.rfind('<', end)
+        if tag_start == -1 or len(text) - tag_start > self.max_carry:
+            self._carry = ''
+        else:
+            self._carry = text[tag_start:]
+
+    def close(self):
+        self._carry = ''
+        return self.latest
+
+
+class MeetingIndex:
+    """Caches the latest meeting notes url (per year) of teams.
+
+    Building the index of a team probes all candidate years (from the
+    current one back to ``start_year``) concurrently; refreshing it only
+    probes the years from the latest one known to have notes onward (as
+    older years do not get new meetings).
+
+    Teams without any notes (typos and such) are forgotten once they
+    expire, and only the ``max_unknown`` most recently asked for ones
+    are kept until then.
+    """
+
+    # How many teams without any notes are remembered (at most).
+    max_unknown = 64
+
+    def __init__(self, fetcher, url_tpl, start_year,
+                 timeout=None, ttl=3600, log=None):
+        self.fetcher = fetcher
+        self.url_tpl = url_tpl
+        self.start_year = start_year
+        self.timeout = timeout
+        self.ttl = ttl
+        self.log = log
+        self._teams = {}
+        self._lock = threading.Lock()
+
+    def _probe(self, team, years):
+        futs = []
+        for year in years:
+            meeting_url = self.url_tpl % {'team': team, 'year': year}
+            extractor = NotesLinkExtractor(team)
+            fut = self.fetcher.stream(meeting_url, extractor,
+                                      timeout=self.timeout)
+            futs.append((year, meeting_url, extractor, fut))
+        urls = {}
+        complete = True
+        for year, meeting_url, extractor, fut in futs:
+            try:
+                resp = fut.result()
+            except Exception as e:
+                if self.log is not None:
+                    self.log.debug("Failed probing %s for team %s: %s",
+                                   meeting_url, team, e)
+                complete = False
+            else:
+                if resp.status_code != http_client.OK:
+                    continue
+                link = extractor.close()
+                if link:
+                    urls[year] = meeting_url + link
+        return urls, complete
+
+    def _forget_unknown(self, now, room=0):
+        unknown = sorted((built_at, team) for team, (built_at, urls, _complete)
+                         in self._teams.items() if not urls)
+        excess = len(unknown) + room - self.max_unknown
+        for i, (built_at, team) in enumerate(unknown):
+            if i < excess or now - built_at >= self.ttl:
+                del self._teams[team]
+
+    def refresh(self, team):
+        """(Re)builds the index of a team and returns its urls per year."""
+        with self._lock:
+            try:
+                _built_at, known_urls, complete = self._teams[team]
+            except KeyError:
+                known_urls, complete = {}, False
+        now_year = date.today().year
+        # Only rescan everything when the last scan did not finish (the
+        # years without notes might have just timed out).
+        if known_urls and complete:
+            from_year = max(known_urls)
+        else:
+            from_year = self.start_year
+        urls, probe_complete = self._probe(team,
+                                           range(now_year, from_year - 1, -1))
+        if from_year != self.start_year:
+            merged_urls = dict(known_urls)
+            merged_urls.update(urls)
+            urls = merged_urls
+        now = time.time()
+        with self._lock:
+            self._teams.pop(team, None)
+            if not urls:
+                self._forget_unknown(now, room=1)
+            self._teams[team] = (now, urls, probe_complete)
+        if self.log is not None:
+            self.log.debug("Indexed %s years with meeting notes for"
+                           " team %s", len(urls), team)
+        return urls
+
+    def refresh_all(self):
+        """Refreshes the index of every team that has meeting notes."""
+        # Teams without any notes (typos and such) are not worth probing
+        # every year of again and again; asking for them rebuilds them.
+        with self._lock:
+            self._forget_unknown(time.time())
+            teams = [team for team, (_built_at, urls, _complete)
+                     in self._teams.items() if urls]
+        for team in teams:
+            self.refresh(team)
+
+    def latest(self, team):
+        """Returns the latest meeting notes url of a team (or none)."""
+        with self._lock:
+            try:
+                built_at, urls, _complete = self._teams[team]
+            except KeyError:
+                built_at = urls = None
+        if urls is None or time.time() - built_at >= self.ttl:
+            urls = self.refresh(team)
+        if not urls:
+            return None
+        return urls[max(urls)]
@@ -13,22 +13,34 @@
 import collections
 from concurrent import futures
 import copy
-from datetime import date
+import functools
 import http.client as http_client
 import io
-import json
-import re
-from urllib.parse import urlencode as compat_urlencode
-
-from dateutil import parser
-from dateutil.relativedelta import relativedelta
+import os
+import sqlite3
+import threading
+import time
 
 from errbot import botcmd
 from errbot import BotPlugin
-import feedparser
-from oslo_utils import timeutils
-import requests
-from tabulate import tabulate
+from errbot import botplugin
+from oslo_tools import project_index
+
+import feedcache
+import feedmarks
+import fetchers
+import history
+import matrix
+import meetings
+import outbox
+import profiling
+import resilience
+import rssfeeds
+import shorteners
+import singleflight
+import snapshots
+import stats
+import timestamps
 
 BAD_VALUE = '??'
 NA_VALUE = "N/A"
@@ -38,66 +50,19 @@ def str_split(text):
     return text.split()
 
 
-class GoogleShortener:
-    """Shortener that uses google shortening service (requires api key).
-
-    See: https://developers.google.com/url-shortener/v1/
-    """
-
-    base_request_url = 'https://www.googleapis.com/urlshortener/v1/url?'
-
-    def __init__(self, log, api_key,
-                 timeout=None, cache=None):
-        self.log = log
-        self.api_key = api_key
-        self.timeout = timeout
-        if cache is None:
-            cache = {}
-        self.cache = cache
-
-    def safe_shorten(self, long_url):
-        try:
-            return self.shorten(long_url)
-        except (OSError, ValueError, TypeError):
-            self.log.exception("Failed shortening due to unexpected error, "
-                               " providing back long url.")
-            return long_url
-
-    def shorten(self, long_url):
-        if long_url in self.cache:
-            return self.cache[long_url]
-        post_data = json.dumps({
-            'longUrl': long_url,
-        })
-        query_params = {
-            'key': self.api_key,
-        }
-        req_url = self.base_request_url + compat_urlencode(query_params)
-        try:
-            req = requests.post(req_url, data=post_data,
-                                headers={'content-type': 'application/json'},
-                                timeout=self.timeout)
-        except requests.Timeout:
-            raise OSError("Unable to shorten '%s' url"
-                          " due to http request timeout being"
-                          " reached" % (long_url))
-        else:
-            if req.status_code != http_client.OK:
-                raise OSError("Unable to shorten '%s' url due to http"
-                              " error '%s' (%s)" % (long_url, req.reason,
-                                                    req.status_code))
-            try:
-                small_url = req.json()['id']
-                self.cache[long_url] = small_url
-                return small_url
-            except (KeyError, ValueError, TypeError) as e:
-                raise OSError("Unable to shorten '%s' url due to request"
-                              " extraction error: %s" % (long_url, e))
+def tabulate(*args, **kwargs):
+    # Imported when first used (like the other slow to import libraries
+    # only some commands need) to keep loading the plugin quick.
+    from tabulate import tabulate as _tabulate
+    return _tabulate(*args, **kwargs)
 
 
 class OsloBotPlugin(BotPlugin):
     OS_START_YEAR = 2010
     DEF_FETCH_WORKERS = 3
+    DEF_LATE_WORKERS = 2
+    DEF_PROCESS_WORKERS = 2
+    HISTORY_LIMIT = 25
     DEF_CONFIG = {
         # Check periodic jobs every 24 hours (by default); the jobs
         # currently run daily, so running it quicker isn't to useful...
@@ -105,7 +70,6 @@ class OsloBotPlugin(BotPlugin):
         # If it is negative or zero, then that means never do it...
         'periodic_check_frequency': -1,
         'periodic_python_versions': [(3, 4), (2, 7)],
-        # TODO(harlowja): fetch this from the webpage itself?
         'periodic_project_names': [
             'ceilometer',
             'cinder',
@@ -120,33 +84,175 @@ class OsloBotPlugin(BotPlugin):
             'octavia',
             'trove',
         ],
+        # Where the names of the projects to check (when none are given)
+        # come from, either 'config' (the names above) or 'governance'
+        # (the repos of the 'periodic_project_teams' teams, or of all
+        # teams if none are given, in the governance projects.yaml file,
+        # which is fetched again when older than 'periodic_projects_ttl'
+        # seconds); the names above are used if that fails. Blank team
+        # names are ignored (errbot checks configured lists against the
+        # first item of the default one, so it must have an item).
+        'periodic_project_source': 'config',
+        'periodic_project_teams': [''],
+        'periodic_projects_url': ("https://opendev.org/openstack/governance"
+                                  "/raw/branch/master/reference/"
+                                  "projects.yaml"),
+        'periodic_projects_ttl': 24 * 60 * 60,
+        'periodic_projects_fetch_timeout': 30.0,
         'periodic_shorten': False,
         'periodic_build_name_tpl': ('periodic-%(project_name)s-%(py_version)s'
                                     '-with-oslo-master'),
+        # More (named) build name templates that the 'periodic_matrix'
+        # command checks projects with (besides 'periodic_build_name_tpl',
+        # which is named 'default'), like stable branch jobs or the
+        # 'with-oslo-master' jobs of other libraries; all of their builds
+        # are fetched in one go (and builds that more than one template
+        # name only once).
+        'periodic_matrix_templates': {},
+        # How 'periodic_matrix' lays out results, either 'pivot' (a row
+        # per project and a status column per template and python
+        # version) or 'grouped' (a full row per build, grouped by
+        # template).
+        'periodic_matrix_layout': 'pivot',
         # Fetch timeout for trying to get a projects health rss
         # url (seems like this needs to be somewhat high as the
         # infra system that gets this seems to not always be healthy).
         'periodic_fetch_timeout': 30.0,
         'periodic_connect_timeout': 1.0,
+        # Once enough response times of the health server have been seen,
+        # lower the fetch timeout to this many times their 99th percentile
+        # (but no lower than the minimum below).
+        'periodic_adaptive_timeouts': True,
+        'periodic_adaptive_timeout_factor': 3.0,
+        'periodic_adaptive_timeout_min': 2.0,
+        # Send a second (hedged) request for feeds that take longer than
+        # the 95th percentile of response times (and use the first one
+        # that comes back).
+        'periodic_hedge': True,
+        # Stop fetching from the health server after this many failures
+        # in a row (zero means never) and report it as unavailable until
+        # a probe request (sent every cooldown seconds) works again.
+        'periodic_breaker_failures': 5,
+        'periodic_breaker_cooldown': 30.0,
+        # Engine used to fetch the health rss urls, either 'asyncio' (a
+        # pooled keep-alive http client, requires aiohttp) or 'thread'
+        # (one plain requests call per url from a thread pool).
+        'periodic_fetch_engine': 'asyncio',
+        # Number of fetching threads (thread engine only).
+        'periodic_fetch_workers': DEF_FETCH_WORKERS,
+        # Maximum number of feeds being fetched (and parsed) at once, more
+        # are queued until others finish (concurrent checks share the
+        # fetches of the same builds); zero (or less) means no limit.
+        'periodic_max_inflight': 100,
+        # Total number of concurrent connections (asyncio engine only).
+        'periodic_fetch_concurrency': 10,
+        # Maximum number of concurrent connections to a single
+        # host (asyncio engine only).
+        'periodic_fetch_per_host': 4,
+        # Cache fetched health rss feeds (and revalidate them using
+        # their etag/last-modified headers instead of refetching them).
+        'periodic_cache': True,
+        # Feeds fetched (or revalidated) less than this many seconds ago
+        # are used as is, without asking the server at all.
+        'periodic_cache_ttl': 0,
+        # Where to cache feeds on disk; empty means the bots data
+        # directory, none means only cache in memory.
+        'periodic_cache_dir': '',
         'periodic_url_tpl': ("http://health.openstack.org/runs/key/"
                              "build_name/%(build_name)s/recent/rss"),
         # See: https://pypi.org/project/tabulate
         'tabulate_format': 'plain',
+        # Answer periodic checks from a snapshot of the last computed
+        # results (refreshing them in the background when they are older
+        # than 'periodic_snapshot_max_age' seconds); projects not in the
+        # snapshot yet are still fetched before answering.
+        'periodic_snapshot': True,
+        'periodic_snapshot_max_age': 15 * 60,
+        # How long (in seconds) to wait for periodic results before
+        # replying with what is in (zero or negative to wait for all of
+        # them); what is not in is then either reported as pending and
+        # followed by an update once it is in ('update') or is
+        # cancelled ('cancel').
+        'periodic_report_budget': 10.0,
+        'periodic_report_late': 'update',
+        # What the periodic report (see 'periodic_check_frequency') sends,
+        # either 'full' (the whole table every time) or 'changes' (only
+        # rows whose status or last failure changed since the last
+        # report).
+        'periodic_report_mode': 'full',
+        # File to (re)write the periodic check stats to (in prometheus
+        # text format) after every check; empty to not do that.
+        'periodic_stats_file': '',
+        # Keep the failures (and results) of periodic jobs in a local
+        # sqlite database (in the bots data directory unless a file is
+        # given) for the history/trend commands and to start from the
+        # last known results after restarts; entries older than the max
+        # age (in seconds) are forgotten.
+        'periodic_history': True,
+        'periodic_history_file': '',
+        'periodic_history_max_age': 90 * 24 * 60 * 60,
+        # How often (in seconds) to forget what is older than that.
+        'periodic_history_prune_frequency': 60 * 60,
+        # How many days 'periodic_trend' looks back (by default).
+        'periodic_trend_days': 14,
+        # How often (in seconds) to refresh the stale results of the
+        # snapshot in the background (zero or negative to never do it);
+        # never done when 'periodic_check_frequency' is off.
+        'periodic_snapshot_refresh_frequency': 5 * 60,
+        # Merge feed entries into the failures seen before for each
+        # build (instead of processing whole feeds every time), this
+        # can be 'on', 'off' (always process whole feeds) or 'verify' (do
+        # both and log, and use the full result, when they disagree).
+        'periodic_incremental': 'on',
         'periodic_exclude_when': {
             # Exclude failure results that are more than X months old...
             #
             # See: https://dateutil.readthedocs.io/en/stable/relativedelta.html
             'months': -1,
         },
+        # Messages are sent from a queue that paces them (per room or
+        # person) to at most this many lines per second, after allowing
+        # bursts of 'outbound_burst' lines; zero (or less) means no
+        # pacing.
+        'outbound_rate': 1.0,
+        'outbound_burst': 5,
         'meeting_team': 'oslo',
         'meeting_url_tpl': ("http://eavesdrop.openstack.org"
                             "/meetings/%(team)s/%(year)s/"),
         'meeting_fetch_timeout': 10.0,
+        # How long (in seconds) a teams index of meeting notes urls is
+        # used before it is rebuilt.
+        'meeting_index_ttl': 3600,
+        # Refresh the indexes of all teams asked about every this many
+        # seconds in the background (zero or negative to never do it).
+        'meeting_index_refresh_frequency': 1800,
+        # Either 'google' or 'local' (which makes up short urls that
+        # do not resolve to anything, useful for testing).
+        'shortener_backend': 'google',
         # Required if shortening is enabled, see,
         # https://developers.google.com/url-shortener/v1/getting_started#APIKey
         'shortener_api_key': "",
         'shortener_fetch_timeout': 5.0,
         'shortener_connect_timeout': 1.0,
+        # How many urls to shorten concurrently.
+        'shortener_workers': 4,
+        # How many shortened urls to remember (least recently used ones
+        # are forgotten first) and for how long (in seconds).
+        'shortener_cache_size': 1024,
+        'shortener_cache_ttl': 7 * 24 * 60 * 60,
+        # Save the shortened urls in the bots data directory (so they
+        # are still around after restarts).
+        'shortener_cache_persist': True,
+        # Profiler the (admin only) 'profile' command runs commands under
+        # (unless told otherwise), either 'sampling' (samples all threads
+        # every 'profile_interval' seconds) or 'deterministic' (sees every
+        # call, of the thread running the command only). Profiles are
+        # saved in the bots data directory (or 'profile_dir') and the top
+        # 'profile_top' hotspots are replied.
+        'profile_mode': 'sampling',
+        'profile_interval': 0.005,
+        'profile_top': 10,
+        'profile_dir': '',
     }
     """
     The configuration mechanism for errbot is sorta unique so
@@ -158,148 +264,503 @@ class OsloBotPlugin(BotPlugin):
     def configure(self, configuration):
         if not configuration:
             configuration = {}
-        configuration.update(copy.deepcopy(self.DEF_CONFIG))
-        super().configure(configuration)
+        # Anything not configured gets its default value (and not the
+        # other way around).
+        full_configuration = copy.deepcopy(self.DEF_CONFIG)
+        full_configuration.update(configuration)
+        super().configure(full_configuration)
         self.log.debug("Bot configuration: %s", self.config)
-        self.executor = None
+        self.fetcher = None
+        self.feed_fetcher = None
+        self.feed_cache = None
+        self.meeting_index = None
+        self.shortener = None
+        self.snapshot = None
+        self.snapshot_refresher = None
+        self.snapshot_refresh = None
+        self.snapshot_refresh_lock = threading.Lock()
+        self.late_executor = None
+        self.history = None
+        self.periodic_flights = None
+        self.periodic_processor = None
+        self.stats = stats.Stats()
+        # The plugin storage (a shelf) is not thread safe.
+        self.storage_lock = threading.Lock()
+        # Feed marks (as last saved) by build name, so that marks are only
+        # read from (and written to) the storage when they change.
+        self.feed_marks = {}
+        self.outbox = None
+        self.project_index = None
+        self.project_index_checked_at = None
+        self.project_index_lock = threading.Lock()
 
     @botcmd(split_args_with=str_split, historize=False)
     def meeting_notes(self, msg, args):
         """Returns the latest project meeting notes url."""
-        def extract_meeting_url(team, meeting_url, resp):
-            if resp.status_code != http_client.OK:
-                return None
-            matches = []
-            # Crappy html parsing...
-            for m in re.findall("(%s.+?[.]html)" % team, resp.text):
-                if m.endswith(".log.html"):
-                    continue
-                if m not in matches:
-                    matches.append(m)
-            if matches:
-                return meeting_url + matches[-1]
-            return None
         self.log.debug("Got request to fetch url"
                        " to last meeting notes from '%s'"
                        " with args %s'", msg.frm, args)
-        now_year = date.today().year
         if args:
-            meeting_url_data = {
-                'team': args[0],
-            }
+            team = args[0]
         else:
-            meeting_url_data = {
-                'team': self.config['meeting_team'],
-            }
-        # No meeting should happen before openstack even existed...
-        valid_meeting_url = None
-        while now_year >= self.OS_START_YEAR:
-            meeting_url_data['year'] = now_year
-            meeting_url = self.config['meeting_url_tpl'] % meeting_url_data
-            try:
-                resp = requests.get(
-                    meeting_url, timeout=self.config['meeting_fetch_timeout'])
-            except requests.Timeout:
-                # Bail immediately...
-                break
-            else:
-                valid_meeting_url = extract_meeting_url(
-                    meeting_url_data['team'], meeting_url, resp)
-                if valid_meeting_url:
-                    self.log.debug("Found valid last meeting url at %s for"
-                                   " team %s", valid_meeting_url,
-                                   meeting_url_data['team'])
-                    break
-                else:
-                    now_year -= 1
+            team = self.config['meeting_team']
+        valid_meeting_url = self.meeting_index.latest(team)
         if valid_meeting_url:
+            self.log.debug("Found valid last meeting url at %s for"
+                           " team %s", valid_meeting_url, team)
             content = "Last meeting url is %s" % valid_meeting_url
         else:
             content = ("Could not find meeting"
-                       " url for project %s" % meeting_url_data['team'])
+                       " url for project %s" % team)
         self.send_public_or_private(msg, content, 'meeting notes')
 
     def send_public_or_private(self, source_msg, content, kind):
         if hasattr(source_msg.frm, 'room') and source_msg.is_group:
-            self.send(source_msg.frm.room, content)
+            self.send_paced(source_msg.frm.room, content)
         elif source_msg.is_direct:
-            self.send(source_msg.frm, content)
+            self.send_paced(source_msg.frm, content)
         else:
             self.log.warn("No recipient targeted for %s request!", kind)
 
+    def send_paced(self, target, content):
+        """Sends (in the background, flood controlled) to a target."""
+        if self.outbox is None or not self.outbox.put(target, content):
+            self.send(target, content)
+
     @botcmd(split_args_with=str_split, historize=False)
     def check_periodics(self, msg, args):
         """Returns current periodic job(s) status."""
         self.log.debug("Got request to check periodic"
                        " jobs from '%s' with args %s'", msg.frm, args)
-        self.send_public_or_private(
-            msg, self.fetch_periodics_table(project_names=args), 'check')
+        self.report_periodics(
+            functools.partial(self.send_public_or_private,
+                              msg, kind='check'),
+            project_names=args)
 
     def report_on_feeds(self):
-        msg = self.fetch_periodics_table()
-        for room in self.rooms():
-            self.send(room, msg)
+        def send(msg):
+            for room in self.rooms():
+                self.send_paced(room, msg)
+        only_changes = self.config['periodic_report_mode'] == 'changes'
+        self.report_periodics(send, use_snapshot=False,
+                              only_changes=only_changes)
+
+    def report_periodics(self, send, project_names=None, use_snapshot=True,
+                         only_changes=False):
+        """Sends the periodic results of projects (using a time budget).
+
+        Results that do not come in within the time budget are sent as
+        pending and either followed by an update once they are in, or
+        cancelled (depending on the 'periodic_report_late' setting). When
+        only changes are asked for, results are always fetched and only
+        rows that changed since they were last reported are sent (if
+        any).
+        """
+        budget = self.config['periodic_report_budget']
+        if budget <= 0:
+            budget = None
+        if use_snapshot and self.snapshot is not None and not only_changes:
+            content, late = self.snapshot_periodics_table(
+                project_names=project_names, budget=budget)
+        else:
+            results, late = self.fetch_periodics(
+                project_names=project_names, budget=budget)
+            if self.snapshot is not None:
+                self.snapshot.update(results)
+            if only_changes:
+                results = self._changed_periodics(results)
+            if results:
+                content = self.render_periodics_table(results)
+            else:
+                content = None
+        if content:
+            if only_changes:
+                content = "Changes since the last report:\n" + content
+            send(content)
+        if late is not None:
+            late.add_done_callback(
+                functools.partial(self._send_late_periodics, send,
+                                  only_changes=only_changes))
+
+    def _send_late_periodics(self, send, late, only_changes=False):
+        try:
+            results = late.result()
+            if self.snapshot is not None:
+                self.snapshot.update(results)
+            if only_changes:
+                results = self._changed_periodics(results)
+            if not results:
+                return
+            content = self.render_periodics_table(results)
+        except Exception:
+            self.log.exception("Failed processing late periodic results")
+        else:
+            send("Update (late results):\n" + content)
+
+    def _changed_periodics(self, results):
+        """Returns the results whose status (or last failure) changed
+        since they were last reported (and remembers them as reported).
+
+        Pending (or cancelled) results are never taken as changed.
+        """
+        changed = {}
+        with self.storage_lock:
+            reported = self.get('periodic_reported', {})
+            for key, result in results.items():
+                if result.get('incomplete'):
+                    continue
+                seen = (result['status'], result['last_fail'],
+                        result['last_fail_url'])
+                if reported.get(key) != seen:
+                    reported[key] = seen
+                    changed[key] = result
+            if changed:
+                self['periodic_reported'] = reported
+        return changed
+
+    def default_project_names(self):
+        """Returns the names of the projects to check (when none are
+        given), see the 'periodic_project_source' setting."""
+        if self.config['periodic_project_source'] == 'governance':
+            teams = [team for team in self.config['periodic_project_teams']
+                     if team]
+            try:
+                project_names = self.team_project_names(teams)
+            except ValueError as e:
+                self.log.warning("Not using governance projects: %s", e)
+            else:
+                if project_names:
+                    return project_names
+        return list(self.config['periodic_project_names'])
+
+    def team_project_names(self, teams):
+        """Returns the names of the (governance) projects of teams (or of
+        all teams if none are given).
+
+        Raises ``ValueError`` if a team is unknown or the governance
+        projects are not available.
+        """
+        index = self._governance_index()
+        if index is None:
+            raise ValueError("Governance projects are not available")
+        repos = set()
+        for team in teams or [None]:
+            repos.update(index.repos(team=team))
+        return sorted(set(repo.rsplit("/", 1)[-1] for repo in repos))
+
+    def _governance_index(self):
+        """Returns the (cached) index of the governance projects.yaml.
+
+        The file is kept in the bots data directory and only fetched again
+        once it is older than the 'periodic_projects_ttl' setting (the
+        index of it is cached there too, so restarts do not need to
+        load it again).
+        """
+        with self.project_index_lock:
+            now = time.time()
+            ttl = self.config['periodic_projects_ttl']
+            if (self.project_index_checked_at is not None and
+                    now - self.project_index_checked_at < ttl):
+                return self.project_index
+            # Checked (at most) once per ttl, even when that fails.
+            self.project_index_checked_at = now
+            path = self._data_path('projects.yaml')
+            try:
+                fetched_at = os.path.getmtime(path)
+            except OSError:
+                fetched_at = None
+            if fetched_at is None or now - fetched_at >= ttl:
+                url = self.config['periodic_projects_url']
+                try:
+                    resp = self.fetcher.submit(
+                        url, timeout=(
+                            self.config['periodic_connect_timeout'],
+                            self.config['periodic_projects_fetch_timeout'],
+                        )).result()
+                    if resp.status_code != http_client.OK:
+                        raise IOError("Got %s %s" % (resp.status_code,
+                                                     resp.reason))
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path + ".tmp", 'w', encoding='utf-8') as fh:
+                        fh.write(resp.text)
+                    os.replace(path + ".tmp", path)
+                except Exception:
+                    self.log.exception("Failed fetching governance"
+                                       " projects from %s", url)
+                    if fetched_at is None:
+                        return self.project_index
+            try:
+                self.project_index = project_index.load(
+                    path, cache_path=self._data_path('projects.json'))
+            except Exception:
+                self.log.exception("Failed loading governance projects"
+                                   " from '%s'", path)
+            return self.project_index
+
+    def _periodic_keys(self, project_names):
+        return [(project_name, tuple(py_ver))
+                for project_name in project_names
+                for py_ver in self.config['periodic_python_versions']]
+
+    def snapshot_periodics_table(self, project_names=None, budget=None):
+        """Renders the (snapshotted) periodic results of the projects.
+
+        Only projects that are not in the snapshot yet are fetched before
+        replying (see :meth:`fetch_periodics` for what the budget does
+        and what is returned besides the rendered table); stale ones are
+        refreshed in the background.
+        """
+        if not project_names:
+            project_names = self.default_project_names()
+        keys = self._periodic_keys(project_names)
+        rows, missing = self.snapshot.lookup(keys)
+        incomplete = {}
+        late = None
+        if missing:
+            missing_project_names = sorted(set(
+                project_name for project_name, _py_version in missing))
+            results, late = self.fetch_periodics(
+                project_names=missing_project_names, budget=budget)
+            self.snapshot.update(results)
+            incomplete = dict((key, result)
+                              for key, result in results.items()
+                              if result.get('incomplete'))
+            rows, _missing = self.snapshot.lookup(keys)
+        max_age = self.config['periodic_snapshot_max_age']
+        now = time.time()
+        stale_project_names = sorted(set(
+            project_name
+            for (project_name, _py_version), (computed_at, _result)
+            in rows.items() if now - computed_at >= max_age))
+        if stale_project_names:
+            self.refresh_periodics_snapshot(
+                project_names=stale_project_names, wait=False)
+        results = dict((key, result)
+                       for key, (_computed_at, result) in rows.items())
+        results.update(incomplete)
+        content = self.render_periodics_table(
+            results, computed_at=dict((key, computed_at)
+                                      for key, (computed_at, _result)
+                                      in rows.items()))
+        return content, late
+
+    def refresh_periodics_snapshot(self, project_names=None, wait=True):
+        """Refetches stale (or the given) projects results into the snapshot.
+
+        Only one refresh runs at a time; if one is already running this
+        does nothing.
+        """
+        with self.snapshot_refresh_lock:
+            if (self.snapshot_refresh is not None and
+                    not self.snapshot_refresh.done()):
+                return
+            if not project_names:
+                max_age = self.config['periodic_snapshot_max_age']
+                project_names = set(self.default_project_names())
+                project_names.update(self.snapshot.project_names())
+                rows, _missing = self.snapshot.lookup(
+                    self._periodic_keys(project_names))
+                now = time.time()
+                fresh_project_names = set(
+                    project_name
+                    for (project_name, _py_version), (computed_at, _result)
+                    in rows.items() if now - computed_at < max_age)
+                project_names = sorted(project_names - fresh_project_names)
+                if not project_names:
+                    return
+            self.log.debug("Refreshing periodic snapshot of %s",
+                           project_names)
+            self.snapshot_refresh = self.snapshot_refresher.submit(
+                lambda: self.snapshot.update(
+                    self.fetch_periodics(project_names=project_names)[0]))
+            fut = self.snapshot_refresh
+        if wait:
+            fut.result()
 
     def fetch_periodics_table(self, project_names=None):
+        results, _late = self.fetch_periodics(project_names=project_names)
+        if self.snapshot is not None:
+            self.snapshot.update(results)
+        return self.render_periodics_table(results)
+
+    def fetch_periodics(self, project_names=None, budget=None):
+        """Fetches (and returns) the periodic results of the projects.
+
+        Results are keyed by (project name, python version), see
+        :meth:`fetch_builds` for what the budget does (and what is
+        returned besides the results).
+        """
         if not project_names:
-            project_names = list(self.config['periodic_project_names'])
-
-        def process_feed(feed):
-            cleaned_entries = []
-            if self.config['periodic_exclude_when']:
-                now = timeutils.utcnow(with_timezone=True)
-                expire_after = now + relativedelta(
-                    **self.config['periodic_exclude_when'])
-                for e in feed.entries:
-                    when_pub = parser.parse(e.published)
-                    if when_pub <= expire_after:
-                        continue
-                    cleaned_entries.append(e)
+            project_names = self.default_project_names()
+        build_name_tpl = self.config['periodic_build_name_tpl']
+        builds = dict(
+            (key, (matrix.build_name(build_name_tpl, *key), key))
+            for key in self._periodic_keys(project_names))
+        return self.fetch_builds(builds, budget=budget)
+
+    def query_periodics(self, query, budget=None):
+        """Fetches (and returns) the periodic results of a matrix.
+
+        Results are keyed by the cells of the matrix; all of its builds
+        are fetched at once (each distinct build only once, however many
+        cells name it), see :meth:`fetch_builds` for what the budget does
+        (and what is returned besides the results).
+        """
+        default_tpl = self.config['periodic_build_name_tpl']
+        builds = {}
+        for cell, build_name in query.builds().items():
+            # Only results of the default template go in the history
+            # (which has no notion of templates).
+            if query.templates[cell.template] == default_tpl:
+                history_key = (cell.project_name, cell.py_version)
+            else:
+                history_key = None
+            builds[cell] = (build_name, history_key)
+        return self.fetch_builds(builds, budget=budget)
+
+    def fetch_builds(self, builds, budget=None):
+        """Fetches (and returns) the periodic results of builds.
+
+        The builds to fetch are given as a dict of keys to (build name,
+        (project name, python version) to record the result in the
+        history as or none); results are keyed the same way. Keys naming
+        the same build share its fetch (and result). If a time budget (in
+        seconds) is given, results that are not in by then are either
+        returned as pending (and the future also returned resolves to
+        them once they are all in) or are cancelled.
+        """
+        from dateutil.relativedelta import relativedelta
+        from oslo_utils import timeutils
+        import requests
+
+        def format_when(when):
+            if when.tzinfo is not None:
+                return when.strftime("%A %b, %e, %Y at %k:%M:%S %Z")
             else:
-                cleaned_entries.extend(feed.entries)
-            if len(cleaned_entries) == 0:
+                return when.strftime("%A %b, %e, %Y at %k:%M:%S")
+
+        def get_expire_after():
+            if not self.config['periodic_exclude_when']:
+                return None
+            now = timeutils.utcnow(with_timezone=True)
+            return now + relativedelta(
+                **self.config['periodic_exclude_when'])
+
+        def process_feed_fully(feed, expire_after):
+            recent, latest_entry, latest_fail = feedmarks.scan(
+                feed.entries, expire_after=expire_after)
+            if recent == 0:
                 return {
                     'status': 'All OK (no recent failures)',
-                    'discarded': len(feed.entries) - len(cleaned_entries),
+                    'discarded': len(feed.entries),
                     'last_fail': NA_VALUE,
                     'last_fail_url': NA_VALUE,
                 }
             else:
-                fails = []
-                for e in cleaned_entries:
-                    fails.append((e, parser.parse(e.published)))
-                lastest_entry, latest_fail = sorted(
-                    fails, key=lambda e: e[1])[-1]
-                if latest_fail.tzinfo is not None:
-                    when = latest_fail.strftime(
-                        "%A %b, %e, %Y at %k:%M:%S %Z")
-                else:
-                    when = latest_fail.strftime("%A %b, %e, %Y at %k:%M:%S")
                 return {
-                    'status': "%s failures" % len(fails),
-                    'last_fail': when,
-                    'last_fail_url': lastest_entry.get("link", BAD_VALUE),
-                    'discarded': len(feed.entries) - len(cleaned_entries),
+                    'status': "%s failures" % recent,
+                    'last_fail': format_when(latest_fail),
+                    'last_fail_url': latest_entry.get("link", BAD_VALUE),
+                    'discarded': len(feed.entries) - recent,
+                }
+
+        def process_feed_incrementally(feed, expire_after, build_name):
+            mark_key = [self.config['periodic_exclude_when']]
+            # Each build has its own storage key (so that saving the mark
+            # of one build does not rewrite those of all others).
+            storage_key = 'periodic_mark:' + build_name
+            data = self.feed_marks.get(build_name)
+            if data is None:
+                with self.storage_lock:
+                    data = self.get(storage_key)
+            if data is not None:
+                mark = feedmarks.FeedMark.from_dict(data)
+            else:
+                mark = None
+            if mark is None or mark.key != mark_key:
+                mark = feedmarks.FeedMark(key=mark_key)
+            new = mark.merge(feed.entries, timestamps.parse)
+            if expire_after is not None:
+                mark.expire(expire_after.timestamp())
+            self.log.debug("Found %s new of %s entries of '%s' feed",
+                           new, len(feed.entries), build_name)
+            new_data = mark.to_dict()
+            if new_data != data:
+                self.feed_marks[build_name] = new_data
+                with self.storage_lock:
+                    self[storage_key] = new_data
+            latest = mark.latest()
+            if latest is None:
+                return {
+                    'status': 'All OK (no recent failures)',
+                    'discarded': len(feed.entries) - len(mark.fails),
+                    'last_fail': NA_VALUE,
+                    'last_fail_url': NA_VALUE,
                 }
+            else:
+                published, link = latest
+                if link is None:
+                    link = BAD_VALUE
+                return {
+                    'status': "%s failures" % len(mark.fails),
+                    'last_fail': format_when(timestamps.parse(published)),
+                    'last_fail_url': link,
+                    'discarded': len(feed.entries) - len(mark.fails),
+                }
+
+        def process_feed(feed, build_name):
+            with self.stats.timed('filter'):
+                return process_feed_once(feed, build_name)
+
+        def process_feed_once(feed, build_name):
+            expire_after = get_expire_after()
+            mode = self.config['periodic_incremental']
+            if mode == 'off':
+                return process_feed_fully(feed, expire_after)
+            result = process_feed_incrementally(feed, expire_after,
+                                                build_name)
+            if mode == 'verify':
+                full_result = process_feed_fully(feed, expire_after)
+                if full_result != result:
+                    self.log.error("Incremental result %s of '%s' feed"
+                                   " does not match full result %s",
+                                   result, build_name, full_result)
+                    return full_result
+            return result
+
+        def cancelled_result():
+            return {
+                'status': 'Fetch cancelled',
+                'last_fail': BAD_VALUE,
+                'last_fail_url': BAD_VALUE,
+                'incomplete': True,
+            }
 
         def process_req_completion(fut):
             self.log.debug("Processing completion of '%s'", fut.rss_url)
             try:
                 r = fut.result()
             except requests.Timeout:
+                self.stats.incr('timeout')
                 return {
                     'status': 'Fetch timed out',
                     'last_fail': BAD_VALUE,
                     'last_fail_url': BAD_VALUE,
                 }
             except futures.CancelledError:
+                self.stats.incr('cancelled')
+                return cancelled_result()
+            except resilience.BackendUnavailable as e:
+                self.log.debug("Not fetching '%s': %s", fut.rss_url, e)
+                self.stats.event('unavailable')
                 return {
-                    'status': 'Fetch cancelled',
+                    'status': 'Backend unavailable',
                     'last_fail': BAD_VALUE,
                     'last_fail_url': BAD_VALUE,
                 }
             except Exception:
                 self.log.exception("Failed fetching!")
+                self.stats.incr('error')
                 return {
                     'status': 'Unknown fetch error',
                     'last_fail': BAD_VALUE,
@@ -308,49 +769,142 @@ class OsloBotPlugin(BotPlugin):
             else:
                 if (r.status_code == http_client.BAD_REQUEST and
                         'No Failed Runs' in r.text):
+                    self.stats.incr('ok')
                     return {
                         'status': 'All OK (no recent failures)',
                         'last_fail': NA_VALUE,
                         'last_fail_url': NA_VALUE,
                     }
                 elif r.status_code != http_client.OK:
+                    self.stats.incr('http_error')
                     return {
                         'status': 'Fetch failure (%s)' % r.reason,
                         'last_fail': BAD_VALUE,
                         'last_fail_url': BAD_VALUE,
                     }
-                else:
-                    return process_feed(feedparser.parse(r.text))
+                self.stats.incr('ok')
+                with self.stats.timed('parse'):
+                    if self.feed_cache is not None:
+                        feed = self.feed_cache.parse(r, rssfeeds.parse)
+                    else:
+                        feed = rssfeeds.parse(r.content)
+                fut.entries = feed.entries
+                return process_feed(feed, fut.build_name)
+
+        def process_and_record(fut):
+            result = process_req_completion(fut)
+            if (self.history is not None and fut.history_key is not None and
+                    not result.get('incomplete')):
+                try:
+                    project_name, py_version = fut.history_key
+                    self.history.record(project_name, py_version,
+                                        result, entries=fut.entries)
+                except sqlite3.Error:
+                    self.log.exception("Failed recording history of '%s'",
+                                       fut.build_name)
+            return result
+
+        def on_fetched(fut):
+            self.stats.observe('fetch', time.monotonic() - fut.submitted_at)
+
+        def start_fetch(rss_url, build_name, history_key):
+            self.log.debug("Scheduling call out to %s", rss_url)
+            fut = self.feed_fetcher.submit(rss_url, **conn_kwargs)
+            # TODO(harlowja): don't touch the future class and
+            # do this in a more sane manner at some point...
+            fut.rss_url = rss_url
+            fut.build_name = build_name
+            fut.history_key = history_key
+            fut.entries = None
+            fut.submitted_at = time.monotonic()
+            fut.add_done_callback(on_fetched)
+            # Parse (and filter) off of the fetching thread (or loop).
+            return fetchers.chain(fut, process_and_record,
+                                  executor=self.periodic_processor)
+
+        def flight_result(fut):
+            try:
+                return fut.result()
+            except futures.CancelledError:
+                self.stats.incr('cancelled')
+                return cancelled_result()
 
         rss_url_tpl = self.config['periodic_url_tpl']
-        build_name_tpl = self.config['periodic_build_name_tpl']
         conn_kwargs = {
             'timeout': (self.config['periodic_connect_timeout'],
                         self.config['periodic_fetch_timeout']),
         }
-        futs = set()
-        for project_name in project_names:
-            for py_ver in self.config['periodic_python_versions']:
-                py_ver_str = "py" + "".join(str(p) for p in py_ver)
-                build_name = build_name_tpl % {
-                    'project_name': project_name,
-                    'py_version': py_ver_str}
-                rss_url = rss_url_tpl % {'build_name': build_name}
-                self.log.debug("Scheduling call out to %s", rss_url)
-                fut = self.executor.submit(requests.get,
-                                           rss_url, **conn_kwargs)
-                # TODO(harlowja): don't touch the future class and
-                # do this in a more sane manner at some point...
-                fut.rss_url = rss_url
-                fut.build_name = build_name
-                fut.project_name = project_name
-                fut.py_version = py_ver
-                futs.add(fut)
-        self.log.debug("Waiting for %s fetch requests", len(futs))
-        results = collections.defaultdict(list)
-        for fut in futures.as_completed(futs):
-            results[fut.project_name].append(
-                (fut.py_version, process_req_completion(fut)))
+        # Each distinct build is fetched once (recorded in the history as
+        # the first key that wants it recorded at all).
+        history_keys = {}
+        for build_name, history_key in builds.values():
+            if history_keys.get(build_name) is None:
+                history_keys[build_name] = history_key
+        deduped = len(builds) - len(history_keys)
+        if deduped:
+            self.stats.event('deduped', deduped)
+        # Fetches (and their parsed results) are shared with any other
+        # check (or report) that wants the same build at the same time.
+        build_futs = {}
+        for build_name, history_key in history_keys.items():
+            rss_url = rss_url_tpl % {'build_name': build_name}
+            fut, shared = self.periodic_flights.submit(
+                build_name, functools.partial(start_fetch, rss_url,
+                                              build_name, history_key))
+            if shared:
+                self.stats.event('coalesced')
+            build_futs[build_name] = fut
+        flights = dict((key, (build_name, build_futs[build_name]))
+                       for key, (build_name, _history_key)
+                       in builds.items())
+        self.log.debug("Waiting for %s fetch requests (%s in flight)",
+                       len(build_futs), len(self.periodic_flights))
+        results = {}
+        late = None
+        done, not_done = futures.wait(set(build_futs.values()),
+                                      timeout=budget)
+        for key, (_build_name, fut) in flights.items():
+            if fut in done:
+                results[key] = flight_result(fut)
+        if not_done and self.config['periodic_report_late'] == 'update':
+            self.log.debug("%s fetch requests did not finish in %s"
+                           " seconds, reporting them later",
+                           len(not_done), budget)
+            late_flights = dict((key, fut)
+                                for key, (_build_name, fut)
+                                in flights.items() if fut in not_done)
+            for key in late_flights:
+                results[key] = {
+                    'status': 'Pending',
+                    'last_fail': NA_VALUE,
+                    'last_fail_url': NA_VALUE,
+                    'incomplete': True,
+                }
+
+            def process_late():
+                futures.wait(not_done)
+                late_results = dict((key, flight_result(fut))
+                                    for key, fut in late_flights.items())
+                self._dump_stats()
+                return late_results
+
+            late = self.late_executor.submit(process_late)
+        elif not_done:
+            self.log.debug("Cancelling %s fetch requests that did not"
+                           " finish in %s seconds", len(not_done), budget)
+            for build_name, fut in build_futs.items():
+                if fut in not_done:
+                    # Only actually cancelled if nobody else waits for it.
+                    self.periodic_flights.abandon(build_name, fut)
+                    self.stats.incr('cancelled')
+            for key, (_build_name, fut) in flights.items():
+                if fut in not_done:
+                    results[key] = cancelled_result()
+        self._dump_stats()
+        return results, late
+
+    def render_periodics_table(self, results, computed_at=None):
+        """Renders periodic results (optionally with how old they are)."""
         tbl_headers = [
             "Project",
             "Status",
@@ -358,51 +912,539 @@ class OsloBotPlugin(BotPlugin):
             "Last failed url",
             'Discarded',
         ]
+        if computed_at is not None:
+            tbl_headers.append('Age')
+            now = time.time()
         tbl_body = []
-        if (self.config['periodic_shorten'] and
-           self.config['shortener_api_key']):
-            s = GoogleShortener(
+        shorten_func = self._make_shorten_func(results.values())
+        # This should force sorting by project and then python version...
+        for key in sorted(results.keys()):
+            project_name, py_version = key
+            result = results[key]
+            py_version = ".".join(str(p) for p in py_version)
+            row = [
+                project_name.title() + " (" + py_version + ")",
+                result['status'],
+                result['last_fail'],
+                str(shorten_func(result['last_fail_url'])),
+                str(result.get('discarded', 0)),
+            ]
+            if computed_at is not None:
+                if key in computed_at:
+                    row.append(snapshots.format_age(now - computed_at[key]))
+                else:
+                    row.append(NA_VALUE)
+            tbl_body.append(row)
+        buf = io.StringIO()
+        with self.stats.timed('render'):
+            buf.write(tabulate(tbl_body, tbl_headers,
+                               tablefmt=self.config['tabulate_format']))
+        return buf.getvalue()
+
+    def _make_shorten_func(self, results):
+        """Returns what turns the failure urls of results into the urls to
+        show (shortening all of them at once, if shortening is on)."""
+        long_urls = [result['last_fail_url'] for result in results
+                     if (result['last_fail_url'] and
+                         result['last_fail_url'] not in [BAD_VALUE,
+                                                         NA_VALUE])]
+        if self.shortener is None or not long_urls:
+            return lambda url: url
+        with self.stats.timed('shorten'):
+            short_urls = self.shortener.shorten_many(long_urls)
+        return lambda url: short_urls.get(url, url)
+
+    def render_matrix_table(self, query, results, layout):
+        """Renders periodic results of (the cells of) a matrix.
+
+        The 'pivot' layout has a row per project and a status column per
+        template and python version, the 'grouped' one has a row per
+        cell (with its last failure) grouped by template.
+        """
+        tbl_body = []
+        if layout == matrix.PIVOT:
+            columns, rows = query.pivoted(results)
+            tbl_headers = ["Project"]
+            for name, py_ver in columns:
+                py_ver = history.format_py_version(py_ver)
+                if len(query.templates) > 1:
+                    tbl_headers.append("%s (%s)" % (name, py_ver))
+                else:
+                    tbl_headers.append(py_ver)
+            for project_name, row_results in rows:
+                row = [project_name.title()]
+                for result in row_results:
+                    if result is None:
+                        row.append(NA_VALUE)
+                    elif result['status'].startswith('All OK'):
+                        row.append('OK')
+                    else:
+                        row.append(result['status'])
+                tbl_body.append(row)
+        else:
+            tbl_headers = [
+                "Template",
+                "Project",
+                "Status",
+                'Last failed',
+                "Last failed url",
+                'Discarded',
+            ]
+            shorten_func = self._make_shorten_func(results.values())
+            for name, rows in query.grouped(results):
+                for i, (cell, result) in enumerate(rows):
+                    tbl_body.append([
+                        name if i == 0 else "",
+                        cell.project_name.title() + " (" +
+                        history.format_py_version(cell.py_version) + ")",
+                        result['status'],
+                        result['last_fail'],
+                        str(shorten_func(result['last_fail_url'])),
+                        str(result.get('discarded', 0)),
+                    ])
+        with self.stats.timed('render'):
+            return tabulate(tbl_body, tbl_headers,
+                            tablefmt=self.config['tabulate_format'])
+
+    def make_matrix(self, args):
+        """Returns the matrix (and layout) that command arguments ask for.
+
+        See :func:`matrix.parse_query` for the arguments; whatever they
+        leave out is the default (projects, python versions and all the
+        templates, see the 'periodic_matrix_templates' setting).
+
+        Raises ``ValueError`` on bad arguments.
+        """
+        parsed = matrix.parse_query(args)
+        templates = collections.OrderedDict([
+            (matrix.DEFAULT_TEMPLATE, self.config['periodic_build_name_tpl']),
+        ])
+        templates.update(sorted(
+            self.config['periodic_matrix_templates'].items()))
+        if parsed['templates']:
+            unknown = [name for name in parsed['templates']
+                       if name not in templates]
+            if unknown:
+                raise ValueError("Unknown template(s) %s (known are %s)"
+                                 % (", ".join(unknown),
+                                    ", ".join(templates)))
+            templates = collections.OrderedDict(
+                (name, templates[name]) for name in parsed['templates'])
+        project_names = list(parsed['project_names'])
+        if parsed['teams']:
+            project_names.extend(
+                self.team_project_names(parsed['teams']))
+        if not project_names:
+            project_names = self.default_project_names()
+        py_versions = (parsed['py_versions'] or
+                       self.config['periodic_python_versions'])
+        layout = parsed['layout'] or self.config['periodic_matrix_layout']
+        if layout not in matrix.LAYOUTS:
+            raise ValueError("Unknown layout '%s'" % layout)
+        return (matrix.Matrix(project_names, py_versions, templates),
+                layout)
+
+    @botcmd(split_args_with=str_split, historize=False)
+    def periodic_matrix(self, msg, args):
+        """Returns periodic job(s) status of a matrix ([grouped|pivot]
+        [project|team:<team>|py:<version>|tpl:<template>...])."""
+        send = functools.partial(self.send_public_or_private, msg,
+                                 kind='matrix')
+        try:
+            query, layout = self.make_matrix(args)
+        except ValueError as e:
+            send(str(e))
+            return
+        budget = self.config['periodic_report_budget']
+        if budget <= 0:
+            budget = None
+        results, late = self.query_periodics(query, budget=budget)
+        self._snapshot_matrix_results(query, results)
+        send(self.render_matrix_table(query, results, layout))
+        if late is not None:
+            late.add_done_callback(
+                functools.partial(self._send_late_matrix, send, query,
+                                  layout))
+
+    def _send_late_matrix(self, send, query, layout, late):
+        try:
+            results = late.result()
+            self._snapshot_matrix_results(query, results)
+            content = self.render_matrix_table(query, results, layout)
+        except Exception:
+            self.log.exception("Failed processing late matrix results")
+        else:
+            send("Update (late results):\n" + content)
+
+    def _snapshot_matrix_results(self, query, results):
+        # The snapshot (like the history) only has results of the default
+        # template.
+        if self.snapshot is None:
+            return
+        default_tpl = self.config['periodic_build_name_tpl']
+        self.snapshot.update(dict(
+            ((cell.project_name, cell.py_version), result)
+            for cell, result in results.items()
+            if query.templates[cell.template] == default_tpl))
+
+    @botcmd(historize=False)
+    def periodic_stats(self, msg, args):
+        """Returns timings (outcomes and events) of periodic job checks."""
+        stage_rows, outcome_rows, event_rows = self.stats.summary()
+        tbl_body = []
+        for stage, count, avg, p50, p95, max_took in stage_rows:
+            tbl_body.append([stage, count] + [
+                "%0.3fs" % took for took in (avg, p50, p95, max_took)])
+        content = tabulate(tbl_body, ["Stage", "Count", "Avg", "P50",
+                                      "P95", "Max"],
+                           tablefmt=self.config['tabulate_format'])
+        if outcome_rows:
+            content += "\n\n" + tabulate(
+                outcome_rows, ["Outcome", "Count"],
+                tablefmt=self.config['tabulate_format'])
+        if event_rows:
+            content += "\n\n" + tabulate(
+                event_rows, ["Event", "Count"],
+                tablefmt=self.config['tabulate_format'])
+        self.send_public_or_private(msg, content, 'stats')
+
+    def _dump_stats(self):
+        stats_file = self.config['periodic_stats_file']
+        if not stats_file:
+            return
+        try:
+            self.stats.dump_prometheus(stats_file, 'oslobot_periodic')
+        except OSError:
+            self.log.exception("Failed dumping stats to '%s'", stats_file)
+
+    def _open_history(self):
+        history_file = self.config['periodic_history_file']
+        if not history_file:
+            history_file = self._data_path('history.sqlite')
+        try:
+            store = history.HistoryStore(history_file)
+            store.prune(time.time() -
+                        self.config['periodic_history_max_age'])
+        except (OSError, sqlite3.Error):
+            self.log.exception("Failed opening periodic history at '%s'",
+                               history_file)
+            return None
+        return store
+
+    def prune_history(self):
+        """Forgets the periodic history older than the max age."""
+        if self.history is None:
+            return
+        try:
+            self.history.prune(time.time() -
+                               self.config['periodic_history_max_age'])
+        except sqlite3.Error:
+            self.log.exception("Failed pruning periodic history")
+
+    @botcmd(split_args_with=str_split, historize=False)
+    def periodic_history(self, msg, args):
+        """Returns recent failures of a periodic job (project [days])."""
+        days = self.config['periodic_trend_days']
+        if len(args) == 2 and args[1].isdigit():
+            days = max(1, int(args[1]))
+            args = args[0:1]
+        if self.history is None:
+            content = "Periodic history is not enabled"
+        elif len(args) != 1:
+            content = "Usage: periodic history <project> [days]"
+        else:
+            project_name = args[0]
+            failures = self.history.failures(
+                project_name, time.time() - days * history.DAY,
+                limit=self.HISTORY_LIMIT)
+            if not failures:
+                content = ("No failures of %s in the last %s days"
+                           % (project_name, days))
+            else:
+                tbl_body = []
+                for published, py_version, link in failures:
+                    tbl_body.append([
+                        time.strftime("%Y-%m-%d %H:%M:%S %Z",
+                                      time.localtime(published)),
+                        history.format_py_version(py_version),
+                        link or BAD_VALUE,
+                    ])
+                content = tabulate(tbl_body, ["Failed", "Python", "Url"],
+                                   tablefmt=self.config['tabulate_format'])
+        self.send_public_or_private(msg, content, 'history')
+
+    @botcmd(split_args_with=str_split, historize=False)
+    def periodic_trend(self, msg, args):
+        """Returns periodic job failures per day ([days] [project...])."""
+        if self.history is None:
+            self.send_public_or_private(
+                msg, "Periodic history is not enabled", 'trend')
+            return
+        days = self.config['periodic_trend_days']
+        if args and args[0].isdigit():
+            days = max(1, int(args[0]))
+            args = args[1:]
+        project_names = args or self.default_project_names()
+        counts = self.history.daily_failures(project_names, days)
+        tbl_body = []
+        py_versions = sorted(tuple(py_ver) for py_ver in
+                             self.config['periodic_python_versions'])
+        for project_name in sorted(set(project_names)):
+            for py_ver in py_versions:
+                per_day = counts.get((project_name, py_ver),
+                                     [0] * days)
+                failing_days = sum(1 for count in per_day if count)
+                tbl_body.append([
+                    project_name.title() + " (" +
+                    history.format_py_version(py_ver) + ")",
+                    sum(per_day),
+                    "%0.0f%%" % (100.0 * failing_days / days),
+                    "".join(str(count) if count < 10 else "+"
+                            for count in per_day),
+                ])
+        content = tabulate(tbl_body, ["Project", "Failures",
+                                      "Failing days",
+                                      "Per day (oldest first)"],
+                           tablefmt=self.config['tabulate_format'])
+        self.send_public_or_private(msg, content, 'trend')
+
+    @botcmd(split_args_with=str_split, historize=False, admin_only=True)
+    def profile(self, msg, args):
+        """Runs a command under a profiler ([sampling|deterministic]
+        command [args...]) and returns where its time went."""
+        kind = self.config['profile_mode']
+        if args and args[0] in (profiling.SamplingProfiler.kind,
+                                profiling.DeterministicProfiler.kind):
+            kind = args[0]
+            args = args[1:]
+        if not args:
+            self.send_public_or_private(
+                msg, "Usage: profile [sampling|deterministic] <command>"
+                " [args...]", 'profile')
+            return
+        name = args[0]
+        func = getattr(self, name, None)
+        if (name == 'profile' or
+                not getattr(func, '_err_command', False)):
+            self.send_public_or_private(
+                msg, "Unknown command '%s'" % name, 'profile')
+            return
+        try:
+            profiler = profiling.make_profiler(
+                kind, interval=self.config['profile_interval'])
+        except ValueError as e:
+            self.send_public_or_private(msg, str(e), 'profile')
+            return
+        if getattr(func, '_err_command_split_args_with', None):
+            cmd_args = args[1:]
+        else:
+            cmd_args = " ".join(args[1:])
+        started = time.monotonic()
+        profiler.start()
+        try:
+            func(msg, cmd_args)
+        finally:
+            profiler.stop()
+            took = time.monotonic() - started
+        profile_dir = self.config['profile_dir']
+        if not profile_dir:
+            profile_dir = self._data_path('profiles')
+        path = os.path.join(profile_dir, "%s-%s%s" % (
+            name, time.strftime("%Y%m%d-%H%M%S"), profiler.extension))
+        try:
+            os.makedirs(profile_dir, exist_ok=True)
+            profiler.dump(path)
+        except OSError:
+            self.log.exception("Failed saving profile to '%s'", path)
+            path = None
+        rows = profiler.hotspots(self.config['profile_top'])
+        if kind == profiling.SamplingProfiler.kind:
+            tbl_body = [[label, "%0.1f%%" % own, "%0.1f%%" % total]
+                        for label, own, total in rows]
+            tbl_headers = ["Function", "Own", "Total"]
+        else:
+            tbl_body = [[label, calls, "%0.3fs" % own,
+                         "%0.3fs" % cumulative]
+                        for label, calls, own, cumulative in rows]
+            tbl_headers = ["Function", "Calls", "Own", "Cumulative"]
+        content = ("Profiled '%s' (%s) for %0.3f seconds"
+                   % (name, kind, took))
+        if path is not None:
+            content += ", saved to %s" % path
+        content += ":\n" + tabulate(tbl_body, tbl_headers,
+                                    tablefmt=self.config['tabulate_format'])
+        self.send_public_or_private(msg, content, 'profile')
+
+    def _data_path(self, *names):
+        return os.path.join(self.bot_config.BOT_DATA_DIR, self.name, *names)
+
+    def _make_shortener(self):
+        backend_name = self.config['shortener_backend']
+        if backend_name == 'local':
+            backend = shorteners.LocalShortener()
+        elif backend_name == 'google':
+            if not self.config['shortener_api_key']:
+                self.log.warning("Not shortening urls, no google"
+                                 " shortener api key provided")
+                return None
+            backend = shorteners.GoogleShortener(
                 self.log, self.config['shortener_api_key'],
                 timeout=(self.config['shortener_connect_timeout'],
                          self.config['shortener_fetch_timeout']))
-            shorten_func = s.safe_shorten
         else:
-            shorten_func = lambda long_url: long_url
-        for project_name in sorted(results.keys()):
-            # This should force sorting by python version...
-            for py_version, result in sorted(results[project_name]):
-                py_version = ".".join(str(p) for p in py_version)
-                last_fail_url = result['last_fail_url']
-                if (last_fail_url and
-                        last_fail_url not in [BAD_VALUE, NA_VALUE]):
-                    last_fail_url = shorten_func(last_fail_url)
-                tbl_body.append([
-                    project_name.title() + " (" + py_version + ")",
-                    result['status'],
-                    result['last_fail'],
-                    str(last_fail_url),
-                    str(result.get('discarded', 0)),
-                ])
-        buf = io.StringIO()
-        buf.write(tabulate(tbl_body, tbl_headers,
-                           tablefmt=self.config['tabulate_format']))
-        return buf.getvalue()
+            self.log.warning("Not shortening urls, unknown shortener"
+                             " backend '%s'", backend_name)
+            return None
+        if self.config['shortener_cache_persist']:
+            cache_path = self._data_path('short_urls.json')
+        else:
+            cache_path = None
+        cache = shorteners.ExpiringLRUCache(
+            max_size=self.config['shortener_cache_size'],
+            ttl=self.config['shortener_cache_ttl'], path=cache_path)
+        cache.load()
+        return shorteners.ShortenerService(
+            self.log, backend, cache=cache,
+            max_workers=self.config['shortener_workers'])
 
     def get_configuration_template(self):
         return copy.deepcopy(self.DEF_CONFIG)
 
+    def check_configuration(self, configuration):
+        # Settings left out get their default value (see configure), and
+        # the keys of 'periodic_matrix_templates' are whatever template
+        # names are wanted, so only the settings given are checked (that
+        # one by hand) against the template.
+        template = self.get_configuration_template()
+        for key, value in configuration.items():
+            if key not in template:
+                raise botplugin.ValidationException(
+                    "Unknown setting '%s'" % key)
+            if key == 'periodic_matrix_templates':
+                if not isinstance(value, dict) or not all(
+                        isinstance(name, str) and isinstance(tpl, str)
+                        for name, tpl in value.items()):
+                    raise botplugin.ValidationException(
+                        "'%s' must map template names to build name"
+                        " templates (strings)" % key)
+            else:
+                botplugin.recurse_check_structure(template[key], value)
+
     def deactivate(self):
         super().deactivate()
-        if self.executor is not None:
-            self.executor.shutdown()
+        # Let any (background) refresh finish before shutting down what
+        # it uses...
+        if self.snapshot_refresher is not None:
+            self.snapshot_refresher.shutdown()
+            self.snapshot_refresher = None
+            self.snapshot_refresh = None
+            self.snapshot = None
+        if self.late_executor is not None:
+            self.late_executor.shutdown()
+            self.late_executor = None
+        if self.fetcher is not None:
+            # This also shuts down the fetch engine under it.
+            self.feed_fetcher.shutdown()
+            self.fetcher = None
+            self.feed_fetcher = None
+            self.feed_cache = None
+            self.meeting_index = None
+        if self.periodic_processor is not None:
+            self.periodic_processor.shutdown()
+            self.periodic_processor = None
+            self.periodic_flights = None
+        if self.shortener is not None:
+            self.shortener.shutdown()
+            self.shortener = None
+        if self.history is not None:
+            self.history.close()
+            self.history = None
+        if self.outbox is not None:
+            dropped = self.outbox.shutdown()
+            if dropped:
+                self.log.warning("Dropped %s unsent messages", dropped)
+            self.outbox = None
 
     def activate(self):
         super().activate()
-        self.executor = futures.ThreadPoolExecutor(
-            max_workers=self.DEF_FETCH_WORKERS)
+        # Feed marks used to all be kept under one storage key.
+        if 'periodic_marks' in self:
+            del self['periodic_marks']
+        self.outbox = outbox.Outbox(
+            self.send, rate=self.config['outbound_rate'],
+            burst=self.config['outbound_burst'], log=self.log)
+        self.fetcher = fetchers.make_fetcher(
+            self.config['periodic_fetch_engine'],
+            max_workers=self.config['periodic_fetch_workers'],
+            concurrency=self.config['periodic_fetch_concurrency'],
+            per_host=self.config['periodic_fetch_per_host'],
+            log=self.log)
+        self.log.debug("Using the '%s' fetch engine", self.fetcher.name)
+        self.feed_fetcher = resilience.ResilientFetcher(
+            self.fetcher,
+            adaptive_timeouts=self.config['periodic_adaptive_timeouts'],
+            timeout_factor=self.config['periodic_adaptive_timeout_factor'],
+            min_timeout=self.config['periodic_adaptive_timeout_min'],
+            hedge=self.config['periodic_hedge'],
+            breaker_failures=self.config['periodic_breaker_failures'],
+            breaker_cooldown=self.config['periodic_breaker_cooldown'],
+            stats=self.stats)
+        if self.config['periodic_cache']:
+            cache_dir = self.config['periodic_cache_dir']
+            if cache_dir == '':
+                cache_dir = self._data_path('feeds')
+            self.feed_cache = feedcache.FeedCache(
+                path=cache_dir, ttl=self.config['periodic_cache_ttl'],
+                log=self.log)
+            self.feed_fetcher = feedcache.CachingFetcher(self.feed_fetcher,
+                                                         self.feed_cache)
+        max_inflight = self.config['periodic_max_inflight']
+        if max_inflight <= 0:
+            max_inflight = None
+        self.periodic_flights = singleflight.SingleFlight(
+            max_inflight=max_inflight)
+        self.periodic_processor = futures.ThreadPoolExecutor(
+            max_workers=self.DEF_PROCESS_WORKERS)
+        # No meeting should happen before openstack even existed...
+        self.meeting_index = meetings.MeetingIndex(
+            self.fetcher, self.config['meeting_url_tpl'], self.OS_START_YEAR,
+            timeout=self.config['meeting_fetch_timeout'],
+            ttl=self.config['meeting_index_ttl'], log=self.log)
+        if self.config['periodic_shorten']:
+            self.shortener = self._make_shortener()
         try:
             if self.config['periodic_check_frequency'] > 0:
                 self.start_poller(self.config['periodic_check_frequency'],
                                   self.report_on_feeds)
         except KeyError:
             pass
+        self.late_executor = futures.ThreadPoolExecutor(
+            max_workers=self.DEF_LATE_WORKERS)
+        if self.config['periodic_history']:
+            self.history = self._open_history()
+            if (self.history is not None and
+                    self.config['periodic_history_prune_frequency'] > 0):
+                self.start_poller(
+                    self.config['periodic_history_prune_frequency'],
+                    self.prune_history)
+        if self.config['periodic_snapshot']:
+            self.snapshot = snapshots.Snapshot()
+            if self.history is not None:
+                # Start from the last known results (they are refreshed
+                # like any other stale ones).
+                for key, (checked_at, result) in \
+                        self.history.latest_results().items():
+                    self.snapshot.update({key: result},
+                                         computed_at=checked_at)
+            self.snapshot_refresher = futures.ThreadPoolExecutor(
+                max_workers=1)
+            # Only refreshed in the background when periodic checks are on
+            # at all (otherwise only checks refresh what they look at).
+            if (self.config['periodic_check_frequency'] > 0 and
+                    self.config['periodic_snapshot_refresh_frequency'] > 0):
+                self.start_poller(
+                    self.config['periodic_snapshot_refresh_frequency'],
+                    self.refresh_periodics_snapshot)
+        if self.config['meeting_index_refresh_frequency'] > 0:
+            self.start_poller(self.config['meeting_index_refresh_frequency'],
+                              self.meeting_index.refresh_all)
@@ -0,0 +1,156 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Paced (flood controlled) queue of outbound messages."""
+
+import collections
+import threading
+import time
+
+
+class _Bucket:
+    """Token bucket (tokens are message lines)."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_at(self, cost, now):
+        """Returns when a message of some cost can be sent."""
+        self.refill(now)
+        # Messages bigger than the burst go out once the bucket is full
+        # (and put it in debt, see take()).
+        needed = min(cost, self.burst) - self.tokens
+        if needed <= 0:
+            return now
+        return now + needed / self.rate
+
+    def take(self, cost):
+        # Goes into debt for messages bigger than what is left, so that the
+        # next messages wait until all lines of a long one (a table) are
+        # paid back and the rate holds whatever the message sizes.
+        self.tokens -= cost
+
+
+class Outbox:
+    """Sends messages from a background thread, pacing them per target.
+
+    Each target (room or person) gets a token bucket that allows bursts
+    of ``burst`` lines and refills at ``rate`` lines per second; messages
+    to a target are sent in order, targets are served by whichever can
+    send soonest. A rate of zero (or less) means no pacing.
+
+    Targets are told apart by their string form (bot identifiers are
+    not always hashable).
+    """
+
+    def __init__(self, send_func, rate=1.0, burst=5, log=None):
+        self.send_func = send_func
+        self.rate = rate
+        self.burst = burst
+        self.log = log
+        self._queues = collections.OrderedDict()
+        self._buckets = {}
+        self._cond = threading.Condition()
+        self._dead = False
+        self._thread = threading.Thread(target=self._run,
+                                        name='oslobot-outbox')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __len__(self):
+        with self._cond:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def put(self, target, content):
+        """Queues a message; returns false if the outbox is shut down."""
+        with self._cond:
+            if self._dead:
+                return False
+            key = str(target)
+            try:
+                queue = self._queues[key]
+            except KeyError:
+                queue = self._queues[key] = collections.deque()
+            queue.append((target, content))
+            self._cond.notify()
+            return True
+
+    def _bucket(self, key):
+        try:
+            return self._buckets[key]
+        except KeyError:
+            bucket = self._buckets[key] = _Bucket(self.rate, self.burst)
+            return bucket
+
+    def _next(self):
+        """Waits for (and returns) the next message that can be sent."""
+        with self._cond:
+            while not self._dead:
+                now = time.monotonic()
+                soonest = None
+                for key, queue in self._queues.items():
+                    cost = queue[0][1].count("\n") + 1
+                    if self.rate > 0:
+                        ready_at = self._bucket(key).ready_at(cost, now)
+                    else:
+                        ready_at = now
+                    if soonest is None or ready_at < soonest[0]:
+                        soonest = (ready_at, key, cost)
+                if soonest is None:
+                    self._cond.wait()
+                    continue
+                ready_at, key, cost = soonest
+                if ready_at > now:
+                    self._cond.wait(ready_at - now)
+                    continue
+                queue = self._queues[key]
+                message = queue.popleft()
+                if not queue:
+                    del self._queues[key]
+                else:
+                    # Let other targets go first next time (when ready).
+                    self._queues.move_to_end(key)
+                if self.rate > 0:
+                    self._bucket(key).take(cost)
+                return message
+            return None
+
+    def _run(self):
+        while True:
+            message = self._next()
+            if message is None:
+                return
+            target, content = message
+            try:
+                self.send_func(target, content)
+            except Exception:
+                if self.log is not None:
+                    self.log.exception("Failed sending message to %s",
+                                       target)
+
+    def shutdown(self):
+        """Stops sending; returns how many queued messages got dropped."""
+        with self._cond:
+            self._dead = True
+            dropped = sum(len(queue) for queue in self._queues.values())
+            self._queues.clear()
+            self._cond.notify()
+        self._thread.join()
+        return dropped
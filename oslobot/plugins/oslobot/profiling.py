@@ -0,0 +1,150 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Profilers for finding out where the time of (bot) commands goes.
+
+Both profilers have the same ``start()``, ``stop()``, ``hotspots(limit)``
+and ``dump(path)`` methods:
+
+* :class:`DeterministicProfiler` (``cProfile``) sees every call, but only
+  of the thread running the command; profiles are saved in the ``pstats``
+  format (``python -m pstats``, snakeviz...).
+* :class:`SamplingProfiler` periodically samples the stacks of all
+  threads (so it also sees the fetch engine and processing pools) and
+  saves them as folded stacks (flamegraph.pl, speedscope...).
+"""
+
+import collections
+import cProfile
+import os
+import pstats
+import sys
+import threading
+
+
+def _label(filename, lineno, name):
+    return "%s:%s(%s)" % (os.path.basename(filename), lineno, name)
+
+
+class DeterministicProfiler:
+    """Profiles (every call of) the thread it is started from."""
+
+    kind = 'deterministic'
+    extension = '.prof'
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+
+    def hotspots(self, limit):
+        """Returns (function, calls, own seconds, cumulative seconds) rows
+        of the functions taking the most (own) time."""
+        stats = pstats.Stats(self._profile)
+        rows = []
+        for (filename, lineno, name), (_prim_calls, calls, own, cumulative,
+                                       _callers) in stats.stats.items():
+            rows.append([_label(filename, lineno, name), calls, own,
+                         cumulative])
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return rows[0:limit]
+
+    def dump(self, path):
+        self._profile.dump_stats(path)
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads every ``interval`` seconds.
+
+    Threads that are still where they were when profiling started (pool
+    workers waiting for work, pollers sleeping...) are taken as idle and
+    not counted.
+    """
+
+    kind = 'sampling'
+    extension = '.folded'
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = 0
+        self.stacks = collections.Counter()
+        self._idle = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _stack(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno,
+                          code.co_name))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def start(self):
+        for ident, frame in sys._current_frames().items():
+            self._idle[ident] = self._stack(frame)
+        self._thread = threading.Thread(target=self._run,
+                                        name='oslobot-profiler')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = self._stack(frame)
+                if stack and self._idle.get(ident) != stack:
+                    self.stacks[stack] += 1
+
+    def hotspots(self, limit):
+        """Returns (function, own share, total share) rows of the functions
+        most often seen running (own) in the samples."""
+        own = collections.Counter()
+        total = collections.Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for frame in set(stack):
+                total[frame] += count
+        seen = sum(self.stacks.values()) or 1
+        return [[_label(*frame), 100.0 * count / seen,
+                 100.0 * total[frame] / seen]
+                for frame, count in own.most_common(limit)]
+
+    def dump(self, path):
+        with open(path, 'w') as fh:
+            for stack, count in sorted(self.stacks.items()):
+                labels = [_label(*frame) for frame in stack]
+                fh.write("%s %s\n" % (";".join(labels), count))
+
+
+def make_profiler(kind, interval=0.005):
+    if kind == SamplingProfiler.kind:
+        return SamplingProfiler(interval=interval)
+    if kind == DeterministicProfiler.kind:
+        return DeterministicProfiler()
+    raise ValueError("Unknown profiler '%s' (expected '%s' or '%s')"
+                     % (kind, SamplingProfiler.kind,
+                        DeterministicProfiler.kind))
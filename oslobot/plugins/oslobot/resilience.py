@@ -0,0 +1,340 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Fetching that adapts to (and protects) slow or failing hosts."""
+
+import collections
+from concurrent import futures
+import functools
+import heapq
+import http.client as http_client
+import itertools
+import threading
+import time
+from urllib import parse
+
+import fetchers
+
+# How many of the latest response times (per host) are kept.
+WINDOW_SIZE = 200
+
+# Fewest response times to have seen before adapting to them.
+MIN_SAMPLES = 20
+
+# Most hedged requests to send (as a fraction of all requests), so that
+# hedging never more than slightly adds to the load of a host.
+MAX_HEDGE_RATIO = 0.1
+
+
+class BackendUnavailable(Exception):
+    """Raised (without fetching) for hosts whose circuit is open."""
+
+    def __init__(self, host, retry_in):
+        super().__init__("Host '%s' is unavailable (next try in %0.1f"
+                         " seconds)" % (host, retry_in))
+        self.host = host
+        self.retry_in = retry_in
+
+
+class LatencyTracker:
+    """Sliding window of the latest response times of a host."""
+
+    def __init__(self, size=WINDOW_SIZE):
+        self._samples = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percent):
+        """Returns a percentile (or none if too little has been seen)."""
+        with self._lock:
+            if len(self._samples) < MIN_SAMPLES:
+                return None
+            samples = sorted(self._samples)
+        index = min(len(samples) - 1, int(len(samples) * percent / 100.0))
+        return samples[index]
+
+
+class CircuitBreaker:
+    """Stops calls to a host after too many consecutive failures.
+
+    Once open, calls are refused for ``cooldown`` seconds; after that a
+    single probe call is let through (half open), which either closes
+    the circuit again (if it works) or re-opens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failures=5, cooldown=30.0):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._failed = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Returns (allowed, seconds until the next call is allowed)."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True, 0.0
+            now = time.monotonic()
+            retry_in = self._opened_at + self.cooldown - now
+            if retry_in <= 0:
+                # Let a probe through (and another one if this one does
+                # not finish within another cooldown).
+                self.state = self.HALF_OPEN
+                self._opened_at = now
+                return True, 0.0
+            return False, retry_in
+
+    def record(self, ok):
+        with self._lock:
+            if ok:
+                self.state = self.CLOSED
+                self._failed = 0
+                return
+            self._failed += 1
+            if (self.state == self.HALF_OPEN or
+                    (self.failures > 0 and self._failed >= self.failures)):
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class _Scheduler:
+    """Calls functions after delays (from a single daemon thread)."""
+
+    def __init__(self):
+        self._calls = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._dead = False
+
+    def call_later(self, delay, func):
+        with self._cond:
+            if self._dead:
+                return
+            heapq.heappush(self._calls, (time.monotonic() + delay,
+                                         next(self._counter), func))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name='oslobot-hedger')
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dead:
+                    if self._calls:
+                        wait = self._calls[0][0] - time.monotonic()
+                        if wait <= 0:
+                            break
+                    else:
+                        wait = None
+                    self._cond.wait(wait)
+                if self._dead:
+                    return
+                _when, _count, func = heapq.heappop(self._calls)
+            func()
+
+    def shutdown(self):
+        with self._cond:
+            self._dead = True
+            self._calls = []
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+
+class ResilientFetcher:
+    """Fetcher wrapper that adapts timeouts, hedges and breaks circuits.
+
+    Per host it tracks response times (from when fetches actually start,
+    failed ones count as taking their whole read timeout, so a host that
+    slows down past the adapted timeout gets longer timeouts again), and
+    once enough have been seen:
+
+    * lowers the read timeout to ``timeout_factor`` times the 99th
+      percentile (but no lower than ``min_timeout`` and never higher
+      than the timeout asked for);
+    * sends a second (hedged) request if the first one has not finished
+      by the 95th percentile (and the hedge would not have to wait for
+      the fetcher to free up), using whichever finishes (well) first.
+
+    Hosts that fail (time out, can not be connected to or answer with
+    server errors) ``breaker_failures`` times in a row are not asked
+    anything for ``breaker_cooldown`` seconds; fetches from them fail
+    right away with :class:`BackendUnavailable` until a probe (which
+    gets the timeout asked for, not the adapted one) works.
+    """
+
+    def __init__(self, fetcher, adaptive_timeouts=True, timeout_factor=3.0,
+                 min_timeout=2.0, hedge=True, breaker_failures=5,
+                 breaker_cooldown=30.0, stats=None):
+        self.fetcher = fetcher
+        self.adaptive_timeouts = adaptive_timeouts
+        self.timeout_factor = timeout_factor
+        self.min_timeout = min_timeout
+        self.hedge = hedge
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self.stats = stats
+        self.trackers = collections.defaultdict(LatencyTracker)
+        self.breakers = collections.defaultdict(functools.partial(
+            CircuitBreaker, failures=breaker_failures,
+            cooldown=breaker_cooldown))
+        self._requests = 0
+        self._hedges = 0
+        self._lock = threading.Lock()
+        self._scheduler = _Scheduler()
+
+    @property
+    def name(self):
+        return self.fetcher.name
+
+    def _event(self, event):
+        if self.stats is not None:
+            self.stats.event(event)
+
+    def _adapt_timeout(self, tracker, timeout):
+        if not self.adaptive_timeouts:
+            return timeout
+        p99 = tracker.percentile(99)
+        if p99 is None:
+            return timeout
+        connect_timeout, read_timeout = fetchers.split_timeout(timeout)
+        adapted = max(self.min_timeout, p99 * self.timeout_factor)
+        if read_timeout is not None:
+            adapted = min(adapted, read_timeout)
+        return (connect_timeout, adapted)
+
+    def _may_hedge(self):
+        with self._lock:
+            if self._hedges >= self._requests * MAX_HEDGE_RATIO:
+                return False
+            self._hedges += 1
+            return True
+
+    def submit(self, url, timeout=None, headers=None):
+        host = parse.urlsplit(url).netloc
+        breaker = self.breakers[host]
+        allowed, retry_in = breaker.allow()
+        if not allowed:
+            fut = futures.Future()
+            fut.set_exception(BackendUnavailable(host, retry_in))
+            return fut
+        tracker = self.trackers[host]
+        if breaker.state == CircuitBreaker.CLOSED:
+            timeout = self._adapt_timeout(tracker, timeout)
+        _connect_timeout, read_timeout = fetchers.split_timeout(timeout)
+        with self._lock:
+            self._requests += 1
+        result = futures.Future()
+        attempts = []
+        lock = threading.Lock()
+
+        def finish(attempt):
+            with lock:
+                if result.done():
+                    return
+                try:
+                    if attempt.exception() is None:
+                        result.set_result(attempt.result())
+                    else:
+                        result.set_exception(attempt.exception())
+                except futures.InvalidStateError:
+                    # Cancelled (by the caller) in the meantime.
+                    pass
+                others = [other for other in attempts if other is not attempt]
+            for other in others:
+                other.cancel()
+
+        def on_attempt_done(started, attempt):
+            if attempt.cancelled():
+                return
+            exc = attempt.exception()
+            if exc is None:
+                resp = attempt.result()
+                took = getattr(resp, 'took', None)
+                if took is None:
+                    took = time.monotonic() - started
+                tracker.observe(took)
+                ok = resp.status_code < http_client.INTERNAL_SERVER_ERROR
+            else:
+                # Count failures (timeouts mostly) as having taken the
+                # whole read timeout, so that timeouts grow back (toward
+                # the one asked for) when a host gets slower.
+                if read_timeout is not None:
+                    tracker.observe(read_timeout)
+                ok = False
+            breaker.record(ok)
+            with lock:
+                pending = [other for other in attempts if not other.done()]
+            # Use the first good answer (or the last bad one).
+            if ok or not pending:
+                finish(attempt)
+
+        def launch():
+            started = time.monotonic()
+            attempt = self.fetcher.submit(url, timeout=timeout,
+                                          headers=headers)
+            with lock:
+                attempts.append(attempt)
+            attempt.add_done_callback(functools.partial(on_attempt_done,
+                                                        started))
+
+        def maybe_hedge():
+            if result.done() or breaker.state != CircuitBreaker.CLOSED:
+                return
+            # A hedge that has to wait for the fetcher (like the attempt
+            # it hedges probably is) would only add to the load.
+            if self.fetcher.would_queue(url):
+                self._event('hedge_skipped')
+                return
+            if not self._may_hedge():
+                return
+            self._event('hedged')
+            try:
+                launch()
+            except RuntimeError:
+                # The fetcher got shut down in the meantime...
+                pass
+
+        def on_result_done(result):
+            if result.cancelled():
+                with lock:
+                    others = list(attempts)
+                for other in others:
+                    other.cancel()
+
+        result.add_done_callback(on_result_done)
+        launch()
+        if self.hedge and breaker.state == CircuitBreaker.CLOSED:
+            hedge_after = tracker.percentile(95)
+            if hedge_after is not None:
+                self._scheduler.call_later(hedge_after, maybe_hedge)
+        return result
+
+    def shutdown(self):
+        self._scheduler.shutdown()
+        self.fetcher.shutdown()
@@ -0,0 +1,118 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Fast (streaming) parsing of health rss feeds.
+
+Only the ``published`` time and ``link`` of feed items are extracted
+(which is all the plugin looks at); anything that does not look like the
+plain rss 2.0 health feeds are is left to ``feedparser``.
+"""
+
+from xml.etree import ElementTree
+
+# How many bytes to feed the parser at once.
+CHUNK_SIZE = 64 * 1024
+
+
+class UnexpectedFeed(ValueError):
+    """Raised for feeds the fast parser does not handle."""
+
+
+class Entry(dict):
+    """Feed entry whose fields can also be read as attributes (like the
+    ones feedparser makes)."""
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class Feed:
+    """Parsed feed (just its entries)."""
+
+    def __init__(self, entries):
+        self.entries = entries
+
+
+class ItemExtractor:
+    """Incrementally extracts the published time and link of rss items.
+
+    The (raw) body is given to :meth:`feed` as it comes in, so the
+    parser decodes it as the xml declaration says, and items are dropped
+    from the tree as soon as they are read, so memory use does not grow
+    with the size of the feed (besides the extracted entries).
+    """
+
+    def __init__(self):
+        self.entries = []
+        self._parser = ElementTree.XMLPullParser(events=('start', 'end'))
+        self._seen_root = False
+        self._parents = []
+
+    def feed(self, data):
+        self._parser.feed(data)
+        self._read_events()
+
+    def close(self):
+        """Finishes parsing; returns the feed (raising if unexpected)."""
+        self._parser.close()
+        self._read_events()
+        if not self._seen_root:
+            raise UnexpectedFeed("Empty feed")
+        return Feed(self.entries)
+
+    def _read_events(self):
+        for event, elem in self._parser.read_events():
+            if event == 'start':
+                if not self._seen_root:
+                    if elem.tag != 'rss':
+                        raise UnexpectedFeed("Not an rss feed (root is"
+                                             " '%s')" % elem.tag)
+                    self._seen_root = True
+                self._parents.append(elem)
+                continue
+            self._parents.pop()
+            if elem.tag != 'item':
+                continue
+            entry = Entry()
+            for child in elem:
+                if child.tag == 'pubDate':
+                    entry['published'] = (child.text or '').strip()
+                elif child.tag == 'link':
+                    entry['link'] = (child.text or '').strip()
+            if not entry.get('published'):
+                raise UnexpectedFeed("Item without a publish date")
+            self.entries.append(entry)
+            if self._parents:
+                self._parents[-1].remove(elem)
+
+
+def parse(content):
+    """Parses a health feed body (bytes, as received), falling back to
+    feedparser if need be."""
+    extractor = ItemExtractor()
+    with memoryview(content) as view:
+        try:
+            # Fed in chunks so that parsed items get dropped as we go (and
+            # do not all pile up before being read).
+            for i in range(0, len(view), CHUNK_SIZE):
+                extractor.feed(view[i:i + CHUNK_SIZE])
+            return extractor.close()
+        except (ElementTree.ParseError, UnexpectedFeed):
+            pass
+    # Only imported when needed (it is slow to import).
+    import feedparser
+    return feedparser.parse(content)
@@ -0,0 +1,241 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Url shortening backends and the (caching, batching) shortener service."""
+
+import abc
+import collections
+from concurrent import futures
+import hashlib
+import http.client as http_client
+import json
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode as compat_urlencode
+
+
+class Shortener(abc.ABC):
+    """Base class of url shortening backends."""
+
+    @abc.abstractmethod
+    def shorten(self, long_url):
+        """Returns the short url (raising ``OSError`` on failure)."""
+
+
+class GoogleShortener(Shortener):
+    """Shortener that uses google shortening service (requires api key).
+
+    See: https://developers.google.com/url-shortener/v1/
+    """
+
+    base_request_url = 'https://www.googleapis.com/urlshortener/v1/url?'
+
+    def __init__(self, log, api_key, timeout=None):
+        self.log = log
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def shorten(self, long_url):
+        # Only imported when used (it is slow to import).
+        import requests
+        post_data = json.dumps({
+            'longUrl': long_url,
+        })
+        query_params = {
+            'key': self.api_key,
+        }
+        req_url = self.base_request_url + compat_urlencode(query_params)
+        try:
+            req = requests.post(req_url, data=post_data,
+                                headers={'content-type': 'application/json'},
+                                timeout=self.timeout)
+        except requests.Timeout:
+            raise OSError("Unable to shorten '%s' url"
+                          " due to http request timeout being"
+                          " reached" % (long_url))
+        else:
+            if req.status_code != http_client.OK:
+                raise OSError("Unable to shorten '%s' url due to http"
+                              " error '%s' (%s)" % (long_url, req.reason,
+                                                    req.status_code))
+            try:
+                return req.json()['id']
+            except (KeyError, ValueError, TypeError) as e:
+                raise OSError("Unable to shorten '%s' url due to request"
+                              " extraction error: %s" % (long_url, e))
+
+
+class LocalShortener(Shortener):
+    """Shortener that makes up (stable) short urls without any service.
+
+    Meant for testing (and benchmarking); the short urls do not resolve
+    to anything.
+    """
+
+    def __init__(self, base_url='http://short.invalid/', delay=0.0):
+        self.base_url = base_url
+        self.delay = delay
+
+    def shorten(self, long_url):
+        if self.delay:
+            time.sleep(self.delay)
+        digest = hashlib.sha1(long_url.encode('utf-8')).hexdigest()
+        return self.base_url + digest[0:10]
+
+
+class ExpiringLRUCache:
+    """Bounded (least recently used evicting) cache with expiring entries.
+
+    Optionally loaded from (and saved to) a json file.
+    """
+
+    def __init__(self, max_size=1024, ttl=None, path=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # Saves are one at a time (so an older save never replaces the
+        # file written by a newer one).
+        self._save_lock = threading.Lock()
+        # Changes made (and how many of them were saved).
+        self._changes = 0
+        self._saved_changes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _is_expired(self, stored_at, now):
+        return self.ttl is not None and now - stored_at >= self.ttl
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            try:
+                value, stored_at = self._data[key]
+            except KeyError:
+                return default
+            if self._is_expired(stored_at, now):
+                del self._data[key]
+                self._changes += 1
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+            self._changes += 1
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path) as fh:
+                items = json.load(fh)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        with self._lock:
+            for key, value, stored_at in items[-self.max_size:]:
+                if not self._is_expired(stored_at, now):
+                    self._data[key] = (value, stored_at)
+
+    def save(self):
+        """Saves the cache (if it changed since it was last saved).
+
+        Raises ``OSError`` if that fails (the changes are then saved by
+        the next save).
+        """
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                changes = self._changes
+                if changes == self._saved_changes:
+                    return
+                items = [[key, value, stored_at]
+                         for key, (value, stored_at) in self._data.items()]
+            dirname = os.path.dirname(self.path)
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=dirname or None,
+                                            suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as fh:
+                    json.dump(items, fh)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            with self._lock:
+                self._saved_changes = changes
+
+
+class ShortenerService:
+    """Shortens urls (with a backend) caching and batching the requests."""
+
+    def __init__(self, log, backend, cache=None, max_workers=4):
+        self.log = log
+        self.backend = backend
+        if cache is None:
+            cache = ExpiringLRUCache()
+        self.cache = cache
+        self.executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+
+    def safe_shorten(self, long_url):
+        short_url = self.cache.get(long_url)
+        if short_url is not None:
+            return short_url
+        try:
+            short_url = self.backend.shorten(long_url)
+        except (OSError, ValueError, TypeError):
+            self.log.exception("Failed shortening due to unexpected error, "
+                               " providing back long url.")
+            return long_url
+        else:
+            self.cache.set(long_url, short_url)
+            return short_url
+
+    def shorten_many(self, long_urls):
+        """Shortens many urls at once; returns a long to short url dict."""
+        short_urls = {}
+        futs = {}
+        for long_url in long_urls:
+            if long_url in short_urls or long_url in futs:
+                continue
+            short_url = self.cache.get(long_url)
+            if short_url is not None:
+                short_urls[long_url] = short_url
+            else:
+                futs[long_url] = self.executor.submit(self.safe_shorten,
+                                                      long_url)
+        for long_url, fut in futs.items():
+            short_urls[long_url] = fut.result()
+        if futs:
+            self.save()
+        return short_urls
+
+    def save(self):
+        try:
+            self.cache.save()
+        except OSError:
+            self.log.exception("Failed saving shortened urls")
+
+    def shutdown(self):
+        self.executor.shutdown()
+        self.save()
@@ -0,0 +1,134 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Sharing of in-flight work between callers that ask for the same thing."""
+
+import collections
+from concurrent import futures
+import threading
+
+
+class SingleFlight:
+    """Runs at most one piece of work per key at a time (sharing it).
+
+    Callers asking for a key whose work is still in flight get the same
+    future as the caller that started it. At most ``max_inflight`` pieces
+    of work run at once (if given); work asked for past that is queued
+    and started (in order) as running work finishes.
+    """
+
+    def __init__(self, max_inflight=None):
+        self.max_inflight = max_inflight
+        self._flights = {}
+        self._waiters = {}
+        self._queue = collections.deque()
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._flights)
+
+    def submit(self, key, func):
+        """Returns (future, shared) for the work of a key.
+
+        The future resolves to what the future ``func()`` returns resolves
+        to; ``shared`` tells if the work was already in flight (and
+        ``func`` was not called).
+        """
+        with self._lock:
+            try:
+                fut = self._flights[key]
+            except KeyError:
+                pass
+            else:
+                self._waiters[key] += 1
+                return fut, True
+            fut = futures.Future()
+            self._flights[key] = fut
+            self._waiters[key] = 1
+            if self.max_inflight is None or self._running < self.max_inflight:
+                self._running += 1
+                start = True
+            else:
+                self._queue.append((key, func, fut))
+                start = False
+        if start:
+            self._run(key, func, fut)
+        return fut, False
+
+    def abandon(self, key, fut):
+        """Stops waiting for the work of a key.
+
+        The work is cancelled if nobody else waits for it and it did not
+        start yet; returns whether it got cancelled.
+        """
+        with self._lock:
+            if self._flights.get(key) is not fut:
+                return fut.cancelled()
+            self._waiters[key] -= 1
+            if self._waiters[key] > 0 or not fut.cancel():
+                return False
+            # Whoever asks for it next gets new work (the cancelled work
+            # gets skipped once its turn comes).
+            del self._flights[key]
+            del self._waiters[key]
+            return True
+
+    def _run(self, key, func, fut):
+        # Work that is done right away (or skipped) lets the next queued
+        # work start; loop instead of recursing for those.
+        while key is not None:
+            if self._start(key, func, fut):
+                return
+            key, func, fut = self._finish(key, fut)
+
+    def _start(self, key, func, fut):
+        """Starts work; returns false if it is already done (or skipped)."""
+        if not fut.set_running_or_notify_cancel():
+            return False
+        try:
+            work = func()
+        except Exception as e:
+            fut.set_exception(e)
+            return False
+        if work.done():
+            self._resolve(fut, work)
+            return False
+
+        def on_done(work):
+            self._resolve(fut, work)
+            self._run(*self._finish(key, fut))
+
+        work.add_done_callback(on_done)
+        return True
+
+    @staticmethod
+    def _resolve(fut, work):
+        try:
+            fut.set_result(work.result())
+        except BaseException as e:
+            # This includes the work being cancelled (the shared future is
+            # running, so it can not be cancelled anymore).
+            fut.set_exception(e)
+
+    def _finish(self, key, fut):
+        """Forgets finished work; returns the next work to start (if any)."""
+        with self._lock:
+            if self._flights.get(key) is fut:
+                del self._flights[key]
+                del self._waiters[key]
+            self._running -= 1
+            if not self._queue:
+                return None, None, None
+            self._running += 1
+            return self._queue.popleft()
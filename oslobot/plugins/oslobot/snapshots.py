@@ -0,0 +1,66 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""In-memory snapshot of the last computed periodic job results."""
+
+import threading
+import time
+
+
+def format_age(seconds):
+    """Formats an age (in seconds) in a short human readable way."""
+    seconds = int(max(0, seconds))
+    if seconds < 60:
+        return "%ss" % seconds
+    if seconds < 60 * 60:
+        return "%sm" % (seconds // 60)
+    if seconds < 24 * 60 * 60:
+        return "%sh" % (seconds // (60 * 60))
+    return "%sd" % (seconds // (24 * 60 * 60))
+
+
+class Snapshot:
+    """Last computed result (and when it was computed) of each row.
+
+    Rows are keyed by (project name, python version).
+    """
+
+    def __init__(self):
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def update(self, results, computed_at=None):
+        """Stores results (skipping pending or cancelled ones)."""
+        if computed_at is None:
+            computed_at = time.time()
+        with self._lock:
+            for key, result in results.items():
+                if not result.get('incomplete'):
+                    self._rows[key] = (computed_at, result)
+
+    def project_names(self):
+        with self._lock:
+            return sorted(set(project_name
+                              for project_name, _py_version in self._rows))
+
+    def lookup(self, keys):
+        """Returns the known rows (key -> (computed at, result)) and the
+        keys that are missing."""
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                try:
+                    found[key] = self._rows[key]
+                except KeyError:
+                    missing.append(key)
+        return found, missing
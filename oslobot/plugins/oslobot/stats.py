@@ -0,0 +1,154 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""In-process latency histograms and outcome counters."""
+
+import bisect
+import contextlib
+import os
+import tempfile
+import threading
+import time
+
+# Upper bounds (in seconds) of the histogram buckets.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Latency histogram with fixed (prometheus style) buckets."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # The extra bucket at the end is the '+Inf' one.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimates a quantile (the upper bound of its bucket)."""
+        if not self.count:
+            return 0.0
+        wanted = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted:
+                if i < len(self.buckets):
+                    return min(self.buckets[i], self.max)
+                break
+        return self.max
+
+
+class Stats:
+    """Named latency histograms (stages), outcome and event counters.
+
+    Outcomes count how fetches turned out (each fetch has one); events
+    count what happened while scheduling them (like fetches shared with
+    other checks or hedged).
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.histograms = {}
+        self.counters = {}
+        self.events = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            try:
+                histogram = self.histograms[stage]
+            except KeyError:
+                histogram = Histogram(self.buckets)
+                self.histograms[stage] = histogram
+            histogram.observe(seconds)
+
+    def incr(self, outcome, amount=1):
+        with self._lock:
+            self.counters[outcome] = self.counters.get(outcome, 0) + amount
+
+    def event(self, event, amount=1):
+        with self._lock:
+            self.events[event] = self.events.get(event, 0) + amount
+
+    @contextlib.contextmanager
+    def timed(self, stage):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.monotonic() - started)
+
+    def summary(self):
+        """Returns (stage, outcome, event rows) for showing the stats."""
+        with self._lock:
+            stage_rows = []
+            for stage in sorted(self.histograms):
+                histogram = self.histograms[stage]
+                stage_rows.append([
+                    stage, histogram.count,
+                    histogram.sum / histogram.count,
+                    histogram.quantile(0.5), histogram.quantile(0.95),
+                    histogram.max,
+                ])
+            outcome_rows = sorted(self.counters.items())
+            event_rows = sorted(self.events.items())
+        return stage_rows, outcome_rows, event_rows
+
+    def to_prometheus(self, prefix):
+        """Renders the stats in the prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            name = "%s_stage_seconds" % prefix
+            lines.append("# HELP %s Time taken by each stage." % name)
+            lines.append("# TYPE %s histogram" % name)
+            for stage in sorted(self.histograms):
+                histogram = self.histograms[stage]
+                seen = 0
+                for upper, count in zip(self.buckets + ('+Inf',),
+                                        histogram.counts):
+                    seen += count
+                    lines.append('%s_bucket{stage="%s",le="%s"} %s'
+                                 % (name, stage, upper, seen))
+                lines.append('%s_sum{stage="%s"} %s'
+                             % (name, stage, histogram.sum))
+                lines.append('%s_count{stage="%s"} %s'
+                             % (name, stage, histogram.count))
+            name = "%s_outcomes_total" % prefix
+            lines.append("# HELP %s Outcomes of fetches." % name)
+            lines.append("# TYPE %s counter" % name)
+            for outcome in sorted(self.counters):
+                lines.append('%s{outcome="%s"} %s'
+                             % (name, outcome, self.counters[outcome]))
+            name = "%s_events_total" % prefix
+            lines.append("# HELP %s Events of scheduling fetches." % name)
+            lines.append("# TYPE %s counter" % name)
+            for event in sorted(self.events):
+                lines.append('%s{event="%s"} %s'
+                             % (name, event, self.events[event]))
+        return "\n".join(lines) + "\n"
+
+    def dump_prometheus(self, path, prefix):
+        """Atomically writes the prometheus text format to a file."""
+        dirname = os.path.dirname(path)
+        fd, tmp_path = tempfile.mkstemp(dir=dirname or None, suffix='.tmp')
+        with os.fdopen(fd, 'w') as fh:
+            fh.write(self.to_prometheus(prefix))
+        os.replace(tmp_path, path)
@@ -0,0 +1,103 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Fast (memoized) parsing of feed timestamps.
+
+Feed entries carry RFC-822 (``Sat, 17 Oct 2015 07:26:28 +0000``) or
+ISO-8601 (``2015-10-17T07:26:28Z``) timestamps; those are parsed here
+directly (and the same strings tend to be seen over and over again, so
+results are memoized), anything else is handed to the (much slower)
+generic dateutil parser.
+
+Results are the same as what dateutil produces, down to the timezone
+objects (so that formatting them with ``%Z`` gives the same output).
+"""
+
+import datetime
+import functools
+import re
+
+# The dateutil modules are imported when first used (the parser one only
+# for odd formats), as they are slow to import.
+
+MEMO_SIZE = 16384
+
+_MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+_RFC822 = re.compile(
+    r'^\s*(?:[A-Za-z]{3},\s*)?(\d{1,2})\s+([A-Za-z]{3})\s+(\d{4})\s+'
+    r'(\d{2}):(\d{2})(?::(\d{2}))?\s+'
+    r'(?:([+-])(\d{2})(\d{2})|(UTC|GMT))\s*$')
+_ISO8601 = re.compile(
+    r'^(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?'
+    r'(?:([+-])(\d{2}):?(\d{2})|(Z|z))?$')
+
+
+def _make_tz(sign, hours, minutes, utc_name):
+    from dateutil import tz
+    if utc_name is not None:
+        return tz.UTC
+    offset = int(hours) * 3600 + int(minutes) * 60
+    if sign == '-':
+        offset = -offset
+    if offset == 0:
+        return tz.UTC
+    return tz.tzoffset(None, offset)
+
+
+def _parse_rfc822(match):
+    (day, month, year, hour, minute, second,
+     sign, tz_hours, tz_minutes, utc_name) = match.groups()
+    try:
+        month = _MONTHS[month.lower()]
+    except KeyError:
+        return None
+    return datetime.datetime(int(year), month, int(day),
+                             int(hour), int(minute), int(second or 0),
+                             tzinfo=_make_tz(sign, tz_hours, tz_minutes,
+                                             utc_name))
+
+
+def _parse_iso8601(match):
+    (year, month, day, hour, minute, second, fraction,
+     sign, tz_hours, tz_minutes, utc_name) = match.groups()
+    if sign is None and utc_name is None:
+        tzinfo = None
+    else:
+        tzinfo = _make_tz(sign, tz_hours, tz_minutes, utc_name)
+    microsecond = 0
+    if fraction:
+        microsecond = int(fraction.ljust(6, '0'))
+    return datetime.datetime(int(year), int(month), int(day),
+                             int(hour), int(minute), int(second),
+                             microsecond, tzinfo=tzinfo)
+
+
+@functools.lru_cache(maxsize=MEMO_SIZE)
+def parse(text):
+    """Parses a timestamp (falling back to dateutil for odd formats)."""
+    for pattern, func in ((_RFC822, _parse_rfc822),
+                          (_ISO8601, _parse_iso8601)):
+        match = pattern.match(text)
+        if match is not None:
+            try:
+                when = func(match)
+            except ValueError:
+                # Out of range values (and such), let dateutil decide.
+                break
+            if when is not None:
+                return when
+            break
+    from dateutil import parser
+    return parser.parse(text)
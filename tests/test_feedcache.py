@@ -0,0 +1,160 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import feedcache
+import fetchers
+
+URL = 'http://example.com/feed.xml'
+
+
+class FakeFetcher:
+    name = 'fake'
+
+    def __init__(self):
+        self.requests = []
+        self.responses = []
+
+    def submit(self, url, timeout=None, headers=None):
+        self.requests.append((url, headers))
+        return fetchers.completed(self.responses.pop(0))
+
+    def shutdown(self):
+        pass
+
+
+def _response(status_code=200, content=b'<rss/>', headers=None):
+    return fetchers.Response(URL, status_code, 'Whatever',
+                             content.decode('utf-8'), content=content,
+                             headers=headers)
+
+
+class CachingFetcherTest(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.log = mock.Mock()
+        self.fetcher = FakeFetcher()
+
+    def make(self, path=True, ttl=0):
+        cache = feedcache.FeedCache(path=self.path if path else None,
+                                    ttl=ttl, log=self.log)
+        return cache, feedcache.CachingFetcher(self.fetcher, cache)
+
+    def fetch(self, caching, *responses):
+        self.fetcher.responses.extend(responses)
+        return caching.submit(URL, timeout=5).result()
+
+    def test_revalidates(self):
+        cache, caching = self.make()
+        resp = self.fetch(caching, _response(headers={'ETag': '"v1"'}))
+        self.assertEqual(b'<rss/>', resp.content)
+        self.assertEqual({}, self.fetcher.requests[0][1])
+        resp = self.fetch(caching, _response(304, b''))
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(b'<rss/>', resp.content)
+        self.assertEqual({'If-None-Match': '"v1"'},
+                         self.fetcher.requests[1][1])
+
+    def test_revalidates_from_disk(self):
+        _cache, caching = self.make()
+        self.fetch(caching, _response(
+            headers={'Last-Modified': 'Sat, 17 Oct 2015 00:00:00 GMT'}))
+        _cache, caching = self.make()
+        resp = self.fetch(caching, _response(304, b''))
+        self.assertEqual(b'<rss/>', resp.content)
+        self.assertEqual(
+            {'If-Modified-Since': 'Sat, 17 Oct 2015 00:00:00 GMT'},
+            self.fetcher.requests[1][1])
+
+    def test_keeps_no_bodies_in_memory(self):
+        cache, caching = self.make()
+        self.fetch(caching, _response(headers={'ETag': '"v1"'}))
+        self.assertNotIn('content', cache.lookup(URL))
+        cache, caching = self.make(path=False)
+        self.fetch(caching, _response(headers={'ETag': '"v1"'}))
+        self.assertIn('content', cache.lookup(URL))
+
+    def test_fresh_within_ttl(self):
+        _cache, caching = self.make(ttl=60)
+        self.fetch(caching, _response())
+        resp = self.fetch(caching)
+        self.assertEqual(b'<rss/>', resp.content)
+        self.assertEqual(1, len(self.fetcher.requests))
+
+    def test_stale_after_ttl(self):
+        cache, caching = self.make(ttl=60)
+        self.fetch(caching, _response())
+        cache.lookup(URL)['fetched_at'] -= 61
+        resp = self.fetch(caching, _response(content=b'<rss></rss>'))
+        self.assertEqual(b'<rss></rss>', resp.content)
+        self.assertEqual(2, len(self.fetcher.requests))
+
+    def test_save_failure(self):
+        cache, caching = self.make()
+        with mock.patch('os.replace', side_effect=OSError("disk full")):
+            resp = self.fetch(caching, _response(headers={'ETag': '"v1"'}))
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(b'<rss/>', resp.content)
+        self.assertTrue(self.log.warning.called)
+        self.assertIsNone(cache.lookup(URL))
+        self.assertEqual([], os.listdir(self.path))
+
+    def test_touch_failure(self):
+        _cache, caching = self.make()
+        self.fetch(caching, _response(headers={'ETag': '"v1"'}))
+        with mock.patch('os.replace', side_effect=OSError("disk full")):
+            resp = self.fetch(caching, _response(304, b''))
+        self.assertEqual(b'<rss/>', resp.content)
+        self.assertTrue(self.log.warning.called)
+
+    def test_body_gone(self):
+        _cache, caching = self.make(ttl=60)
+        self.fetch(caching, _response(headers={'ETag': '"v1"'}))
+        for name in os.listdir(self.path):
+            with open(os.path.join(self.path, name), 'w') as fh:
+                fh.write('garbage')
+        resp = self.fetch(caching, _response(content=b'<rss></rss>'))
+        self.assertEqual(b'<rss></rss>', resp.content)
+        self.assertEqual({}, self.fetcher.requests[1][1])
+
+    def test_errors_not_cached(self):
+        cache, caching = self.make()
+        resp = self.fetch(caching, _response(503, b''))
+        self.assertEqual(503, resp.status_code)
+        self.assertIsNone(cache.lookup(URL))
+
+    def test_redirects_stored_under_asked_url(self):
+        cache, caching = self.make()
+        redirected = _response()
+        redirected.url = 'http://example.com/moved.xml'
+        resp = self.fetch(caching, redirected)
+        self.assertEqual(URL, resp.url)
+        self.assertIsNotNone(cache.lookup(URL))
+
+    def test_parse_memo(self):
+        cache, caching = self.make()
+        parse = mock.Mock(side_effect=lambda content: object())
+        first = cache.parse(self.fetch(caching, _response()), parse)
+        second = cache.parse(self.fetch(caching, _response(304, b'')),
+                             parse)
+        self.assertIs(first, second)
+        third = cache.parse(
+            self.fetch(caching, _response(content=b'<rss></rss>')), parse)
+        self.assertIsNot(first, third)
+        self.assertEqual(2, parse.call_count)
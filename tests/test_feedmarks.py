@@ -0,0 +1,151 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+import random
+import unittest
+
+import feedmarks
+import rssfeeds
+import timestamps
+
+START = datetime.datetime(2015, 10, 17, tzinfo=datetime.timezone.utc)
+
+
+def _entry(minutes, link=None):
+    when = START + datetime.timedelta(minutes=minutes)
+    if link is None:
+        link = 'http://logs.example.com/%s' % minutes
+    return rssfeeds.Entry(published=when.strftime('%a, %d %b %Y %H:%M:%S'
+                                                  ' +0000'),
+                          link=link)
+
+
+def _full(entries, expire_after):
+    recent, latest, _when = feedmarks.scan(
+        entries, expire_after=expire_after, parse_date=timestamps.parse)
+    if latest is None:
+        return recent, None
+    return recent, (latest.published, latest.link)
+
+
+def _incremental(mark, entries, expire_after):
+    mark.merge(entries, timestamps.parse)
+    mark.expire(expire_after.timestamp())
+    return len(mark.fails), mark.latest()
+
+
+class ScanTest(unittest.TestCase):
+    def test_counts_recent(self):
+        entries = [_entry(1), _entry(5), _entry(3)]
+        expire_after = START + datetime.timedelta(minutes=2)
+        recent, latest, when = feedmarks.scan(
+            entries, expire_after=expire_after, parse_date=timestamps.parse)
+        self.assertEqual(2, recent)
+        self.assertIs(entries[1], latest)
+        self.assertEqual(START + datetime.timedelta(minutes=5), when)
+
+    def test_nothing_recent(self):
+        self.assertEqual((0, None, None), feedmarks.scan(
+            [_entry(1)], expire_after=START + datetime.timedelta(hours=1),
+            parse_date=timestamps.parse))
+
+    def test_ties_go_down_the_feed(self):
+        entries = [_entry(1, 'a'), _entry(1, 'b')]
+        _recent, latest, _when = feedmarks.scan(
+            entries, parse_date=timestamps.parse)
+        self.assertEqual('b', latest.link)
+
+
+class FeedMarkTest(unittest.TestCase):
+    def test_merge_counts_new_entries(self):
+        mark = feedmarks.FeedMark()
+        self.assertEqual(2, mark.merge([_entry(1), _entry(2)],
+                                       timestamps.parse))
+        # Out of order (and with one more) is still one new entry.
+        self.assertEqual(1, mark.merge([_entry(3), _entry(1), _entry(2)],
+                                       timestamps.parse))
+        self.assertEqual(0, mark.merge([_entry(3), _entry(1), _entry(2)],
+                                       timestamps.parse))
+        self.assertEqual('http://logs.example.com/3', mark.newest_link)
+
+    def test_same_published_time_and_link(self):
+        mark = feedmarks.FeedMark()
+        mark.merge([_entry(1, 'a')], timestamps.parse)
+        self.assertEqual(1, mark.merge([_entry(1, 'a'), _entry(1, 'a')],
+                                       timestamps.parse))
+
+    def test_dropped_entries_are_pruned(self):
+        mark = feedmarks.FeedMark()
+        mark.merge([_entry(1), _entry(9)], timestamps.parse)
+        mark.merge([_entry(1)], timestamps.parse)
+        self.assertEqual(1, len(mark.fails))
+        self.assertEqual('http://logs.example.com/1', mark.latest()[1])
+
+    def test_round_trip(self):
+        mark = feedmarks.FeedMark(key='key')
+        mark.merge([_entry(1), _entry(2)], timestamps.parse)
+        copy = feedmarks.FeedMark.from_dict(mark.to_dict())
+        self.assertEqual(mark.to_dict(), copy.to_dict())
+        self.assertEqual(mark.latest(), copy.latest())
+
+    def test_seen_entries_are_not_parsed(self):
+        parsed = []
+
+        def parse_date(published):
+            parsed.append(published)
+            return timestamps.parse(published)
+
+        mark = feedmarks.FeedMark()
+        entries = [_entry(minutes) for minutes in range(20, 0, -1)]
+        self.assertEqual(20, mark.merge(entries, parse_date))
+        del parsed[:]
+        self.assertEqual(0, mark.merge(entries, parse_date))
+        self.assertEqual([], parsed)
+        # New ones at the top (one older than the newest one seen and
+        # one tied with it) and old ones dropping off the bottom.
+        entries = [_entry(21), _entry(5, 'late'), _entry(20, 'tie')]
+        entries.extend(_entry(minutes) for minutes in range(20, 3, -1))
+        self.assertEqual(3, mark.merge(entries, parse_date))
+        self.assertEqual(3, len(parsed))
+        self.assertEqual(len(entries), len(mark.fails))
+        self.assertEqual('http://logs.example.com/21', mark.latest()[1])
+
+    def test_rebuilds_when_reordered(self):
+        mark = feedmarks.FeedMark()
+        entries = [_entry(3), _entry(2), _entry(1)]
+        mark.merge(entries, timestamps.parse)
+        entries = [_entry(3), _entry(1), _entry(0)]
+        self.assertEqual(1, mark.merge(entries, timestamps.parse))
+        self.assertEqual(sorted(f[1] for f in mark.fails),
+                         sorted(e.published for e in entries))
+
+    def test_matches_full_scan(self):
+        rand = random.Random(42)
+        for _trial in range(200):
+            mark = feedmarks.FeedMark()
+            now = 0
+            links = iter(range(1000))
+            entries = []
+            for _check in range(15):
+                if rand.random() < 0.1:
+                    # Shuffled (and partly replaced) now and then.
+                    entries = rand.sample(entries, len(entries))
+                    entries[:rand.randint(0, 3)] = []
+                new = [_entry(now + rand.randint(-10, 2),
+                              link='link-%s' % next(links))
+                       for _i in range(rand.choice([0, 0, 1, 3]))]
+                entries = (new + entries)[:rand.randint(10, 20)]
+                now += rand.randint(0, 5)
+                expire_after = START + datetime.timedelta(minutes=now - 20)
+                self.assertEqual(_full(entries, expire_after),
+                                 _incremental(mark, entries, expire_after))
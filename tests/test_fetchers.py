@@ -0,0 +1,206 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from concurrent import futures
+from http import server
+import threading
+import time
+import unittest
+
+import requests
+
+import fetchers
+
+BODY = "Café au lait\n" * 5000
+
+
+class Handler(server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/slow':
+            time.sleep(1.0)
+        if self.path == '/missing':
+            self.send_error(404)
+            return
+        if self.path == '/echo':
+            body = self.headers.get('X-Test', '').encode('utf-8')
+        else:
+            body = BODY.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Consumer:
+    def __init__(self):
+        self.chunks = []
+
+    def feed(self, text):
+        self.chunks.append(text)
+
+
+class ChainTest(unittest.TestCase):
+    def test_chains(self):
+        fut = futures.Future()
+        chained = fetchers.chain(fut, lambda fut: fut.result() * 2)
+        fut.set_result(21)
+        self.assertEqual(42, chained.result())
+
+    def test_chains_errors(self):
+        fut = futures.Future()
+        chained = fetchers.chain(fut, lambda fut: fut.result())
+        fut.set_exception(IOError("broken"))
+        self.assertRaises(IOError, chained.result)
+
+    def test_runs_in_executor(self):
+        threads = []
+        with futures.ThreadPoolExecutor(max_workers=1) as executor:
+            chained = fetchers.chain(
+                fetchers.completed(1),
+                lambda fut: threads.append(threading.current_thread()),
+                executor=executor)
+            chained.result()
+        self.assertIsNot(threading.current_thread(), threads[0])
+
+    def test_executor_shut_down(self):
+        executor = futures.ThreadPoolExecutor(max_workers=1)
+        executor.shutdown()
+        chained = fetchers.chain(fetchers.completed(1), lambda fut: 2,
+                                 executor=executor)
+        self.assertRaises(RuntimeError, chained.result)
+
+    def test_cancel_cancels_source(self):
+        fut = futures.Future()
+        chained = fetchers.chain(fut, lambda fut: fut.result())
+        self.assertTrue(chained.cancel())
+        self.assertTrue(fut.cancelled())
+
+    def test_split_timeout(self):
+        self.assertEqual((1, 2), fetchers.split_timeout((1, 2)))
+        self.assertEqual((3, 3), fetchers.split_timeout(3))
+        self.assertEqual((None, None), fetchers.split_timeout(None))
+
+
+class EngineTestMixin:
+    """Tests every fetch engine has to pass (against a local server)."""
+
+    def make_fetcher(self):
+        raise NotImplementedError
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        cls.server.daemon_threads = True
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+        cls.base_url = 'http://127.0.0.1:%s' % cls.server.server_port
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.fetcher = self.make_fetcher()
+        self.addCleanup(self.fetcher.shutdown)
+
+    def test_submit(self):
+        resp = self.fetcher.submit(self.base_url + '/feed',
+                                   timeout=5).result()
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(BODY, resp.text)
+        self.assertEqual(BODY.encode('utf-8'), resp.content)
+        self.assertEqual('"v1"', resp.headers['etag'])
+        self.assertGreaterEqual(resp.took, 0)
+
+    def test_headers(self):
+        resp = self.fetcher.submit(self.base_url + '/echo', timeout=5,
+                                   headers={'X-Test': 'hello'}).result()
+        self.assertEqual('hello', resp.text)
+
+    def test_not_found(self):
+        resp = self.fetcher.submit(self.base_url + '/missing',
+                                   timeout=5).result()
+        self.assertEqual(404, resp.status_code)
+
+    def test_timeout(self):
+        fut = self.fetcher.submit(self.base_url + '/slow',
+                                  timeout=(5, 0.1))
+        self.assertRaises(requests.Timeout, fut.result)
+
+    def test_stream(self):
+        consumer = Consumer()
+        resp = self.fetcher.stream(self.base_url + '/feed', consumer,
+                                   timeout=5).result()
+        self.assertEqual(200, resp.status_code)
+        self.assertIsNone(resp.text)
+        self.assertEqual(BODY, "".join(consumer.chunks))
+        self.assertGreater(len(consumer.chunks), 1)
+
+    def test_stream_not_found(self):
+        consumer = Consumer()
+        resp = self.fetcher.stream(self.base_url + '/missing', consumer,
+                                   timeout=5).result()
+        self.assertEqual(404, resp.status_code)
+        self.assertEqual([], consumer.chunks)
+
+    def test_would_queue(self):
+        self.assertFalse(self.fetcher.would_queue(self.base_url + '/feed'))
+        slow = [self.fetcher.submit(self.base_url + '/slow', timeout=5)
+                for _i in range(self.capacity)]
+        self.assertTrue(self.fetcher.would_queue(self.base_url + '/feed'))
+        for fut in slow:
+            fut.result()
+        self.assertFalse(self.fetcher.would_queue(self.base_url + '/feed'))
+
+
+class ThreadFetcherTest(EngineTestMixin, unittest.TestCase):
+    capacity = 2
+
+    def make_fetcher(self):
+        return fetchers.ThreadFetcher(max_workers=self.capacity)
+
+
+@unittest.skipIf(fetchers._import_aiohttp() is None, "needs aiohttp")
+class AsyncioFetcherTest(EngineTestMixin, unittest.TestCase):
+    capacity = 2
+
+    def make_fetcher(self):
+        return fetchers.AsyncioFetcher(concurrency=10,
+                                       per_host=self.capacity)
+
+    def test_took_excludes_queueing(self):
+        # With one pooled connection the second fetch waits for the
+        # first one (which takes a second) before it starts.
+        fetcher = fetchers.AsyncioFetcher(concurrency=1, per_host=1)
+        self.addCleanup(fetcher.shutdown)
+        first = fetcher.submit(self.base_url + '/slow', timeout=5)
+        time.sleep(0.1)
+        second = fetcher.submit(self.base_url + '/feed', timeout=5)
+        self.assertGreater(first.result().took, 0.9)
+        self.assertLess(second.result().took, 0.5)
+
+
+class MakeFetcherTest(unittest.TestCase):
+    def test_unknown_engine(self):
+        fetcher = fetchers.make_fetcher('carrier-pigeon', max_workers=1)
+        self.addCleanup(fetcher.shutdown)
+        self.assertIsInstance(fetcher, fetchers.ThreadFetcher)
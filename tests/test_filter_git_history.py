@@ -0,0 +1,170 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from oslo_tools import filter_git_history
+
+
+class GitRepoTestCase(unittest.TestCase):
+    """Runs each test in a new git repository (as the current directory)."""
+
+    def setUp(self):
+        super().setUp()
+        self.repo = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.repo)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.repo)
+        self.ticks = 0
+        self.git('init', '-q', '-b', 'master')
+
+    def git(self, *args):
+        # Every commit gets its own (later) date, so that the history is
+        # walked in a stable order.
+        self.ticks += 1
+        date = '%s +0000' % (1445040000 + self.ticks)
+        env = dict(os.environ, GIT_AUTHOR_NAME='Someone',
+                   GIT_AUTHOR_EMAIL='someone@example.com',
+                   GIT_COMMITTER_NAME='Someone',
+                   GIT_COMMITTER_EMAIL='someone@example.com',
+                   GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date)
+        return subprocess.check_output(('git',) + args, env=env,
+                                       universal_newlines=True).strip()
+
+    def commit(self, message, files=None):
+        for path, content in (files or {}).items():
+            dirname = os.path.dirname(path)
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+            if content is None:
+                self.git('rm', '-q', path)
+                continue
+            with open(path, 'w') as fh:
+                fh.write(content)
+            self.git('add', path)
+        self.git('commit', '-q', '--allow-empty', '-m', message)
+        return self.git('rev-parse', 'HEAD')
+
+
+class HistoryFilterTest(GitRepoTestCase):
+    def log(self, *args):
+        return self.git('log', '--format=%s', *args).splitlines()
+
+    def test_filters(self):
+        self.commit('unrelated', {'README': 'readme'})
+        self.commit('add', {'lib/a.py': 'a', 'other.py': 'other'})
+        self.commit('other only', {'other.py': 'other 2'})
+        self.commit('change', {'lib/a.py': 'a 2', 'other.py': 'other 3'})
+        head = self.git('rev-parse', 'HEAD')
+        history_filter = filter_git_history.filter_history(['lib'])
+        self.assertEqual(['change', 'add'], self.log())
+        self.assertEqual(['lib/a.py'],
+                         self.git('ls-files').splitlines())
+        self.assertEqual('a 2', self.git('show', 'HEAD:lib/a.py'))
+        self.assertEqual(2, history_filter.kept)
+        self.assertEqual(2, history_filter.dropped)
+        self.assertEqual(head,
+                         self.git('rev-parse', 'refs/original/refs/heads/'
+                                  'master'))
+        # Authors (and dates) are kept.
+        self.assertEqual(self.git('log', '-1', '--format=%an %ad', head),
+                         self.git('log', '-1', '--format=%an %ad'))
+
+    def test_merges(self):
+        self.commit('add', {'lib/a.py': 'a'})
+        self.git('checkout', '-q', '-b', 'side')
+        self.commit('side other', {'other.py': 'other'})
+        self.git('checkout', '-q', 'master')
+        self.commit('main', {'lib/a.py': 'a 2'})
+        self.git('merge', '-q', '--no-edit', '-m', 'merge other', 'side')
+        self.git('checkout', '-q', '-b', 'side2')
+        self.commit('side lib', {'lib/b.py': 'b'})
+        self.git('checkout', '-q', 'master')
+        self.commit('main 2', {'lib/a.py': 'a 3'})
+        self.git('merge', '-q', '--no-edit', '-m', 'merge lib', 'side2')
+        filter_git_history.filter_history(['lib'])
+        # The merge of filtered out commits is gone, the other one stays.
+        self.assertEqual(['merge lib', 'main 2', 'side lib', 'main', 'add'],
+                         self.log('--date-order'))
+        self.assertEqual(['merge lib'], self.log('--merges'))
+        self.assertEqual(['lib/a.py', 'lib/b.py'],
+                         self.git('ls-files').splitlines())
+
+    def test_cut_at_given_roots(self):
+        self.commit('add', {'lib/a.py': 'a'})
+        root = self.commit('change', {'lib/a.py': 'a 2'})
+        self.commit('change again', {'lib/a.py': 'a 3'})
+        filter_git_history.filter_history(['lib'], roots=[root])
+        self.assertEqual(['change again', 'change'], self.log())
+
+    def test_refuses_dirty_trees(self):
+        self.commit('add', {'lib/a.py': 'a'})
+        with open('lib/a.py', 'w') as fh:
+            fh.write('changed')
+        self.assertRaises(filter_git_history.FilterError,
+                          filter_git_history.filter_history, ['lib'])
+
+    def test_refuses_overwriting_backups(self):
+        self.commit('add', {'lib/a.py': 'a'})
+        filter_git_history.filter_history(['lib'])
+        self.assertRaises(filter_git_history.FilterError,
+                          filter_git_history.filter_history, ['lib'])
+
+    def test_nothing_to_keep(self):
+        self.commit('add', {'lib/a.py': 'a'})
+        self.assertRaises(filter_git_history.FilterError,
+                          filter_git_history.filter_history, ['missing'])
+
+
+class HistoryScanTest(GitRepoTestCase):
+    def test_scan(self):
+        self.commit('unrelated', {'README': 'readme'})
+        self.git('checkout', '-q', '-b', 'side')
+        side_root = self.commit('add b', {'lib/b.py': 'b'})
+        self.git('checkout', '-q', 'master')
+        root = self.commit('add a', {'lib/a.py': 'a'})
+        self.commit('other', {'other.py': 'other'})
+        self.git('merge', '-q', '--no-edit', '-m', 'merge', 'side')
+        # Introduced after (and descending from) the roots.
+        descendant = self.commit('add c', {'lib/c.py': 'c'})
+        self.commit('change', {'lib/a.py': 'a 2'})
+        scan = filter_git_history.HistoryScan(
+            ['lib/a.py', 'lib/b.py', 'lib/c.py', 'missing.py'])
+        self.assertEqual({'lib/a.py': root, 'lib/b.py': side_root,
+                          'lib/c.py': descendant}, scan.introduced)
+        self.assertEqual(sorted([root, side_root]), sorted(scan.roots))
+        self.assertEqual(['missing.py'], scan.missing)
+        self.assertEqual(7, scan.total)
+        # Both roots, the commit adding c and the change of a.
+        self.assertEqual(4, scan.surviving)
+
+    def test_directories(self):
+        self.commit('unrelated', {'README': 'readme'})
+        root = self.commit('add', {'lib/sub/a.py': 'a'})
+        self.commit('change', {'lib/sub/a.py': 'a 2'})
+        scan = filter_git_history.HistoryScan(['lib/', 'lib/sub'])
+        self.assertEqual({'lib/': root, 'lib/sub': root}, scan.introduced)
+        self.assertEqual([root], scan.roots)
+        self.assertEqual(2, scan.surviving)
+
+    def test_other_ref(self):
+        self.commit('unrelated', {'README': 'readme'})
+        self.git('checkout', '-q', '-b', 'side')
+        root = self.commit('add', {'lib/a.py': 'a'})
+        self.git('checkout', '-q', 'master')
+        self.assertEqual([], filter_git_history.HistoryScan(['lib']).roots)
+        self.assertEqual([root], filter_git_history.HistoryScan(
+            ['lib'], ref='side').roots)
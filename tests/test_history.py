@@ -0,0 +1,102 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+import history
+
+
+def _entry(published, link):
+    return {'published': published, 'link': link}
+
+
+class HistoryStoreTest(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.store = history.HistoryStore(os.path.join(tmp_dir, 'sub',
+                                                       'history.db'))
+        self.addCleanup(self.store.close)
+
+    def test_latest_results(self):
+        self.store.record('oslo.db', (2, 7), {'status': 'ok'},
+                          computed_at=100)
+        self.store.record('oslo.db', (2, 7), {'status': 'failing'},
+                          computed_at=200)
+        self.store.record('oslo.db', (3, 4), {'status': 'ok'},
+                          computed_at=150)
+        self.assertEqual({
+            ('oslo.db', (2, 7)): (200, {'status': 'failing'}),
+            ('oslo.db', (3, 4)): (150, {'status': 'ok'}),
+        }, self.store.latest_results())
+
+    def test_same_result_is_checked_again(self):
+        self.store.record('nova', (2, 7), {'status': 'ok'},
+                          computed_at=100)
+        self.store.record('nova', (2, 7), {'status': 'ok'},
+                          computed_at=300)
+        self.assertEqual({('nova', (2, 7)): (300, {'status': 'ok'})},
+                         self.store.latest_results())
+        # Still the result computed first (just checked later), so that
+        # pruning by check time keeps it.
+        self.store.prune(200)
+        self.assertEqual(1, len(self.store.latest_results()))
+
+    def test_failures(self):
+        entries = [
+            _entry('Sat, 17 Oct 2015 07:26:28 +0000', 'a'),
+            _entry('Sun, 18 Oct 2015 07:26:28 +0000', 'b'),
+            _entry('not a date', 'c'),
+            {'link': 'd'},
+        ]
+        self.store.record('nova', (2, 7), {}, entries=entries)
+        # Recording the same entries again does not duplicate them.
+        self.store.record('nova', (2, 7), {}, entries=entries)
+        failures = self.store.failures('nova', 0)
+        self.assertEqual(['b', 'a'], [link for _when, _py, link
+                                      in failures])
+        self.assertEqual((2, 7), failures[0][1])
+        self.assertEqual(1, len(self.store.failures('nova', 0, limit=1)))
+        self.assertEqual([], self.store.failures('oslo.db', 0))
+
+    def test_daily_failures(self):
+        now = datetime.datetime(2015, 10, 20, tzinfo=datetime.timezone.utc)
+        entries = [
+            _entry((now - datetime.timedelta(hours=hours)).strftime(
+                '%a, %d %b %Y %H:%M:%S +0000'), str(hours))
+            for hours in (12, 6, 60, 120)]
+        self.store.record('nova', (2, 7), {}, entries=entries)
+        self.assertEqual({('nova', (2, 7)): [1, 0, 2]},
+                         self.store.daily_failures(
+                             ['nova'], 3, now=now.timestamp()))
+        self.assertEqual({}, self.store.daily_failures(
+            ['oslo.db'], 3, now=now.timestamp()))
+
+    def test_prune(self):
+        self.store.record('nova', (2, 7), {'status': 'ok'},
+                          entries=[_entry('Sat, 17 Oct 2015 07:26:28 +0000',
+                                          'a')],
+                          computed_at=100)
+        self.store.prune(2 ** 31)
+        self.assertEqual({}, self.store.latest_results())
+        self.assertEqual([], self.store.failures('nova', 0))
+
+
+class PyVersionTest(unittest.TestCase):
+    def test_round_trip(self):
+        self.assertEqual('3.10', history.format_py_version((3, 10)))
+        self.assertEqual((3, 10), history.parse_py_version('3.10'))
@@ -0,0 +1,32 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import sys
+import unittest
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              os.pardir, 'oslobot', 'benchmarks')
+if BENCHMARKS_DIR not in sys.path:
+    sys.path.insert(0, BENCHMARKS_DIR)
+
+import bench_imports  # noqa: E402
+
+
+class LazyImportsTest(unittest.TestCase):
+    """Importing the plugin (or a tool) leaves slow libraries alone."""
+
+    def test_imports_are_lazy(self):
+        for module, path, before in bench_imports.TARGETS:
+            _took, loaded = bench_imports.measure(module, path, before)
+            self.assertEqual([], bench_imports.eager_imports(loaded),
+                             "%s imports these up front" % module)
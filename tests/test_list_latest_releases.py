@@ -0,0 +1,118 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from oslo_tools import list_latest_releases
+
+
+def git(repo, *args, date='2015-10-17 12:00:00 +0000'):
+    env = dict(os.environ, GIT_AUTHOR_NAME='Someone',
+               GIT_AUTHOR_EMAIL='someone@example.com',
+               GIT_COMMITTER_NAME='Someone',
+               GIT_COMMITTER_EMAIL='someone@example.com',
+               GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date)
+    subprocess.check_call(['git'] + list(args), cwd=repo, env=env,
+                          stdout=subprocess.DEVNULL)
+
+
+class VersionKeyTest(unittest.TestCase):
+    def test_order(self):
+        tags = ['1.2.0', '1.10.0', '1.2.1', '1.3.0.0b1', '1.3.0rc1',
+                '1.3.0a2', '1.3']
+        self.assertEqual(['1.2.0', '1.2.1', '1.3.0a2', '1.3.0.0b1',
+                          '1.3.0rc1', '1.3', '1.10.0'],
+                         sorted(tags, key=list_latest_releases.version_key))
+
+    def test_not_releases(self):
+        for tag in ('stable/ocata', 'v1.2', '1.2-eol', '1.2.3c1'):
+            self.assertIsNone(list_latest_releases.version_key(tag))
+
+    def test_highest_tag(self):
+        self.assertEqual('2.0.0', list_latest_releases.highest_tag(
+            ['1.0.0', 'eol', '2.0.0', '2.0.0rc1']))
+        self.assertIsNone(list_latest_releases.highest_tag(['eol']))
+
+
+class LatestReleasesTest(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.repo_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.repo_root)
+        self.cache_path = os.path.join(self.repo_root, 'releases.json')
+
+    def make_repo(self, lib, tags=(), pack=False):
+        repo = os.path.join(self.repo_root, lib)
+        os.makedirs(repo)
+        git(repo, 'init', '-q')
+        for tag, date in tags:
+            git(repo, 'commit', '-q', '--allow-empty', '-m', tag, date=date)
+            git(repo, 'tag', tag)
+        if pack:
+            git(repo, 'pack-refs', '--all')
+        return repo
+
+    def latest_releases(self, libs, **kwargs):
+        return list_latest_releases.latest_releases(
+            self.repo_root, libs, workers=1, cache_path=self.cache_path,
+            **kwargs)
+
+    def test_latest_releases(self):
+        self.make_repo('oslo.config', [
+            ('1.0.0', '2015-01-01 00:00:00 +0000'),
+            ('1.10.0', '2015-03-01 00:00:00 +0000'),
+            ('1.2.0', '2015-02-01 00:00:00 +0000'),
+        ])
+        self.make_repo('oslo.db', [
+            ('2.0.0rc1', '2015-04-01 00:00:00 +0000'),
+        ], pack=True)
+        self.make_repo('oslo.unreleased')
+        self.assertEqual([
+            ('2015-04-01 00:00:00 +0000', 'oslo.db', '2.0.0rc1'),
+            ('2015-03-01 00:00:00 +0000', 'oslo.config', '1.10.0'),
+            (list_latest_releases.UNRELEASED[0], 'oslo.unreleased',
+             list_latest_releases.UNRELEASED[1]),
+        ], self.latest_releases(['oslo.config', 'oslo.db',
+                                 'oslo.unreleased']))
+
+    def test_cached_until_tags_change(self):
+        repo = self.make_repo('oslo.config', [
+            ('1.0.0', '2015-01-01 00:00:00 +0000'),
+        ])
+        first = self.latest_releases(['oslo.config'])
+        with mock.patch('concurrent.futures.ProcessPoolExecutor',
+                        side_effect=AssertionError("scanned again")):
+            self.assertEqual(first, self.latest_releases(['oslo.config']))
+        git(repo, 'commit', '-q', '--allow-empty', '-m', '2.0.0',
+            date='2015-02-01 00:00:00 +0000')
+        git(repo, 'tag', '2.0.0')
+        self.assertEqual('2.0.0',
+                         self.latest_releases(['oslo.config'])[0][2])
+
+    def test_unreadable_repos(self):
+        self.make_repo('oslo.config', [
+            ('1.0.0', '2015-01-01 00:00:00 +0000'),
+        ])
+        errors = []
+        releases = self.latest_releases(
+            ['oslo.config', 'oslo.missing'],
+            on_error=lambda lib, error: errors.append(lib))
+        self.assertEqual(['oslo.config'], [lib for _date, lib, _tag
+                                           in releases])
+        self.assertEqual(['oslo.missing'], errors)
+        self.assertRaises(OSError, self.latest_releases,
+                          ['oslo.config', 'oslo.missing'])
@@ -0,0 +1,92 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from oslo_tools import config
+from oslo_tools import list_oslo_projects
+
+DEFAULTS = {'repo_root': '.', 'team': 'oslo'}
+
+PROJECTS = """
+oslo:
+  deliverables:
+    oslo.db:
+      repos:
+        - openstack/oslo.db
+    oslo.config:
+      repos:
+        - openstack/oslo.config
+        - openstack/oslo.config-extras
+    retired:
+"""
+
+
+class ListProjectsTest(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.repo_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.repo_root)
+        projects_path = list_oslo_projects.projects_file(self.repo_root)
+        os.makedirs(os.path.dirname(projects_path))
+        with open(projects_path, 'w') as fh:
+            fh.write(PROJECTS)
+        self.cache_path = os.path.join(self.repo_root, 'projects.json')
+
+    def test_lists_first_repos(self):
+        self.assertEqual(['openstack/oslo.config', 'openstack/oslo.db'],
+                         list_oslo_projects.list_projects(
+                             self.repo_root, cache_path=self.cache_path))
+
+    def test_unknown_team(self):
+        self.assertRaises(ValueError, list_oslo_projects.list_projects,
+                          self.repo_root, team='nova',
+                          cache_path=self.cache_path)
+
+
+class ParseSimpleArgumentsTest(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(config, 'existing_config_files',
+                                    return_value=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(os.environ, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_parses(self):
+        self.assertEqual(DEFAULTS,
+                         config.parse_simple_arguments(DEFAULTS, []))
+        self.assertEqual({'repo_root': '~/dev', 'team': 'nova'},
+                         config.parse_simple_arguments(
+                             DEFAULTS, ['--repo_root', '~/dev',
+                                        '--team=nova']))
+
+    def test_needs_oslo_config(self):
+        for argv in (['--help'], ['--team'], ['--team', '--repo_root'],
+                     ['--profile', 'out.prof'], ['nova'], ['-h']):
+            self.assertIsNone(config.parse_simple_arguments(DEFAULTS,
+                                                            argv))
+
+    def test_config_files_need_oslo_config(self):
+        with mock.patch.object(config, 'existing_config_files',
+                               return_value=['./oslo.conf']):
+            self.assertIsNone(config.parse_simple_arguments(DEFAULTS, []))
+
+    def test_environment_needs_oslo_config(self):
+        os.environ['OS_DEFAULT__TEAM'] = 'nova'
+        self.assertIsNone(config.parse_simple_arguments(DEFAULTS, []))
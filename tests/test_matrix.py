@@ -0,0 +1,105 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+import matrix
+
+TEMPLATES = [
+    (matrix.DEFAULT_TEMPLATE, 'periodic-%(project_name)s-%(py_version)s'),
+    ('stable', 'periodic-%(project_name)s-stable'),
+]
+
+
+class BuildNameTest(unittest.TestCase):
+    def test_build_name(self):
+        self.assertEqual('periodic-oslo.db-py27', matrix.build_name(
+            TEMPLATES[0][1], 'oslo.db', (2, 7)))
+        self.assertEqual('periodic-oslo.db-py310', matrix.build_name(
+            TEMPLATES[0][1], 'oslo.db', (3, 10)))
+
+
+class MatrixTest(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.matrix = matrix.Matrix(['nova', 'oslo.db', 'nova'],
+                                    [(2, 7), [3, 4], (2, 7)], TEMPLATES)
+
+    def test_cells(self):
+        self.assertEqual(['nova', 'oslo.db'], self.matrix.project_names)
+        self.assertEqual([(2, 7), (3, 4)], self.matrix.py_versions)
+        self.assertEqual(8, len(self.matrix))
+        cells = self.matrix.cells()
+        self.assertEqual(8, len(cells))
+        self.assertEqual(matrix.Cell('default', 'nova', (2, 7)), cells[0])
+        self.assertEqual(matrix.Cell('stable', 'oslo.db', (3, 4)),
+                         cells[-1])
+
+    def test_builds(self):
+        builds = self.matrix.builds()
+        self.assertEqual('periodic-nova-py34',
+                         builds[matrix.Cell('default', 'nova', (3, 4))])
+        # Templates need not use the python version (cells then share
+        # their build).
+        self.assertEqual(6, len(set(builds.values())))
+        self.assertEqual('periodic-nova-stable',
+                         builds[matrix.Cell('stable', 'nova', (3, 4))])
+
+    def test_grouped(self):
+        results = {
+            matrix.Cell('default', 'nova', (2, 7)): 'ok',
+            matrix.Cell('default', 'oslo.db', (3, 4)): 'failing',
+        }
+        self.assertEqual(
+            [('default',
+              [(matrix.Cell('default', 'nova', (2, 7)), 'ok'),
+               (matrix.Cell('default', 'oslo.db', (3, 4)), 'failing')])],
+            self.matrix.grouped(results))
+
+    def test_pivoted(self):
+        results = {
+            matrix.Cell('default', 'nova', (2, 7)): 'ok',
+            matrix.Cell('stable', 'oslo.db', (2, 7)): 'failing',
+            matrix.Cell('stable', 'oslo.db', (3, 4)): 'ok',
+        }
+        columns, rows = self.matrix.pivoted(results)
+        self.assertEqual([('default', (2, 7)), ('stable', (2, 7)),
+                          ('stable', (3, 4))], columns)
+        self.assertEqual([('nova', ['ok', None, None]),
+                          ('oslo.db', [None, 'failing', 'ok'])], rows)
+
+    def test_pivoted_nothing(self):
+        self.assertEqual(([], []), self.matrix.pivoted({}))
+
+
+class ParseQueryTest(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual({
+            'project_names': ['nova', 'odd:thing'],
+            'teams': ['oslo'],
+            'py_versions': [(2, 7), (3, 10)],
+            'templates': ['stable'],
+            'layout': 'grouped',
+        }, matrix.parse_query(['nova', 'team:oslo', 'py:2.7', 'py:3.10',
+                               'tpl:stable', 'grouped', 'odd:thing']))
+
+    def test_empty(self):
+        self.assertEqual({
+            'project_names': [],
+            'teams': [],
+            'py_versions': [],
+            'templates': [],
+            'layout': None,
+        }, matrix.parse_query([]))
+
+    def test_bad_python_version(self):
+        self.assertRaises(ValueError, matrix.parse_query, ['py:two'])
@@ -0,0 +1,164 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from datetime import date
+import unittest
+from unittest import mock
+
+import fetchers
+import meetings
+
+URL_TPL = 'http://eavesdrop.example.com/meetings/%(team)s/%(year)s/'
+
+
+class FakeFetcher:
+    def __init__(self, listings=None):
+        self.listings = listings or {}
+        self.urls = []
+
+    def stream(self, url, consumer, timeout=None, headers=None):
+        self.urls.append(url)
+        try:
+            listing = self.listings[url]
+        except KeyError:
+            return fetchers.completed(
+                fetchers.Response(url, 404, 'Not Found', None))
+        consumer.feed(listing)
+        return fetchers.completed(fetchers.Response(url, 200, 'OK', None))
+
+
+def _listing(*links):
+    return ''.join('<a href="%s">%s</a>\n' % (link, link) for link in links)
+
+
+class NotesLinkExtractorTest(unittest.TestCase):
+    LISTING = (
+        '<html><body><pre>'
+        '<a href="?C=N;O=D">Name</a>\n'
+        '<a href="oslo.2015-10-01-16.00.html">oslo.2015-10-01-16.00.html</a>\n'
+        '<a href="oslo.2015-10-01-16.00.log.html">log</a>\n'
+        "<a href='oslo.2015-10-08-16.00.html'>oslo.2015-10-08-16.00</a>\n"
+        '<a href="oslo.2015-10-08-16.00.log.html">log</a>\n'
+        '<a HREF = "other.2015-10-09-16.00.html">other</a>\n'
+        '</pre></body></html>'
+    )
+
+    def extract(self, chunks, team='oslo'):
+        extractor = meetings.NotesLinkExtractor(team)
+        for chunk in chunks:
+            extractor.feed(chunk)
+        return extractor.close()
+
+    def test_whole(self):
+        self.assertEqual('oslo.2015-10-08-16.00.html',
+                         self.extract([self.LISTING]))
+
+    def test_across_chunk_boundaries(self):
+        for size in range(1, 40):
+            chunks = [self.LISTING[i:i + size]
+                      for i in range(0, len(self.LISTING), size)]
+            self.assertEqual('oslo.2015-10-08-16.00.html',
+                             self.extract(chunks), size)
+
+    def test_other_team(self):
+        self.assertEqual('other.2015-10-09-16.00.html',
+                         self.extract([self.LISTING], team='other'))
+        self.assertIsNone(self.extract([self.LISTING], team='nova'))
+
+    def test_carry_is_bounded(self):
+        extractor = meetings.NotesLinkExtractor('oslo')
+        extractor.feed('<' + 'x' * (extractor.max_carry + 1))
+        self.assertEqual('', extractor._carry)
+        extractor.feed('<a href="oslo.2015-10-01-16.00.html">')
+        self.assertEqual('oslo.2015-10-01-16.00.html', extractor.close())
+
+
+class MeetingIndexTest(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.year = date.today().year
+        self.fetcher = FakeFetcher()
+
+    def clock(self, now):
+        # Not time.time itself (that is what date.today uses too).
+        return mock.patch('meetings.time', time=mock.Mock(return_value=now))
+
+    def make(self, **kwargs):
+        return meetings.MeetingIndex(self.fetcher, URL_TPL, self.year - 3,
+                                     **kwargs)
+
+    def add(self, team, year, *links):
+        url = URL_TPL % {'team': team, 'year': year}
+        self.fetcher.listings[url] = _listing(*links)
+
+    def test_latest(self):
+        self.add('oslo', self.year - 2, 'oslo.2015-01-01-16.00.html')
+        self.add('oslo', self.year - 1, 'oslo.2016-01-01-16.00.html',
+                 'oslo.2016-02-01-16.00.html',
+                 'oslo.2016-02-01-16.00.log.html')
+        index = self.make()
+        self.assertEqual(URL_TPL % {'team': 'oslo', 'year': self.year - 1} +
+                         'oslo.2016-02-01-16.00.html', index.latest('oslo'))
+        self.assertEqual(4, len(self.fetcher.urls))
+        # Cached (until it expires).
+        index.latest('oslo')
+        self.assertEqual(4, len(self.fetcher.urls))
+
+    def test_refresh_probes_from_latest_year(self):
+        self.add('oslo', self.year - 2, 'oslo.2015-01-01-16.00.html')
+        index = self.make()
+        index.refresh('oslo')
+        self.fetcher.urls = []
+        self.add('oslo', self.year, 'oslo.2017-01-01-16.00.html')
+        urls = index.refresh('oslo')
+        self.assertEqual([URL_TPL % {'team': 'oslo', 'year': year}
+                          for year in range(self.year, self.year - 3, -1)],
+                         self.fetcher.urls)
+        self.assertEqual({self.year - 2, self.year}, set(urls))
+
+    def test_refresh_after_failures_probes_everything(self):
+        index = self.make()
+        failing = mock.Mock()
+        failing.stream.return_value = fetchers.chain(
+            fetchers.completed(None), lambda fut: 1 / 0)
+        index.fetcher = failing
+        self.assertEqual({}, index.refresh('oslo'))
+        index.fetcher = self.fetcher
+        self.add('oslo', self.year - 3, 'oslo.2014-01-01-16.00.html')
+        self.assertEqual([self.year - 3], list(index.refresh('oslo')))
+
+    def test_expired(self):
+        index = self.make(ttl=60)
+        self.add('oslo', self.year, 'oslo.2017-01-01-16.00.html')
+        with self.clock(1000.0):
+            index.latest('oslo')
+        with self.clock(1060.0):
+            index.latest('oslo')
+        # Only the year with the latest notes is probed again.
+        self.assertEqual(5, len(self.fetcher.urls))
+
+    def test_unknown_teams_are_forgotten(self):
+        index = self.make(ttl=60)
+        self.add('oslo', self.year, 'oslo.2017-01-01-16.00.html')
+        with self.clock(1000.0):
+            index.latest('oslo')
+            self.assertIsNone(index.latest('olso'))
+        with self.clock(1060.0):
+            index.refresh_all()
+        self.assertEqual(['oslo'], list(index._teams))
+
+    def test_unknown_teams_are_bounded(self):
+        index = self.make()
+        index.max_unknown = 3
+        for team in ('a', 'b', 'c', 'd', 'e'):
+            index.latest(team)
+        self.assertEqual(['c', 'd', 'e'], sorted(index._teams))
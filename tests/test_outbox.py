@@ -0,0 +1,125 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+import unittest
+
+import outbox
+
+
+class Recorder:
+    def __init__(self, expected):
+        self.sent = []
+        self.expected = expected
+        self.done = threading.Event()
+
+    def __call__(self, target, content):
+        self.sent.append((time.monotonic(), target, content))
+        if len(self.sent) >= self.expected:
+            self.done.set()
+
+    def wait(self):
+        if not self.done.wait(10):
+            raise AssertionError("Only %s of %s messages got sent"
+                                 % (len(self.sent), self.expected))
+
+
+class OutboxTest(unittest.TestCase):
+    def make(self, send_func, **kwargs):
+        box = outbox.Outbox(send_func, **kwargs)
+        self.addCleanup(box.shutdown)
+        return box
+
+    def test_unpaced_keeps_order(self):
+        recorder = Recorder(5)
+        box = self.make(recorder, rate=0)
+        for i in range(5):
+            self.assertTrue(box.put('#oslo', str(i)))
+        recorder.wait()
+        self.assertEqual([str(i) for i in range(5)],
+                         [content for _when, _target, content
+                          in recorder.sent])
+
+    def test_paces_after_burst(self):
+        recorder = Recorder(4)
+        box = self.make(recorder, rate=20.0, burst=2)
+        started = time.monotonic()
+        for i in range(4):
+            box.put('#oslo', str(i))
+        recorder.wait()
+        # Two go out right away, the others a line (1/20s) apart.
+        self.assertGreaterEqual(recorder.sent[-1][0] - started, 0.09)
+        self.assertEqual(['0', '1', '2', '3'],
+                         [content for _when, _target, content
+                          in recorder.sent])
+
+    def test_rate_holds_for_long_messages(self):
+        recorder = Recorder(4)
+        box = self.make(recorder, rate=20.0, burst=2)
+        started = time.monotonic()
+        for i in range(4):
+            box.put('#oslo', "\n".join([str(i)] * 10))
+        recorder.wait()
+        # Whatever the message sizes, no more than a burst (and the lines
+        # of the message being sent) go out ahead of the rate.
+        lines = 0
+        for when, _target, content in recorder.sent:
+            self.assertGreaterEqual(when - started + 0.01,
+                                    (lines - 2) / 20.0)
+            lines += content.count("\n") + 1
+        self.assertGreaterEqual(recorder.sent[-1][0] - started, 1.4)
+
+    def test_long_message_does_not_hold_back_others(self):
+        recorder = Recorder(2)
+        box = self.make(recorder, rate=1.0, burst=2)
+        box.put('#oslo', "\n".join(["line"] * 20))
+        box.put('someone', "short")
+        started = time.monotonic()
+        recorder.wait()
+        self.assertLess(recorder.sent[-1][0] - started, 1.0)
+
+    def test_targets_are_paced_apart(self):
+        recorder = Recorder(4)
+        box = self.make(recorder, rate=0.01, burst=2)
+        for target in ('#oslo', 'someone'):
+            for i in range(2):
+                box.put(target, str(i))
+        recorder.wait()
+        self.assertEqual(
+            [('#oslo', '0'), ('#oslo', '1'),
+             ('someone', '0'), ('someone', '1')],
+            sorted((target, content)
+                   for _when, target, content in recorder.sent))
+
+    def test_shutdown_drops_queued(self):
+        recorder = Recorder(1)
+        box = outbox.Outbox(recorder, rate=0.01, burst=1)
+        for i in range(3):
+            box.put('#oslo', str(i))
+        recorder.wait()
+        self.assertEqual(2, box.shutdown())
+        self.assertFalse(box.put('#oslo', 'late'))
+
+    def test_send_failures_are_survived(self):
+        recorder = Recorder(1)
+
+        def send(target, content):
+            if content == 'bad':
+                raise IOError("disconnected")
+            recorder(target, content)
+
+        box = self.make(send, rate=0)
+        box.put('#oslo', 'bad')
+        box.put('#oslo', 'good')
+        recorder.wait()
+        self.assertEqual('good', recorder.sent[0][2])
@@ -0,0 +1,82 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import unittest
+
+from errbot.backends import test
+
+import tests
+
+STABLE_TPL = 'periodic-%(project_name)s-%(py_version)s-stable'
+
+
+class PluginConfigTest(unittest.TestCase):
+    """Configures the plugin the way admins do (``!plugin config``)."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.bot = test.TestBot(extra_plugin_dir=tests.PLUGINS_DIR,
+                               loglevel=logging.ERROR,
+                               extra_config={
+                                   'BOT_ADMINS': ('gbin@localhost',),
+                               })
+        cls.bot.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.bot.stop()
+        super().tearDownClass()
+
+    def configure(self, configuration):
+        self.bot.push_message("!plugin config oslobot %r" % configuration)
+        return self.bot.pop_message(timeout=30)
+
+    def plugin_config(self):
+        plugin = self.bot.bot.plugin_manager.get_plugin_obj_by_name(
+            'oslobot')
+        return plugin.config
+
+    def test_matrix_templates(self):
+        self.assertEqual("Plugin configuration done.", self.configure({
+            'periodic_matrix_templates': {'stable': STABLE_TPL},
+        }))
+        config = self.plugin_config()
+        self.assertEqual({'stable': STABLE_TPL},
+                         config['periodic_matrix_templates'])
+        # Settings left out keep their default value.
+        self.assertEqual('pivot', config['periodic_matrix_layout'])
+
+    def test_bad_matrix_templates(self):
+        reply = self.configure({'periodic_matrix_templates': {'stable': 3}})
+        self.assertIn("Incorrect plugin configuration", reply)
+        self.assertIn("periodic_matrix_templates", reply)
+
+    def test_project_teams(self):
+        self.assertEqual("Plugin configuration done.", self.configure({
+            'periodic_project_teams': ['oslo', 'nova'],
+        }))
+        self.assertEqual(['oslo', 'nova'],
+                         self.plugin_config()['periodic_project_teams'])
+
+    def test_bad_project_teams(self):
+        reply = self.configure({'periodic_project_teams': [3]})
+        self.assertIn("Incorrect plugin configuration", reply)
+
+    def test_bad_type(self):
+        reply = self.configure({'periodic_check_frequency': 'often'})
+        self.assertIn("Incorrect plugin configuration", reply)
+
+    def test_unknown_setting(self):
+        reply = self.configure({'periodic_bogus': 1})
+        self.assertIn("Unknown setting 'periodic_bogus'", reply)
@@ -0,0 +1,165 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from concurrent import futures
+import logging
+import threading
+import unittest
+
+from errbot.backends import test
+
+import fetchers
+import tests
+
+
+class FakeFetcher:
+    """Feed fetcher whose fetches finish when the test says so."""
+
+    name = 'fake'
+
+    def __init__(self):
+        self.futs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, url, timeout=None, headers=None):
+        fut = futures.Future()
+        with self.lock:
+            self.futs.setdefault(url, []).append(fut)
+        return fut
+
+    def finish(self, url):
+        with self.lock:
+            futs = self.futs[url]
+        for fut in futs:
+            if fut.done():
+                continue
+            fut.set_result(fetchers.Response(url, 400, 'Bad Request',
+                                             'No Failed Runs'))
+
+    def finish_all(self):
+        with self.lock:
+            urls = list(self.futs)
+        for url in urls:
+            self.finish(url)
+
+    def shutdown(self):
+        pass
+
+
+class PeriodicsTest(unittest.TestCase):
+    """Fetches periodic results (with a fake feed fetcher)."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.bot = test.TestBot(extra_plugin_dir=tests.PLUGINS_DIR,
+                               loglevel=logging.ERROR)
+        cls.bot.start()
+        cls.plugin = cls.bot.bot.plugin_manager.get_plugin_obj_by_name(
+            'oslobot')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.bot.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.fetcher = FakeFetcher()
+        self.addCleanup(self.fetcher.finish_all)
+        for name, value in [('feed_fetcher', self.fetcher),
+                            ('feed_cache', None)]:
+            self.addCleanup(setattr, self.plugin, name,
+                            getattr(self.plugin, name))
+            setattr(self.plugin, name, value)
+        self.config = dict(self.plugin.config)
+        self.addCleanup(self.plugin.config.update, self.config)
+        self.plugin.config['periodic_python_versions'] = [(2, 7)]
+
+    def url(self, project_name):
+        return self.plugin.config['periodic_url_tpl'] % {
+            'build_name': 'periodic-%s-py27-with-oslo-master' % project_name,
+        }
+
+    def test_snapshot_only_fetches_missing(self):
+        plugin = self.plugin
+        plugin.snapshot.update({
+            ('oslo.db', (2, 7)): {
+                'status': '2 failures',
+                'last_fail': 'Saturday Oct, 17, 2015 at 0:00:00 UTC',
+                'last_fail_url': 'http://logs.example.com/1',
+                'discarded': 0,
+            },
+        })
+        fetching = threading.Timer(0.1, self.fetcher.finish,
+                                   args=(self.url('oslo.config'),))
+        fetching.start()
+        self.addCleanup(fetching.cancel)
+        content, late = plugin.snapshot_periodics_table(
+            project_names=['oslo.config', 'oslo.db'])
+        self.assertIsNone(late)
+        self.assertEqual([self.url('oslo.config')], list(self.fetcher.futs))
+        self.assertIn('2 failures', content)
+        self.assertIn('All OK (no recent failures)', content)
+        # Now both are in the snapshot (and fresh).
+        plugin.snapshot_periodics_table(
+            project_names=['oslo.config', 'oslo.db'])
+        self.assertEqual(1, len(self.fetcher.futs[self.url('oslo.config')]))
+
+    def builds(self, *project_names):
+        return dict(((project_name, (2, 7)),
+                     ('periodic-%s-py27-with-oslo-master' % project_name,
+                      None))
+                    for project_name in project_names)
+
+    def test_all_in_within_budget(self):
+        threading.Timer(0.1, self.fetcher.finish_all).start()
+        results, late = self.plugin.fetch_builds(
+            self.builds('oslo.config'), budget=5.0)
+        self.assertIsNone(late)
+        self.assertEqual('All OK (no recent failures)',
+                         results[('oslo.config', (2, 7))]['status'])
+
+    def test_shared_builds_are_fetched_once(self):
+        builds = self.builds('oslo.config')
+        builds['other'] = builds[('oslo.config', (2, 7))]
+        threading.Timer(0.1, self.fetcher.finish_all).start()
+        results, _late = self.plugin.fetch_builds(builds, budget=5.0)
+        self.assertEqual(1, len(self.fetcher.futs[self.url('oslo.config')]))
+        self.assertEqual(results['other'],
+                         results[('oslo.config', (2, 7))])
+
+    def test_late_results_are_updated(self):
+        self.plugin.config['periodic_report_late'] = 'update'
+        threading.Timer(0.1, self.fetcher.finish,
+                        args=(self.url('oslo.config'),)).start()
+        results, late = self.plugin.fetch_builds(
+            self.builds('oslo.config', 'oslo.db'), budget=0.5)
+        self.assertEqual('All OK (no recent failures)',
+                         results[('oslo.config', (2, 7))]['status'])
+        pending = results[('oslo.db', (2, 7))]
+        self.assertEqual('Pending', pending['status'])
+        self.assertTrue(pending['incomplete'])
+        self.assertFalse(late.done())
+        self.fetcher.finish(self.url('oslo.db'))
+        self.assertEqual({('oslo.db', (2, 7))}, set(late.result(timeout=5)))
+        self.assertEqual('All OK (no recent failures)',
+                         late.result()[('oslo.db', (2, 7))]['status'])
+
+    def test_late_results_are_cancelled(self):
+        self.plugin.config['periodic_report_late'] = 'cancel'
+        results, late = self.plugin.fetch_builds(
+            self.builds('oslo.db'), budget=0.1)
+        self.assertIsNone(late)
+        result = results[('oslo.db', (2, 7))]
+        self.assertEqual('Fetch cancelled', result['status'])
+        self.assertTrue(result['incomplete'])
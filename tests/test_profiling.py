@@ -0,0 +1,132 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import io
+import os
+import pstats
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from oslo_tools import config
+import profiling
+
+
+def _busy(seconds):
+    deadline = time.monotonic() + seconds
+    total = 0
+    while time.monotonic() < deadline:
+        total += sum(range(100))
+    return total
+
+
+def _idle(event):
+    event.wait()
+
+
+class ProfilingTestCase(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+
+class MakeProfilerTest(unittest.TestCase):
+    def test_kinds(self):
+        self.assertIsInstance(profiling.make_profiler('sampling'),
+                              profiling.SamplingProfiler)
+        self.assertIsInstance(profiling.make_profiler('deterministic'),
+                              profiling.DeterministicProfiler)
+        self.assertRaises(ValueError, profiling.make_profiler, 'magic')
+
+    def test_interval(self):
+        self.assertEqual(0.5, profiling.make_profiler(
+            'sampling', interval=0.5).interval)
+
+
+class DeterministicProfilerTest(ProfilingTestCase):
+    def test_profiles(self):
+        profiler = profiling.DeterministicProfiler()
+        profiler.start()
+        try:
+            _busy(0.05)
+        finally:
+            profiler.stop()
+        hotspots = profiler.hotspots(100)
+        self.assertLessEqual(len(profiler.hotspots(2)), 2)
+        busy = [row for row in hotspots if row[0].endswith('(_busy)')]
+        self.assertEqual(1, len(busy))
+        self.assertTrue(busy[0][0].startswith('test_profiling.py:'))
+        self.assertEqual(1, busy[0][1])
+        path = os.path.join(self.path, 'out' + profiler.extension)
+        profiler.dump(path)
+        self.assertTrue(pstats.Stats(path).stats)
+
+
+class SamplingProfilerTest(ProfilingTestCase):
+    def test_samples_other_threads(self):
+        idle = threading.Event()
+        idler = threading.Thread(target=_idle, args=(idle,))
+        idler.start()
+        self.addCleanup(idler.join)
+        self.addCleanup(idle.set)
+        # Only counted as idle once it sits waiting.
+        deadline = time.monotonic() + 5
+        while (sys._current_frames()[idler.ident].f_code.co_name != 'wait' and
+               time.monotonic() < deadline):
+            time.sleep(0.001)
+        profiler = profiling.SamplingProfiler(interval=0.001)
+        profiler.start()
+        try:
+            worker = threading.Thread(target=_busy, args=(0.2,))
+            worker.start()
+            worker.join()
+        finally:
+            profiler.stop()
+        self.assertGreater(profiler.samples, 0)
+        hotspots = profiler.hotspots(5)
+        self.assertLessEqual(len(hotspots), 5)
+        labels = [label for label, _own, _total in profiler.hotspots(100)]
+        self.assertTrue(any('(_busy)' in label for label in labels),
+                        labels)
+        # The thread that sat waiting all along was not counted.
+        for stack in profiler.stacks:
+            self.assertNotIn('_idle', [name for _file, _line, name in stack])
+        path = os.path.join(self.path, 'out' + profiler.extension)
+        profiler.dump(path)
+        with open(path) as fh:
+            lines = fh.read().splitlines()
+        self.assertEqual(len(profiler.stacks), len(lines))
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertGreater(int(count), 0)
+            self.assertIn(';', stack)
+
+
+class ToolProfilingTest(ProfilingTestCase):
+    def test_profiles_until_exit(self):
+        path = os.path.join(self.path, 'tool.prof')
+        with mock.patch('atexit.register') as register:
+            config._start_profiling(path, 3)
+        stop, = register.call_args[0]
+        stderr = io.StringIO()
+        try:
+            _busy(0.01)
+        finally:
+            with mock.patch('sys.stderr', stderr):
+                stop()
+        self.assertTrue(pstats.Stats(path).stats)
+        self.assertIn('_busy', stderr.getvalue())
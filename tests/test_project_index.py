@@ -0,0 +1,121 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from oslo_tools import project_index
+
+PROJECTS = """
+oslo:
+  ptl: Someone
+  deliverables:
+    oslo.config:
+      repos:
+        - openstack/oslo.config
+    oslo.db:
+      repos:
+        - openstack/oslo.db
+nova:
+  deliverables:
+    nova:
+      repos:
+        - openstack/nova
+        - openstack/python-novaclient
+    empty:
+"""
+
+
+class ProjectIndexTest(unittest.TestCase):
+    def test_lookups(self):
+        index = project_index.ProjectIndex.from_projects(
+            project_index._parse(PROJECTS))
+        self.assertEqual(['nova', 'oslo'], index.team_names())
+        self.assertEqual(['openstack/oslo.config', 'openstack/oslo.db'],
+                         index.repos('oslo'))
+        self.assertEqual(4, len(index.repos()))
+        self.assertEqual(('nova', 'nova'),
+                         index.owner('openstack/python-novaclient'))
+        self.assertIsNone(index.owner('openstack/unknown'))
+        self.assertEqual([], index.deliverables('nova')['empty'])
+        self.assertRaises(ValueError, index.deliverables, 'unknown')
+
+
+class LoadTest(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.projects_path = os.path.join(self.path, 'projects.yaml')
+        self.cache_path = os.path.join(self.path, 'cache', 'projects.json')
+        self.write(PROJECTS)
+        patcher = mock.patch.object(project_index, '_parse',
+                                    wraps=project_index._parse)
+        self.parse = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, content, mtime_ns=None):
+        with open(self.projects_path, 'w') as fh:
+            fh.write(content)
+        if mtime_ns is not None:
+            os.utime(self.projects_path, ns=(mtime_ns, mtime_ns))
+
+    def load(self):
+        return project_index.load(self.projects_path,
+                                  cache_path=self.cache_path)
+
+    def test_cached(self):
+        self.assertEqual(['nova', 'oslo'], self.load().team_names())
+        self.assertEqual(['nova', 'oslo'], self.load().team_names())
+        self.assertEqual(1, self.parse.call_count)
+
+    def test_changed(self):
+        self.write(PROJECTS, mtime_ns=10 ** 18)
+        self.load()
+        self.write(PROJECTS.replace('oslo.db', 'oslo.log'),
+                   mtime_ns=10 ** 18)
+        self.assertEqual(['openstack/oslo.config', 'openstack/oslo.log'],
+                         self.load().repos('oslo'))
+        self.assertEqual(2, self.parse.call_count)
+
+    def test_touched_but_not_changed(self):
+        self.load()
+        os.utime(self.projects_path, ns=(10 ** 18, 10 ** 18))
+        self.load()
+        self.assertEqual(1, self.parse.call_count)
+        with open(self.cache_path) as fh:
+            self.assertEqual(10 ** 18, json.load(fh)['mtime_ns'])
+
+    def test_other_cache_version(self):
+        self.load()
+        with open(self.cache_path) as fh:
+            cached = json.load(fh)
+        cached['version'] = project_index.CACHE_VERSION + 1
+        with open(self.cache_path, 'w') as fh:
+            json.dump(cached, fh)
+        self.load()
+        self.assertEqual(2, self.parse.call_count)
+
+    def test_broken_cache(self):
+        os.makedirs(os.path.dirname(self.cache_path))
+        with open(self.cache_path, 'w') as fh:
+            fh.write('{')
+        self.assertEqual(['nova', 'oslo'], self.load().team_names())
+
+    def test_unwritable_cache(self):
+        with mock.patch.object(project_index, '_write_cache',
+                               side_effect=OSError("read only")):
+            self.assertEqual(['nova', 'oslo'], self.load().team_names())
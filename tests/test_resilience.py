@@ -0,0 +1,234 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+from concurrent import futures
+import time
+import unittest
+
+import fetchers
+import resilience
+
+URL = 'http://health.example.com/feed'
+
+
+class FakeFetcher:
+    name = 'fake'
+
+    def __init__(self):
+        self.calls = []
+        self.queueing = False
+
+    def submit(self, url, timeout=None, headers=None):
+        fut = futures.Future()
+        self.calls.append((url, timeout, fut))
+        return fut
+
+    def would_queue(self, url):
+        return self.queueing
+
+    def shutdown(self):
+        pass
+
+
+class FakeStats:
+    def __init__(self):
+        self.events = collections.Counter()
+
+    def event(self, name):
+        self.events[name] += 1
+
+
+def _response(status_code=200, took=None):
+    return fetchers.Response(URL, status_code, 'OK', '', took=took)
+
+
+class LatencyTrackerTest(unittest.TestCase):
+    def test_percentile_needs_samples(self):
+        tracker = resilience.LatencyTracker()
+        for _i in range(resilience.MIN_SAMPLES - 1):
+            tracker.observe(1.0)
+        self.assertIsNone(tracker.percentile(99))
+        tracker.observe(1.0)
+        self.assertEqual(1.0, tracker.percentile(99))
+
+    def test_percentile(self):
+        tracker = resilience.LatencyTracker()
+        for i in range(100):
+            tracker.observe(float(i))
+        self.assertEqual(95.0, tracker.percentile(95))
+        self.assertEqual(99.0, tracker.percentile(99))
+
+    def test_window_slides(self):
+        tracker = resilience.LatencyTracker(size=resilience.MIN_SAMPLES)
+        for _i in range(resilience.MIN_SAMPLES):
+            tracker.observe(10.0)
+        for _i in range(resilience.MIN_SAMPLES):
+            tracker.observe(1.0)
+        self.assertEqual(resilience.MIN_SAMPLES, len(tracker))
+        self.assertEqual(1.0, tracker.percentile(99))
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_opens_after_failures(self):
+        breaker = resilience.CircuitBreaker(failures=2, cooldown=60.0)
+        breaker.record(False)
+        self.assertEqual((True, 0.0), breaker.allow())
+        breaker.record(False)
+        self.assertEqual(breaker.OPEN, breaker.state)
+        allowed, retry_in = breaker.allow()
+        self.assertFalse(allowed)
+        self.assertGreater(retry_in, 0)
+
+    def test_success_resets(self):
+        breaker = resilience.CircuitBreaker(failures=2, cooldown=60.0)
+        breaker.record(False)
+        breaker.record(True)
+        breaker.record(False)
+        self.assertEqual(breaker.CLOSED, breaker.state)
+
+    def test_half_open_probe(self):
+        breaker = resilience.CircuitBreaker(failures=1, cooldown=0.01)
+        breaker.record(False)
+        time.sleep(0.02)
+        self.assertEqual((True, 0.0), breaker.allow())
+        self.assertEqual(breaker.HALF_OPEN, breaker.state)
+        # Only the one probe is let through.
+        self.assertFalse(breaker.allow()[0])
+        # A failed probe opens the circuit again, a good one closes it.
+        breaker.record(False)
+        self.assertEqual(breaker.OPEN, breaker.state)
+        time.sleep(0.02)
+        self.assertTrue(breaker.allow()[0])
+        breaker.record(True)
+        self.assertEqual(breaker.CLOSED, breaker.state)
+
+
+class ResilientFetcherTest(unittest.TestCase):
+    def make(self, **kwargs):
+        self.fetcher = FakeFetcher()
+        self.stats = FakeStats()
+        kwargs.setdefault('hedge', False)
+        resilient = resilience.ResilientFetcher(self.fetcher,
+                                                stats=self.stats, **kwargs)
+        self.addCleanup(resilient.shutdown)
+        return resilient
+
+    def fetch(self, resilient, timeout=(5.0, 10.0), status_code=200,
+              took=None, error=None):
+        fut = resilient.submit(URL, timeout=timeout)
+        _url, used_timeout, attempt = self.fetcher.calls[-1]
+        if error is not None:
+            attempt.set_exception(error)
+        else:
+            attempt.set_result(_response(status_code, took=took))
+        return fut, used_timeout
+
+    def test_timeout_asked_for_until_enough_samples(self):
+        resilient = self.make(min_timeout=0.1)
+        for _i in range(resilience.MIN_SAMPLES - 1):
+            _fut, timeout = self.fetch(resilient, took=0.5)
+            self.assertEqual((5.0, 10.0), timeout)
+
+    def test_adapts_timeout(self):
+        resilient = self.make(min_timeout=0.1, timeout_factor=3.0)
+        for _i in range(resilience.MIN_SAMPLES):
+            fut, _timeout = self.fetch(resilient, took=0.5)
+            self.assertEqual(200, fut.result().status_code)
+        _fut, timeout = self.fetch(resilient, took=0.5)
+        self.assertEqual((5.0, 1.5), timeout)
+
+    def test_adapted_timeout_bounds(self):
+        resilient = self.make(min_timeout=2.0, timeout_factor=3.0)
+        for _i in range(resilience.MIN_SAMPLES):
+            self.fetch(resilient, took=0.1)
+        self.assertEqual((5.0, 2.0), self.fetch(resilient)[1])
+        resilient = self.make(min_timeout=0.1, timeout_factor=3.0)
+        for _i in range(resilience.MIN_SAMPLES):
+            self.fetch(resilient, took=8.0)
+        # Never more than asked for.
+        self.assertEqual((5.0, 10.0), self.fetch(resilient)[1])
+
+    def test_not_adapting(self):
+        resilient = self.make(adaptive_timeouts=False)
+        for _i in range(resilience.MIN_SAMPLES):
+            self.fetch(resilient, took=0.1)
+        self.assertEqual((5.0, 10.0), self.fetch(resilient)[1])
+
+    def test_timeouts_recover_from_slow_host(self):
+        resilient = self.make(min_timeout=0.1, timeout_factor=3.0,
+                              breaker_failures=0)
+        for _i in range(resilience.MIN_SAMPLES):
+            self.fetch(resilient, took=0.1)
+        _fut, timeout = self.fetch(resilient, took=0.1)
+        self.assertAlmostEqual(0.3, timeout[1])
+        # Timing out counts as taking the whole (adapted) timeout, so the
+        # timeout grows back toward the one asked for.
+        timeouts = []
+        for _i in range(10):
+            _fut, timeout = self.fetch(resilient,
+                                       error=IOError("timed out"))
+            timeouts.append(timeout[1])
+        self.assertEqual(sorted(timeouts), timeouts)
+        self.assertEqual(10.0, timeouts[-1])
+
+    def test_breaker_opens(self):
+        resilient = self.make(breaker_failures=2, breaker_cooldown=60.0)
+        for _i in range(2):
+            fut, _timeout = self.fetch(resilient, status_code=503)
+            self.assertEqual(503, fut.result().status_code)
+        calls = len(self.fetcher.calls)
+        fut = resilient.submit(URL, timeout=(5.0, 10.0))
+        self.assertRaises(resilience.BackendUnavailable, fut.result)
+        self.assertEqual(calls, len(self.fetcher.calls))
+
+    def test_probe_gets_full_timeout(self):
+        resilient = self.make(min_timeout=0.1, breaker_failures=1,
+                              breaker_cooldown=0.01)
+        for _i in range(resilience.MIN_SAMPLES):
+            self.fetch(resilient, took=0.1)
+        self.fetch(resilient, status_code=500)
+        time.sleep(0.02)
+        fut, timeout = self.fetch(resilient, took=0.1)
+        self.assertEqual((5.0, 10.0), timeout)
+        self.assertEqual(200, fut.result().status_code)
+        self.assertEqual(resilience.CircuitBreaker.CLOSED,
+                         resilient.breakers['health.example.com'].state)
+
+    def _hedge(self, queueing):
+        resilient = self.make(hedge=True, min_timeout=0.1)
+        for _i in range(resilience.MIN_SAMPLES):
+            self.fetch(resilient, took=0.01)
+        self.fetcher.queueing = queueing
+        fut = resilient.submit(URL, timeout=(5.0, 10.0))
+        deadline = time.monotonic() + 5.0
+        while (time.monotonic() < deadline and
+               not (self.stats.events['hedged'] or
+                    self.stats.events['hedge_skipped'])):
+            time.sleep(0.01)
+        return fut
+
+    def test_hedges_slow_fetch(self):
+        fut = self._hedge(False)
+        self.assertEqual(1, self.stats.events['hedged'])
+        first, hedged = [attempt for _url, _timeout, attempt
+                         in self.fetcher.calls[-2:]]
+        hedged.set_result(_response(took=0.01))
+        self.assertIs(hedged.result(), fut.result())
+        self.assertTrue(first.cancelled())
+
+    def test_no_hedge_when_it_would_queue(self):
+        fut = self._hedge(True)
+        self.assertEqual(1, self.stats.events['hedge_skipped'])
+        self.assertEqual(0, self.stats.events['hedged'])
+        self.fetcher.calls[-1][2].set_result(_response(took=0.01))
+        self.assertEqual(200, fut.result().status_code)
@@ -0,0 +1,63 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+import rssfeeds
+
+FEED = """<?xml version="1.0" encoding="%(encoding)s"?>
+<rss version="2.0"><channel><title>periodic-oslo</title>
+<item><title>Café</title><link>http://logs.example.com/1</link>
+<pubDate>Sat, 17 Oct 2015 07:26:28 +0000</pubDate></item>
+<item><link>http://logs.example.com/2</link>
+<pubDate> Sun, 18 Oct 2015 07:26:28 +0000 </pubDate></item>
+</channel></rss>
+"""
+
+
+class ParseTest(unittest.TestCase):
+    def test_parses_bytes(self):
+        for encoding in ('utf-8', 'iso-8859-1', 'utf-16'):
+            content = (FEED % {'encoding': encoding}).encode(encoding)
+            feed = rssfeeds.parse(content)
+            self.assertIsInstance(feed, rssfeeds.Feed)
+            self.assertEqual(
+                [('Sat, 17 Oct 2015 07:26:28 +0000',
+                  'http://logs.example.com/1'),
+                 ('Sun, 18 Oct 2015 07:26:28 +0000',
+                  'http://logs.example.com/2')],
+                [(e.published, e.link) for e in feed.entries])
+
+    def test_chunks(self):
+        content = (FEED % {'encoding': 'utf-8'}).encode('utf-8')
+        extractor = rssfeeds.ItemExtractor()
+        for i in range(len(content)):
+            extractor.feed(content[i:i + 1])
+        self.assertEqual(2, len(extractor.close().entries))
+
+    def test_unexpected_feeds(self):
+        extractor = rssfeeds.ItemExtractor()
+        self.assertRaises(rssfeeds.UnexpectedFeed, extractor.feed,
+                          b'<feed xmlns="http://www.w3.org/2005/Atom">')
+        extractor = rssfeeds.ItemExtractor()
+        self.assertRaises(rssfeeds.UnexpectedFeed, extractor.feed,
+                          b'<rss><channel><item><link>x</link></item>')
+
+    def test_falls_back_to_feedparser(self):
+        feed = rssfeeds.parse(
+            b'<feed xmlns="http://www.w3.org/2005/Atom"><entry>'
+            b'<link href="http://logs.example.com/1"/>'
+            b'<published>2015-10-17T07:26:28Z</published>'
+            b'</entry></feed>')
+        self.assertNotIsInstance(feed, rssfeeds.Feed)
+        self.assertEqual(['http://logs.example.com/1'],
+                         [e.link for e in feed.entries])
@@ -0,0 +1,109 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import shorteners
+
+
+class ExpiringLRUCacheTest(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.cache_path = os.path.join(self.path, 'cache', 'urls.json')
+
+    def clock(self, now):
+        return mock.patch('shorteners.time', time=mock.Mock(return_value=now))
+
+    def test_evicts_least_recently_used(self):
+        cache = shorteners.ExpiringLRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        cache.set('c', 3)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(3, cache.get('c'))
+
+    def test_expires(self):
+        cache = shorteners.ExpiringLRUCache(ttl=60)
+        with self.clock(1000.0):
+            cache.set('a', 1)
+        with self.clock(1059.0):
+            self.assertEqual(1, cache.get('a'))
+        with self.clock(1060.0):
+            self.assertEqual('gone', cache.get('a', 'gone'))
+        self.assertEqual(0, len(cache))
+
+    def test_save_and_load(self):
+        cache = shorteners.ExpiringLRUCache(ttl=60, path=self.cache_path)
+        with self.clock(1000.0):
+            cache.set('a', 1)
+        with self.clock(1030.0):
+            cache.set('b', 2)
+        cache.save()
+        self.assertEqual([], [name for name in os.listdir(
+            os.path.dirname(self.cache_path)) if name.endswith('.tmp')])
+        loaded = shorteners.ExpiringLRUCache(ttl=60, max_size=1,
+                                             path=self.cache_path)
+        with self.clock(1040.0):
+            loaded.load()
+            self.assertIsNone(loaded.get('a'))
+            self.assertEqual(2, loaded.get('b'))
+        loaded = shorteners.ExpiringLRUCache(ttl=60, path=self.cache_path)
+        with self.clock(1070.0):
+            loaded.load()
+            self.assertEqual(['b'], list(loaded._data))
+
+    def test_save_only_changes(self):
+        cache = shorteners.ExpiringLRUCache(path=self.cache_path)
+        cache.save()
+        self.assertFalse(os.path.exists(self.cache_path))
+        cache.set('a', 1)
+        cache.save()
+        os.unlink(self.cache_path)
+        cache.save()
+        self.assertFalse(os.path.exists(self.cache_path))
+
+    def test_failed_save_is_retried(self):
+        cache = shorteners.ExpiringLRUCache(path=self.cache_path)
+        cache.set('a', 1)
+        with mock.patch('os.replace', side_effect=OSError("disk full")):
+            self.assertRaises(OSError, cache.save)
+        cache.save()
+        with open(self.cache_path) as fh:
+            self.assertEqual('a', json.load(fh)[0][0])
+
+    def test_load_garbage(self):
+        os.makedirs(os.path.dirname(self.cache_path))
+        with open(self.cache_path, 'w') as fh:
+            fh.write('{')
+        cache = shorteners.ExpiringLRUCache(path=self.cache_path)
+        cache.load()
+        self.assertEqual(0, len(cache))
+
+
+class ShortenerServiceTest(unittest.TestCase):
+    def test_caches(self):
+        backend = mock.Mock(wraps=shorteners.LocalShortener())
+        service = shorteners.ShortenerService(mock.Mock(), backend)
+        self.addCleanup(service.shutdown)
+        first = service.safe_shorten('http://example.com/a')
+        self.assertEqual(first, service.safe_shorten('http://example.com/a'))
+        self.assertEqual(1, backend.shorten.call_count)
@@ -0,0 +1,142 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from concurrent import futures
+import threading
+import unittest
+
+import singleflight
+
+
+def _done(result):
+    fut = futures.Future()
+    fut.set_result(result)
+    return fut
+
+
+class SingleFlightTest(unittest.TestCase):
+    def test_shares_inflight_work(self):
+        flights = singleflight.SingleFlight()
+        work = futures.Future()
+        calls = []
+
+        def func():
+            calls.append(1)
+            return work
+
+        fut, shared = flights.submit('build', func)
+        fut2, shared2 = flights.submit('build', func)
+        self.assertFalse(shared)
+        self.assertTrue(shared2)
+        self.assertIs(fut, fut2)
+        self.assertEqual(1, len(calls))
+        self.assertEqual(1, len(flights))
+        work.set_result('parsed')
+        self.assertEqual('parsed', fut.result())
+        self.assertEqual(0, len(flights))
+
+    def test_new_work_once_done(self):
+        flights = singleflight.SingleFlight()
+        fut, _shared = flights.submit('build',
+                                      lambda: _done('first'))
+        fut2, shared = flights.submit('build',
+                                      lambda: _done('second'))
+        self.assertFalse(shared)
+        self.assertEqual('first', fut.result())
+        self.assertEqual('second', fut2.result())
+
+    def test_failures_are_shared(self):
+        flights = singleflight.SingleFlight()
+        work = futures.Future()
+        fut, _shared = flights.submit('build', lambda: work)
+        fut2, _shared = flights.submit('build', lambda: work)
+        work.set_exception(IOError("broken"))
+        self.assertRaises(IOError, fut.result)
+        self.assertRaises(IOError, fut2.result)
+
+    def test_func_raising(self):
+        flights = singleflight.SingleFlight(max_inflight=1)
+
+        def func():
+            raise ValueError("bad")
+
+        fut, _shared = flights.submit('build', func)
+        self.assertRaises(ValueError, fut.result)
+        # The failed work does not hold on to its slot.
+        fut2, _shared = flights.submit('other', lambda: _done('ok'))
+        self.assertEqual('ok', fut2.result())
+
+    def test_admission_queues_in_order(self):
+        flights = singleflight.SingleFlight(max_inflight=1)
+        works = {}
+        started = []
+
+        def make(key):
+            def func():
+                started.append(key)
+                works[key] = futures.Future()
+                return works[key]
+            return func
+
+        futs = [flights.submit(key, make(key))[0] for key in 'abc']
+        self.assertEqual(['a'], started)
+        works['a'].set_result('a')
+        self.assertEqual(['a', 'b'], started)
+        works['b'].set_result('b')
+        works['c'].set_result('c')
+        self.assertEqual(['a', 'b', 'c'], [fut.result() for fut in futs])
+
+    def test_abandon_queued_work(self):
+        flights = singleflight.SingleFlight(max_inflight=1)
+        running = futures.Future()
+        started = []
+
+        def func():
+            started.append('queued')
+            return _done('queued')
+
+        flights.submit('running', lambda: running)
+        fut, _shared = flights.submit('queued', func)
+        fut2, shared = flights.submit('queued', func)
+        self.assertTrue(shared)
+        # Still waited for (by the second caller).
+        self.assertFalse(flights.abandon('queued', fut))
+        self.assertTrue(flights.abandon('queued', fut2))
+        self.assertTrue(fut.cancelled())
+        running.set_result('done')
+        self.assertEqual([], started)
+        self.assertEqual(0, len(flights))
+
+    def test_concurrent_callers(self):
+        flights = singleflight.SingleFlight()
+        work = futures.Future()
+        calls = []
+        results = []
+        lock = threading.Lock()
+
+        def func():
+            with lock:
+                calls.append(1)
+            return work
+
+        def caller():
+            fut, _shared = flights.submit('build', func)
+            results.append(fut)
+
+        threads = [threading.Thread(target=caller) for _i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        work.set_result('parsed')
+        self.assertEqual(1, len(calls))
+        self.assertEqual(['parsed'] * 20, [fut.result() for fut in results])
@@ -0,0 +1,63 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+from unittest import mock
+
+import snapshots
+
+
+class FormatAgeTest(unittest.TestCase):
+    def test_format_age(self):
+        self.assertEqual('0s', snapshots.format_age(-5))
+        self.assertEqual('59s', snapshots.format_age(59.9))
+        self.assertEqual('1m', snapshots.format_age(60))
+        self.assertEqual('59m', snapshots.format_age(60 * 60 - 1))
+        self.assertEqual('1h', snapshots.format_age(60 * 60))
+        self.assertEqual('2d', snapshots.format_age(2 * 24 * 60 * 60 + 1))
+
+
+class SnapshotTest(unittest.TestCase):
+    def test_lookup(self):
+        snapshot = snapshots.Snapshot()
+        snapshot.update({
+            ('oslo.config', '2.7'): {'status': 'All OK'},
+            ('oslo.db', '3.4'): {'status': '2 failures'},
+        }, computed_at=1000.0)
+        found, missing = snapshot.lookup([('oslo.config', '2.7'),
+                                          ('oslo.config', '3.4'),
+                                          ('oslo.db', '3.4')])
+        self.assertEqual({
+            ('oslo.config', '2.7'): (1000.0, {'status': 'All OK'}),
+            ('oslo.db', '3.4'): (1000.0, {'status': '2 failures'}),
+        }, found)
+        self.assertEqual([('oslo.config', '3.4')], missing)
+        self.assertEqual(['oslo.config', 'oslo.db'],
+                         snapshot.project_names())
+
+    def test_incomplete_results_are_skipped(self):
+        snapshot = snapshots.Snapshot()
+        snapshot.update({('oslo.db', '3.4'): {'status': 'All OK'}},
+                        computed_at=1000.0)
+        snapshot.update({('oslo.db', '3.4'): {'status': 'Pending',
+                                              'incomplete': True}},
+                        computed_at=2000.0)
+        found, _missing = snapshot.lookup([('oslo.db', '3.4')])
+        self.assertEqual({('oslo.db', '3.4'): (1000.0, {'status': 'All OK'})},
+                         found)
+
+    def test_computed_now(self):
+        snapshot = snapshots.Snapshot()
+        with mock.patch('time.time', return_value=1234.0):
+            snapshot.update({('oslo.db', '3.4'): {'status': 'All OK'}})
+        found, _missing = snapshot.lookup([('oslo.db', '3.4')])
+        self.assertEqual(1234.0, found[('oslo.db', '3.4')][0])
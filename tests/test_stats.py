@@ -0,0 +1,92 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import stats
+
+
+class HistogramTest(unittest.TestCase):
+    def test_quantiles(self):
+        histogram = stats.Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.05, 0.5, 2.0):
+            histogram.observe(value)
+        self.assertEqual(4, histogram.count)
+        self.assertEqual([2, 1, 1], histogram.counts)
+        self.assertEqual(0.1, histogram.quantile(0.5))
+        self.assertEqual(1.0, histogram.quantile(0.75))
+        self.assertEqual(2.0, histogram.quantile(0.95))
+        self.assertEqual(2.0, histogram.max)
+
+    def test_quantile_capped_at_max(self):
+        histogram = stats.Histogram(buckets=(1.0,))
+        histogram.observe(0.25)
+        self.assertEqual(0.25, histogram.quantile(0.99))
+
+    def test_empty(self):
+        self.assertEqual(0.0, stats.Histogram().quantile(0.5))
+
+
+class StatsTest(unittest.TestCase):
+    def make(self):
+        s = stats.Stats(buckets=[0.1, 1.0])
+        s.observe('fetch', 0.05)
+        s.observe('fetch', 0.5)
+        s.incr('ok', 2)
+        s.incr('timeout')
+        s.event('coalesced')
+        s.event('deduped', 3)
+        return s
+
+    def test_summary(self):
+        stage_rows, outcome_rows, event_rows = self.make().summary()
+        self.assertEqual([['fetch', 2, 0.275, 0.1, 0.5, 0.5]], stage_rows)
+        self.assertEqual([('ok', 2), ('timeout', 1)], outcome_rows)
+        self.assertEqual([('coalesced', 1), ('deduped', 3)], event_rows)
+
+    def test_timed(self):
+        s = stats.Stats()
+        with s.timed('parse'):
+            pass
+        self.assertEqual(1, s.histograms['parse'].count)
+
+    def test_to_prometheus(self):
+        self.assertEqual([
+            '# HELP oslobot_stage_seconds Time taken by each stage.',
+            '# TYPE oslobot_stage_seconds histogram',
+            'oslobot_stage_seconds_bucket{stage="fetch",le="0.1"} 1',
+            'oslobot_stage_seconds_bucket{stage="fetch",le="1.0"} 2',
+            'oslobot_stage_seconds_bucket{stage="fetch",le="+Inf"} 2',
+            'oslobot_stage_seconds_sum{stage="fetch"} 0.55',
+            'oslobot_stage_seconds_count{stage="fetch"} 2',
+            '# HELP oslobot_outcomes_total Outcomes of fetches.',
+            '# TYPE oslobot_outcomes_total counter',
+            'oslobot_outcomes_total{outcome="ok"} 2',
+            'oslobot_outcomes_total{outcome="timeout"} 1',
+            '# HELP oslobot_events_total Events of scheduling fetches.',
+            '# TYPE oslobot_events_total counter',
+            'oslobot_events_total{event="coalesced"} 1',
+            'oslobot_events_total{event="deduped"} 3',
+        ], self.make().to_prometheus('oslobot').splitlines())
+
+    def test_dump_prometheus(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        stats_path = os.path.join(path, 'stats.prom')
+        s = self.make()
+        s.dump_prometheus(stats_path, 'oslobot')
+        with open(stats_path) as fh:
+            self.assertEqual(s.to_prometheus('oslobot'), fh.read())
+        self.assertEqual(['stats.prom'], os.listdir(path))
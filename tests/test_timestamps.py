@@ -0,0 +1,58 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+from dateutil import parser
+
+import timestamps
+
+
+class ParseTest(unittest.TestCase):
+    def assertSameAsDateutil(self, text):
+        parsed = timestamps.parse(text)
+        expected = parser.parse(text)
+        self.assertEqual(expected, parsed)
+        self.assertEqual(expected.utcoffset(), parsed.utcoffset())
+        self.assertEqual(expected.strftime('%Z'), parsed.strftime('%Z'))
+
+    def test_rfc822(self):
+        for text in ['Sat, 17 Oct 2015 07:26:28 +0000',
+                     'Sat, 17 Oct 2015 07:26:28 -0500',
+                     'Sat, 17 Oct 2015 07:26:28 +0530',
+                     'Sat, 17 Oct 2015 07:26:28 GMT',
+                     '17 Oct 2015 07:26 UTC',
+                     '7 oct 2015 07:26:28 +0000']:
+            self.assertSameAsDateutil(text)
+
+    def test_iso8601(self):
+        for text in ['2015-10-17T07:26:28Z',
+                     '2015-10-17T07:26:28+02:00',
+                     '2015-10-17T07:26:28.25-0700',
+                     '2015-10-17 07:26:28.123456+00:00',
+                     '2015-10-17T07:26:28']:
+            self.assertSameAsDateutil(text)
+
+    def test_odd_formats_use_dateutil(self):
+        for text in ['October 17, 2015 7:26am UTC',
+                     'Sat, 17 Foo 2015 07:26:28 +0000',
+                     '2015-02-30T07:26:28Z']:
+            try:
+                expected = parser.parse(text)
+            except (ValueError, OverflowError) as e:
+                self.assertRaises(type(e), timestamps.parse, text)
+            else:
+                self.assertEqual(expected, timestamps.parse(text))
+
+    def test_memoized(self):
+        text = 'Sat, 17 Oct 2015 07:26:28 +0000'
+        self.assertIs(timestamps.parse(text), timestamps.parse(text))
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Filter the history of a git repository to only include some files.
+
+Runs :mod:`oslo_tools.filter_git_history` (as does
+``oslo-tools filter-git-history``).
+"""
+
+import os
+import sys
+
+# Run from a checkout (where oslo_tools need not be installed).
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from oslo_tools import filter_git_history  # noqa: E402
+
+
+if __name__ == '__main__':
+    sys.exit(filter_git_history.main())
@@ -13,32 +13,20 @@
 #    under the License.
 
 """Print a list of the oslo project repository names.
+
+Runs :mod:`oslo_tools.list_oslo_projects` (as does
+``oslo-tools list-oslo-projects``).
 """
 
 import os
+import sys
 
-import oslo_tool_config as cfg
-
-import yaml
-
-
-def main():
-    conf = cfg.get_config_parser()
-    cfg.parse_arguments(conf)
-
-    gov_repo = os.path.expanduser(os.path.join(conf.repo_root,
-                                               'governance'))
-    project_input = os.path.join(gov_repo, 'reference/projects.yaml')
-    with open(project_input) as f:
-        project = yaml.safe_load(f.read())
+# Run from a checkout (where oslo_tools need not be installed).
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
 
-    repos = []
-    for v in project['oslo']['deliverables'].values():
-        repos.append(v['repos'][0])
-    for r in sorted(repos):
-        print(r)
+from oslo_tools import list_oslo_projects  # noqa: E402
 
 
 if __name__ == '__main__':
-    import sys
-    sys.exit(main())
+    sys.exit(list_oslo_projects.main())